@@ -0,0 +1,225 @@
+import asyncio
+import collections
+import threading
+
+from countdown import Countdown
+from durations import DurationError, DurationParser
+from events import CancelledEvent, EventBus, SleepRequestedEvent, TickEvent, WarningEvent
+from scheduler import Scheduler
+
+
+class EventStream:
+    # async iterator over bus events, ends after one of the stop_on events
+    def __init__(self, bus, event_type, stop_on=(), latest=False, maxsize=None):
+        self.loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._queue = collections.deque(maxlen=1 if latest else maxsize)
+        self._waiter = None
+        self._closed = False
+
+        self.bus = bus
+        self._subscriptions = [bus.subscribe(event_type, self._push)]
+        self._subscriptions += [bus.subscribe(stop_type, self._push_stop) for stop_type in stop_on]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._queue:
+            if self._closed:
+                raise StopAsyncIteration
+            self._waiter = self.loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._queue.popleft()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def _push(self, event):
+        # publishers on other threads hand over through the loop
+        if threading.get_ident() == self._thread_id:
+            self._append(event)
+        else:
+            self.loop.call_soon_threadsafe(self._append, event)
+
+    def _push_stop(self, event):
+        if threading.get_ident() == self._thread_id:
+            self.close()
+        else:
+            self.loop.call_soon_threadsafe(self.close)
+
+    def _append(self, event):
+        if self._closed:
+            return
+        self._queue.append(event)
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self):
+        # queued events are still handed out, then iteration stops
+        if self._closed:
+            return
+        self._closed = True
+        for subscription in self._subscriptions:
+            self.bus.unsubscribe(subscription)
+        self._wake()
+
+
+class AsyncTimer:
+    # Timer for an asyncio loop, same Countdown and events, ticks scheduled with loop.call_at
+    def __init__(self, config=None, events=None, loop=None):
+        self.config = config
+        self.events = events if events is not None else EventBus()
+        self.countdown = Countdown()
+        self.error = None  # DurationError from the last failed parse
+        self.loop = loop
+        self._handle = None
+        self._done = None
+
+    @property
+    def time_remaining(self):
+        return self.countdown.remaining
+
+    @property
+    def running(self):
+        return self.countdown.running
+
+    @property
+    def paused(self):
+        return self.countdown.paused
+
+    async def start(self, selection):
+        # a duration string or whole seconds, False when it could not be parsed
+        self.loop = self.loop or asyncio.get_running_loop()
+        seconds = selection if isinstance(selection, int) else None
+        if seconds is None:
+            result = DurationParser.parse(selection)
+            if isinstance(result, DurationError):
+                self.error = result
+                return False
+            seconds = result.seconds
+        self.error = None
+
+        if self.countdown.running:
+            await self.cancel()
+        self._done = self.loop.create_future()
+        self._publish(self.countdown.start(seconds, self.loop.time()))
+        self._schedule()
+        return True
+
+    async def pause(self):
+        if not self.countdown.running:
+            return  # nothing to pause, and no loop yet before the first start
+        self._unschedule()
+        self._publish(self.countdown.pause(self.loop.time()))
+        self._schedule()
+
+    async def cancel(self):
+        self._unschedule()
+        self._publish(self.countdown.cancel())
+        self._finish(False)
+
+    async def wait(self):
+        # True once the countdown reaches zero, False when cancelled
+        if self._done is None:
+            return False
+        return await asyncio.shield(self._done)
+
+    def ticks(self, latest=True):
+        # a slow consumer only sees the newest tick unless latest is False
+        return EventStream(self.events, TickEvent, stop_on=(SleepRequestedEvent, CancelledEvent), latest=latest)
+
+    def warnings(self):
+        return EventStream(self.events, WarningEvent, stop_on=(SleepRequestedEvent, CancelledEvent))
+
+    def get_remaining_time(self):
+        return self.countdown.format_remaining()
+
+    def _schedule(self):
+        due = self.countdown.next_tick()
+        if due is not None:
+            self._handle = self.loop.call_at(due, self._on_tick, self.countdown.generation)
+
+    def _unschedule(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _on_tick(self, run):
+        if not self.countdown.is_current(run):
+            return
+        self._handle = None
+        self._publish(self.countdown.advance(self.loop.time()))
+        if self.countdown.running:
+            self._schedule()
+        else:
+            self._finish(True)
+
+    def _finish(self, completed):
+        if self._done is not None and not self._done.done():
+            self._done.set_result(completed)
+
+    def _publish(self, events):
+        for event in events:
+            self.events.publish(event)
+
+
+class AsyncScheduler(Scheduler):
+    # same fire and warning logic as Scheduler, woken by loop.call_at instead of the runtime.
+    # start(), stop() and config changes may come from any thread, asyncio handles are only
+    # created and cancelled on the loop
+    def __init__(self, config, sleep_callback=None, events=None, loop=None):
+        super().__init__(config, sleep_callback=sleep_callback, events=events)
+        self.loop = loop
+
+    def start(self):
+        self.loop = self.loop or asyncio.get_running_loop()
+        super().start()
+
+    def stop(self):
+        if self.loop is None or self._on_loop():
+            super().stop()
+            return
+        with self._lock:
+            self._chain += 1  # a wakeup already queued sees it and does nothing
+            handle, self._handle = self._handle, None
+        if handle is not None:
+            try:
+                self.loop.call_soon_threadsafe(handle.cancel)
+            except RuntimeError:
+                pass  # the loop is closed, nothing will run it anyway
+
+    def _reschedule(self):
+        # config subscribers call this on the writer or watcher thread
+        if self.loop is None or self._on_loop():
+            super()._reschedule()
+        else:
+            self.loop.call_soon_threadsafe(super()._reschedule)
+
+    def _on_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _run_sleep_callback(self):
+        # the loop's own executor, the thread runtime is never started for an asyncio front end
+        self.loop.run_in_executor(None, self.sleep_callback)
+
+    def _call_soon(self, callback, *args):
+        if self._on_loop():
+            return self.loop.call_soon(callback, *args)
+        return self.loop.call_soon_threadsafe(callback, *args)
+
+    def _call_later(self, delay, callback, *args):
+        # only from _wakeup, which runs on the loop
+        return self.loop.call_later(delay, callback, *args)
@@ -0,0 +1,360 @@
+import argparse
+import contextlib
+import datetime
+import itertools
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+BASELINE_PATH = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.25  # fail when a benchmark is 25% slower than its baseline
+REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARKS = {}
+CLEANUPS = []  # run after each benchmark, see run()
+
+# a benchmark app must never take over a real instance's control file or status page, or log to the cwd
+ISOLATED_ENV = {"SLEEPTIMER_CONTROL": "0", "SLEEPTIMER_STATUS": "0", "SLEEPTIMER_EVENT_LOG": "0"}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(function, repeat=5, min_time=0.05):
+    # calibrate the loop count, then keep the best of a few runs
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def make_timers(count):
+    # storage format before preset records
+    return {f"{minutes} min": {"duration:": str(minutes), "unit:": "min"} for minutes in range(1, count + 1)}
+
+
+def make_presets(count):
+    return [{"seconds": minutes * 60} for minutes in range(1, count + 1)]
+
+
+def make_config(workdir, timers=0, name="settings.json", legacy=False):
+    from config import Config
+
+    config = Config(config_path=os.path.join(workdir, name))
+    config.merge_missing_config_attributes()
+    if legacy:
+        del config.config["presets"]
+        config.config["timers"] = make_timers(timers)
+    else:
+        config.config["presets"] = make_presets(timers)
+    config.save_config(config.config)
+    return config
+
+
+class Skipped(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def isolated(workdir):
+    # ISOLATED_ENV set and the workdir as cwd, for whatever still writes relative paths
+    saved = {name: os.environ.get(name) for name in ISOLATED_ENV}
+    cwd = os.getcwd()
+    os.environ.update(ISOLATED_ENV)
+    os.chdir(workdir)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def make_app(workdir, timers=0):
+    try:
+        from main import App
+    except ImportError:
+        raise
+    except Exception as e:
+        # pystray connects to the display as soon as it is imported
+        raise Skipped(f"no tray backend: {e}")
+
+    make_config(workdir, timers=timers)
+    with isolated(workdir):
+        app = App(headless=True, config_path=os.path.join(workdir, "settings.json"))
+
+    def shutdown():
+        with isolated(workdir):
+            app.shutdown()
+
+    CLEANUPS.append(shutdown)
+    return app
+
+
+@benchmark("timer.parse_duration")
+def bench_parse_duration(workdir):
+    from timer import Timer
+
+    timer = Timer()
+    return lambda: timer.parse_duration(selection="90 min ★")
+
+
+@benchmark("timer.start_pause_cancel")
+def bench_start_pause_cancel(workdir):
+    # a full restart cycle, runs reuse the runtime's timing thread instead of spawning one
+    from timer import Timer
+
+    timer = Timer()
+
+    def cycle():
+        timer.start_timer(selection="90 min")
+        timer.pause_timer()
+        timer.pause_timer()
+        timer.cancel_timer()
+
+    return cycle
+
+
+@benchmark("timer.parse_duration[legacy]")
+def bench_legacy_parse_duration(workdir):
+    # the per-call regex parser Timer and GUI each carried before durations.py
+    def legacy_parse_duration(selection):
+        selection = re.sub(r'[^\w\s]', '', selection)
+        match = re.match(r"(\d+)\s*(min|hrs?|sec)", selection.lower())
+        if not match:
+            return None
+        duration, unit = match.groups()
+        return int(duration) * (3600 if unit.startswith("hr") else 60 if unit == "min" else 1)
+
+    return lambda: legacy_parse_duration("90 min ★")
+
+
+@benchmark("durations.parse[compound]")
+def bench_parse_compound(workdir):
+    from durations import DurationParser
+
+    return lambda: DurationParser.parse("1h 30m 15s")
+
+
+@benchmark("durations.parse_many[5000]")
+def bench_parse_many(workdir):
+    from durations import DurationParser
+
+    titles = [f"{minutes} min" for minutes in range(1, 5001)]
+    return lambda: DurationParser.parse_many(titles)
+
+
+@benchmark("events.publish[tick]")
+def bench_publish_tick(workdir):
+    # what the countdown thread pays per tick with one subscriber of each policy
+    from events import LATEST, QUEUED, SYNC, EventBus, TickEvent
+
+    bus = EventBus()
+    for policy in (SYNC, QUEUED, LATEST):
+        bus.subscribe(TickEvent, lambda event: None, policy=policy)
+    return lambda: bus.publish(TickEvent(remaining=60, total=90))
+
+
+@benchmark("config.merge_dicts[5000]")
+def bench_merge_dicts(workdir):
+    config = make_config(workdir)
+    defaults = {"timers": {}, "preferences": dict(config.default_config["preferences"]),
+                "extra": {f"key{i}": {"a": i, "b": {"c": i}} for i in range(5000)}}
+    user = {"timers": make_timers(5000), "preferences": {"theme": "light"},
+            "extra": {f"key{i}": {"a": -i, "b": {}} for i in range(0, 5000, 2)}}
+    return lambda: config.merge_dicts(defaults, user)
+
+
+@benchmark("config.save_config[2000]")
+def bench_save_config(workdir):
+    config = make_config(workdir, timers=2000)
+    return lambda: config.save_config(config.config), {"bytes": os.path.getsize(config.config_path)}
+
+
+@benchmark("config.load_config[2000]")
+def bench_load_config(workdir):
+    config = make_config(workdir, timers=2000)
+    return config.load_config
+
+
+@benchmark("config.save_config[legacy 2000]")
+def bench_save_legacy_config(workdir):
+    config = make_config(workdir, timers=2000, legacy=True)
+    return lambda: config.save_config(config.config), {"bytes": os.path.getsize(config.config_path)}
+
+
+@benchmark("config.load_config[legacy 2000]")
+def bench_load_legacy_config(workdir):
+    # the loader before preset records, a plain json.load
+    config = make_config(workdir, timers=2000, legacy=True)
+
+    def load_legacy():
+        with open(config.config_path, 'r') as f:
+            return json.load(f)
+    return load_legacy
+
+
+@benchmark("app.get_all_options[5000]")
+def bench_get_all_options(workdir):
+    app = make_app(workdir, timers=5000)
+    return app.get_all_options
+
+
+@benchmark("presets.set_default[5000]")
+def bench_set_default(workdir):
+    from presets import Preset, PresetRegistry
+
+    registry = PresetRegistry(Preset(seconds=minutes * 60) for minutes in range(1, 5001))
+    defaults = itertools.cycle(range(60, 5001 * 60, 60))
+    return lambda: registry.set_default(next(defaults))
+
+
+@benchmark("scheduler.next_fire")
+def bench_next_fire(workdir):
+    from scheduler import Scheduler
+
+    config = make_config(workdir)
+    config.set_schedule({"days": ["Monday", "Thursday"], "sleep_at": "23:15"})
+    scheduler = Scheduler(config=config, sleep_callback=lambda: None)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return lambda: scheduler.get_next_fire(now)
+
+
+@benchmark("scheduler.simulate_year")
+def bench_simulate_year(workdir):
+    # a year of schedules, suspends and edits on a virtual clock, see simulator.py
+    from simulator import Simulation
+
+    def simulate():
+        with tempfile.TemporaryDirectory() as rundir:
+            Simulation(rundir, days=365, seed=0).run()
+
+    return simulate
+
+
+@benchmark("app.cold_start")
+def bench_cold_start(workdir):
+    make_config(workdir)
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); import main; "
+            "main.App(headless=True, config_path=sys.argv[2]).scheduler.stop()")
+    command = [sys.executable, "-c", code, REPO_PATH, os.path.join(workdir, "settings.json")]
+    env = {**os.environ, **ISOLATED_ENV}
+
+    def cold_start():
+        subprocess.run(command, check=True, capture_output=True, env=env, cwd=workdir)
+
+    cold_start()  # surface import errors during setup
+    return cold_start
+
+
+def run(names=None):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and not any(selected in name for selected in names):
+            continue
+
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                function, info = setup(workdir), {}
+                if isinstance(function, tuple):
+                    function, info = function
+                min_time = 1.0 if name == "app.cold_start" else 0.05
+                results[name] = {"seconds": measure(function, repeat=3 if name == "app.cold_start" else 5,
+                                                    min_time=min_time), **info}
+            except (ImportError, Skipped, subprocess.CalledProcessError) as e:
+                reason = e.stderr.decode() if isinstance(e, subprocess.CalledProcessError) else str(e)
+                results[name] = {"skipped": reason.strip().splitlines()[-1] if reason.strip() else repr(e)}
+            finally:
+                while CLEANUPS:
+                    CLEANUPS.pop()()
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        seconds = result.get("seconds")
+        previous = baseline.get(name, {}).get("seconds")
+        if seconds is None or not previous:
+            continue
+        change = seconds / previous - 1
+        result["change"] = change
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def format_results(results):
+    lines = []
+    for name, result in results.items():
+        if "skipped" in result:
+            lines.append(f"{name:32} skipped ({result['skipped']})")
+            continue
+        change = f"  {result['change']:+.1%}" if "change" in result else ""
+        size = f"  {result['bytes']} bytes" if "bytes" in result else ""
+        lines.append(f"{name:32} {result['seconds'] * 1e6:14.2f} us{change}{size}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simple Sleep Timer benchmarks")
+    parser.add_argument("names", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--output", help="also write the results as json to this path")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_PATH)
+    results = run(args.names)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            measured = {name: result for name, result in results.items() if "seconds" in result}
+            json.dump({**baseline, **measured}, f, indent=4)
+        return 0
+
+    if regressions:
+        print(f"\nRegressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
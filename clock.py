@@ -0,0 +1,94 @@
+import datetime
+import threading
+import time
+
+from runtime import get_runtime
+
+UTC = datetime.timezone.utc
+
+
+class Clock:
+    # the two time sources Timer and Scheduler read, swapped for a VirtualClock in simulations
+    @staticmethod
+    def monotonic():
+        # seconds, only for intervals; stands still while the machine is suspended
+        return time.monotonic()
+
+    @staticmethod
+    def now():
+        # aware utc wall time, jumps with suspends and clock changes
+        return datetime.datetime.now(UTC)
+
+
+SYSTEM_CLOCK = Clock()
+
+
+class VirtualClock(Clock):
+    # time moves only when told to, advance() is a running machine, suspend() a sleeping one
+    def __init__(self, start=None):
+        self._wall = start if start is not None else datetime.datetime(2026, 1, 1, tzinfo=UTC)
+        self._monotonic = 0.0
+
+    def monotonic(self):
+        return self._monotonic
+
+    def now(self):
+        return self._wall
+
+    def advance(self, seconds):
+        self._monotonic += seconds
+        self._wall += datetime.timedelta(seconds=seconds)
+
+    def suspend(self, seconds):
+        # wall time passes, monotonic time does not
+        self._wall += datetime.timedelta(seconds=seconds)
+
+    def set_wall(self, wall):
+        # a manual or ntp clock change
+        self._wall = wall
+
+
+class ClockWatcher:
+    # calls on_jump on the runtime's timing thread when wall time moves against monotonic time: a
+    # resume from suspend where the monotonic clock stood still, or a manual or ntp step. One cheap
+    # check per interval, on_jump must not block
+    INTERVAL = 1.0
+    THRESHOLD = 2.0  # seconds, ntp slewing stays far below
+
+    def __init__(self, on_jump, interval=INTERVAL, runtime=None):
+        self.on_jump = on_jump
+        self.interval = interval
+        self.runtime = runtime
+        self._offset = None
+        self._handle = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def offset():
+        return time.time() - time.monotonic()
+
+    def start(self):
+        self.runtime = self.runtime or get_runtime()
+        with self._lock:
+            if self._handle is None:
+                self._offset = self.offset()
+                self._handle = self.runtime.call_later(self.interval, self._check)
+
+    def stop(self):
+        with self._lock:
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+
+    def _check(self):
+        offset = self.offset()
+        jumped = abs(offset - self._offset) > self.THRESHOLD
+        self._offset = offset
+        if jumped:
+            try:
+                self.on_jump()
+            except Exception as e:
+                print(f"Error handling a clock jump: {e}")
+        with self._lock:
+            if self._handle is not None:
+                self._handle = self.runtime.call_later(self.interval, self._check)
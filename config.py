@@ -1,127 +1,614 @@
+import bisect
+import copy
 import json
 import os
 import shutil
 import sys
+import threading
 import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
 
 import requests
 
+from durations import DurationParser
+from event_log import EventLog
+from schedule_calendar import DAYS
+from metrics import Metrics
+from presets import Preset
 from updater_gui import UpdaterGui
 from packaging import version
 
 
+_MISSING = object()  # key absent on one side of a merge
+
+
+def freeze(value):
+    # read only deep copy, dicts become mapping proxies and lists tuples
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    version: int
+    data: Mapping[str, Any]
+    # resolved once per version for the scheduler and timer hot paths
+    scheduled: bool = False
+    notifications: bool = False
+    days: tuple = ()
+    sleep_at: Optional[str] = None
+
+    @staticmethod
+    def from_config(version, config, data=None):
+        data = freeze(config) if data is None else data
+        preferences = data.get("preferences", {})
+        schedule = data.get("scheduled_times") or {}
+        return ConfigSnapshot(version=version, data=data,
+                              scheduled=bool(preferences.get("scheduled")),
+                              notifications=bool(preferences.get("notifications")),
+                              days=tuple(schedule.get("days", ())),
+                              sleep_at=schedule.get("sleep_at", "22:00"))
+
+    def get(self, key, default=None):
+        # dotted keys, "preferences.theme"
+        value = self.data
+        for part in key.split("."):
+            if not isinstance(value, Mapping) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+
 class Config:
-    def __init__(self, config_path="settings.json"):
+    def __init__(self, config_path="settings.json", runtime=None):
         self.config_path = config_path
+        self.runtime = runtime  # writes go through its config queue when set
         self.default_config = {
-            "timers": {},
+            "presets": [],  # sorted by seconds, {"seconds": int, "label": str (optional)}
             "scheduled_times": {},
             "preferences": {
-                "default_option": None,
+                "default_preset": None,  # seconds
                 "theme": "dark",
                 "notifications": False,
                 "minimize_on_close": False,
                 "run_on_startup": False,
                 "startup_in_background": False,
+                "startup_mode": "login",  # or "on_demand", Linux only, see startup.py
                 "scheduled": False,
                 "online_updater": True,
                 "skip_version": None
             },
+            # the optional http api, see http_api.py; the token is generated the first time it is enabled
+            "http_api": {
+                "enabled": False,
+                "host": "127.0.0.1",
+                "port": 8765,
+                "token": None
+            },
         }
         self.version = '1.1.0'
+        self.updater_gui = None  # built on the first available update
+
+        # published after every write, see subscribe
+        self.snapshot = ConfigSnapshot.from_config(0, {})
+        self._subscribers = []  # (keys, callback)
+        self._publish_lock = threading.Lock()
+
+        # what we last read from or wrote to disk, used to merge external edits
+        self._lock = threading.RLock()  # the in-memory config, setters mutate and serialize under it
+        # disk reads and writes, always taken before _lock; without a runtime writes happen inside
+        # setters, so one lock covers both
+        self._write_lock = self._lock if runtime is None else threading.Lock()
+        self._disk_state = None  # (mtime_ns, size, inode)
+        self._disk_text = None
+        self._pending = None  # serialized config waiting for the config queue
+        self._write_error = None  # the last failed write, raised by flush()
+        self._transaction = 0  # depth of open transactions, saves inside one are held back
+        self._transaction_dirty = False
+
+        self.config = None
         self.config = self.load_config()
+        self.publish()
 
     def load_config(self):
         try:
             config = None
             if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f:
-                    config = json.load(f)
+                with self._write_lock:
+                    state = self._stat()
+                    with open(self.config_path, 'r') as f:
+                        text = f.read()
+                    config = json.loads(text)
+                    self._disk_state, self._disk_text = state, text
+                if Config.migrate_config(config):
+                    self.save_config(config)
             else:
-                self.save_config(self.default_config)
-                config = self.default_config
+                config = copy.deepcopy(self.default_config)
+                self.save_config(config)
 
             return config
 
         except (json.JSONDecodeError, IOError) as e:
             print(f"Error loading config: {e}")
-            return self.default_config
+            return copy.deepcopy(self.default_config)
 
     def save_config(self, config_data):
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(config_data, f, indent=4)
+        with self._lock:
             self.config = config_data
-        except IOError as e:
-            print(f"Error saving config: {e}")
+            if self._transaction:
+                # only the transaction's own thread can hold _lock now, see transaction
+                self._transaction_dirty = True
+                return
+            try:
+                data = json.dumps(config_data, indent=4)
+            except (TypeError, ValueError) as e:
+                print(f"Error saving config: {e}")
+                return
+
+            if self.runtime is None or not self.runtime.is_running():
+                self._write(data)
+            else:
+                # the disk write happens on the runtime's config queue, back to back saves coalesce
+                queued = self._pending is not None
+                self._pending = data
+                if not queued:
+                    self.runtime.submit("config", self._write_pending)
+        self.publish()
+
+    @contextmanager
+    def transaction(self):
+        # setters inside run as usual but save once, at the end, and not at all if it raises;
+        # other threads' setters wait for it to finish
+        with self._lock:
+            outermost = not self._transaction
+            backup = copy.deepcopy(self.config) if outermost else None
+            self._transaction += 1
+            try:
+                yield self
+            except BaseException:
+                if outermost:
+                    Config.assign(self.config, backup)
+                    self._transaction_dirty = False
+                raise
+            finally:
+                self._transaction -= 1
+            dirty = outermost and self._transaction_dirty
+            if outermost:
+                self._transaction_dirty = False
+        if dirty:
+            self.save_config(self.config)
+
+    def flush(self, timeout=None):
+        # wait until queued writes have reached the disk, OSError if the last of them failed
+        if self.runtime is not None and self.runtime.is_running():
+            self.runtime.submit("config", lambda: None).result(timeout)
+        error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+
+    def _write_pending(self):
+        with self._lock:
+            data, self._pending = self._pending, None
+        if data is not None:
+            self._write(data)
+            self.publish()
+
+    def _write(self, data):
+        # the in-memory lock is only held for the merge, never for the disk write itself
+        with self._write_lock:
+            try:
+                temp_path = f"{self.config_path}.tmp"
+                merged = False
+                while True:
+                    # someone else wrote the file since we last synced, keep their changes too
+                    state = self._stat()
+                    if state != self._disk_state and state is not None:
+                        theirs = self._read_disk()
+                        if theirs is not None:
+                            self._merge_external(theirs[0], prefer_theirs=False)
+                            with self._lock:
+                                data = json.dumps(self.config, indent=4)
+                            Metrics.inc("config_merges_total")
+                            merged = True
+
+                    # write a sibling and swap it in so readers never see a half written file
+                    with open(temp_path, 'w') as f:
+                        f.write(data)
+                        f.flush()
+                        stat = os.fstat(f.fileno())
+                    if self._stat() == state:
+                        break
+                    # replaced again while we were writing, merge that edit too before swapping in
+
+                os.replace(temp_path, self.config_path)
+                with self._lock:
+                    # from the file we wrote, a stat now could already see the next external edit
+                    self._disk_state, self._disk_text = (stat.st_mtime_ns, stat.st_size, stat.st_ino), data
+                self._write_error = None
+                Metrics.inc("config_writes_total")
+                Metrics.inc("config_write_bytes_total", len(data.encode()))
+                EventLog.record("config_write", bytes=len(data), merged=merged)
+            except IOError as e:
+                self._write_error = e
+                print(f"Error saving config: {e}")
+                EventLog.record("error", source="config", message=str(e))
+
+    @staticmethod
+    def assign(target, source):
+        # make target equal to source in place, dicts and lists other threads hold stay live
+        for key in [key for key in target if key not in source]:
+            del target[key]
+        for key, value in source.items():
+            current = target.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                Config.assign(current, value)
+            elif isinstance(current, list) and isinstance(value, list):
+                current[:] = value
+            else:
+                target[key] = value
 
-    def add_timer(self, duration, unit):
-        timer_title = f"{duration} {unit}"
-        self.config["timers"][timer_title] = {
-            "duration:": duration,
-            "unit:": unit
-        }
+    def _stat(self):
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_disk(self):
+        # (config, text), or None while the file is missing or mid-write
+        try:
+            with open(self.config_path, 'r') as f:
+                text = f.read()
+            config = json.loads(text)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error reading config: {e}")
+            return None
+        return (config, text) if isinstance(config, dict) else None
+
+    def _disk_base(self):
+        try:
+            return json.loads(self._disk_text) if self._disk_text else {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _merge_external(self, theirs, prefer_theirs=True):
+        # bring an external edit into the live config the same way for reload() and _write():
+        # migrated, repaired, merged with our changes and completed from the defaults. _write_lock held
+        Config.migrate_config(theirs)
+        with self._lock:
+            problems = self.validate_config(theirs)
+            merged = Config.merge_three_way(self._disk_base(), self.config, theirs, prefer_theirs=prefer_theirs)
+            merged = self.merge_dicts(self.default_config, merged)
+            Config.assign(self.config, merged)
+        for problem in problems:
+            print(f"Ignoring invalid setting: {problem}")
+        return merged, problems
+
+    def reload(self):
+        # pick up an external edit of the settings file, True when something was merged in
+        with self._write_lock:
+            state = self._stat()
+            if state is None or state == self._disk_state:
+                return False
+
+            disk = self._read_disk()
+            if disk is None:
+                # broken or half written, wait for the next change
+                self._disk_state = state
+                return False
+
+            theirs, text = disk
+            merged, problems = self._merge_external(theirs)
+            with self._lock:
+                self._disk_state, self._disk_text = state, text
+            Metrics.inc("config_reloads_total")
+            EventLog.record("config_reload", problems=len(problems))
+
+        if merged != theirs:
+            # our unsaved changes or repaired values go back to disk
+            self.save_config(self.config)
+        else:
+            self.publish()
+        return True
+
+    def validate_config(self, config):
+        # repair an externally edited config in place, invalid values fall back to the current ones
+        problems = []
+        current = self.config or self.default_config
+
+        records = config.get("presets", [])
+        presets = [Config.from_record(record) for record in records] if isinstance(records, list) else []
+        if not isinstance(records, list) or None in presets:
+            problems.append("presets")
+        config["presets"] = Config.merge_preset_records([], [preset for preset in presets if preset])
+
+        schedule = config.get("scheduled_times", {})
+        if not Config.is_valid_schedule(schedule):
+            problems.append("scheduled_times")
+            config["scheduled_times"] = copy.deepcopy(current.get("scheduled_times", {}))
+
+        preferences = config.get("preferences")
+        if not isinstance(preferences, dict):
+            problems.append("preferences")
+            config["preferences"] = preferences = copy.deepcopy(current.get("preferences", {}))
+        for key, value in list(preferences.items()):
+            if not Config.is_valid_preference(key, value, self.default_config["preferences"]):
+                problems.append(f"preferences.{key}")
+                preferences[key] = current.get("preferences", {}).get(key, self.default_config["preferences"].get(key))
+
+        http_api = config.get("http_api", {})
+        if not Config.is_valid_http_api(http_api):
+            problems.append("http_api")
+            config["http_api"] = copy.deepcopy(current.get("http_api", self.default_config["http_api"]))
+        return problems
+
+    @staticmethod
+    def is_valid_schedule(schedule):
+        if not isinstance(schedule, dict):
+            return False
+        days = schedule.get("days", [])
+        if not isinstance(days, list) or not all(day in DAYS for day in days):
+            return False
+        return DurationParser.parse_clock(schedule.get("sleep_at", "22:00")) is not None
+
+    @staticmethod
+    def is_valid_http_api(section):
+        if not isinstance(section, dict):
+            return False
+        port = section.get("port", 8765)
+        token = section.get("token")
+        return (isinstance(section.get("enabled", False), bool) and isinstance(section.get("host", ""), str)
+                and isinstance(port, int) and not isinstance(port, bool) and 0 <= port <= 65535
+                and (token is None or (isinstance(token, str) and len(token) >= 16)))
+
+    @staticmethod
+    def is_valid_preference(key, value, defaults):
+        if key not in defaults:
+            return True  # not ours to judge
+        if key == "theme":
+            return value in ("light", "dark")
+        if key == "startup_mode":
+            return value in ("login", "on_demand")
+        if key == "default_preset":
+            return value is None or (isinstance(value, int) and not isinstance(value, bool) and value > 0)
+        if key == "skip_version":
+            return value is None or isinstance(value, str)
+        return isinstance(value, bool)
+
+    @staticmethod
+    def merge_three_way(base, ours, theirs, prefer_theirs=True):
+        # keep every change either side made since base, conflicting scalars go to the preferred side
+        if ours == theirs or theirs == base:
+            return ours
+        if ours == base:
+            return theirs
+
+        if Config._is_records(base) and Config._is_records(ours) and Config._is_records(theirs):
+            # preset lists merge per record so an add on each side keeps both
+            merged = Config.merge_three_way(*({record["seconds"]: record for record in records}
+                                              for records in (base or [], ours, theirs)),
+                                            prefer_theirs=prefer_theirs)
+            return [merged[seconds] for seconds in sorted(merged)]
+
+        if isinstance(ours, dict) and isinstance(theirs, dict):
+            base = base if isinstance(base, dict) else {}
+            merged = {}
+            for key in list(ours) + [key for key in theirs if key not in ours]:
+                value = Config.merge_three_way(base.get(key, _MISSING), ours.get(key, _MISSING),
+                                               theirs.get(key, _MISSING), prefer_theirs=prefer_theirs)
+                if value is not _MISSING:
+                    merged[key] = value
+            return merged
+
+        return theirs if prefer_theirs else ours
+
+    @staticmethod
+    def _is_records(value):
+        return isinstance(value, list) and all(isinstance(record, dict) and "seconds" in record for record in value)
+
+    def subscribe(self, keys, callback):
+        # callback(snapshot) runs on the writing thread whenever one of the dotted keys changes, keep it short
+        subscription = (tuple(keys), callback)
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+
+    def publish(self):
+        # swap in a new snapshot if anything changed and tell the subscribers whose keys did,
+        # never called with _lock held so subscribers are free to take their own locks
+        with self._publish_lock:
+            previous = self.snapshot
+            with self._lock:
+                data = freeze(self.config) if isinstance(self.config, dict) else previous.data
+            if data == previous.data:
+                return previous
+
+            snapshot = ConfigSnapshot.from_config(previous.version + 1, self.config, data)
+            self.snapshot = snapshot
+            changed = [callback for keys, callback in list(self._subscribers)
+                       if any(previous.get(key) != snapshot.get(key) for key in keys)]
+
+        for callback in changed:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Error in config subscriber: {e}")
+        return snapshot
+
+    @staticmethod
+    def migrate_config(config):
+        # one-time upgrade from "{duration} {unit}" keyed timers to preset records
+        migrated = False
+        if "timers" in config:
+            presets = [Preset.from_title(title) for title in config.pop("timers") or {}]
+            config["presets"] = Config.merge_preset_records(config.get("presets", []),
+                                                             [preset for preset in presets if preset])
+            migrated = True
+
+        preferences = config.get("preferences", {})
+        if "default_option" in preferences:
+            default = Preset.from_title(preferences.pop("default_option") or "")
+            preferences["default_preset"] = default.seconds if default else None
+            migrated = True
+
+        return migrated
+
+    @staticmethod
+    def to_record(preset):
+        # labels are only stored when they differ from the generated title
+        if preset.label and preset.label != Preset.format_seconds(preset.seconds):
+            return {"seconds": preset.seconds, "label": preset.label}
+        return {"seconds": preset.seconds}
+
+    @staticmethod
+    def from_record(record):
+        if isinstance(record, dict) and isinstance(record.get("seconds"), int) and record["seconds"] > 0:
+            label = record.get("label")
+            return Preset(seconds=record["seconds"], label=label if isinstance(label, str) else None)
+        if isinstance(record, str):
+            return Preset.from_title(record)
+        return None
+
+    @staticmethod
+    def merge_preset_records(records, presets):
+        merged = {record["seconds"]: record for record in records}
+        for preset in presets:
+            merged.setdefault(preset.seconds, Config.to_record(preset))
+        return [merged[seconds] for seconds in sorted(merged)]
+
+    def add_preset(self, preset):
+        with self._lock:
+            records = self.config["presets"]
+            index = bisect.bisect_left(records, preset.seconds, key=lambda record: record["seconds"])
+            if index < len(records) and records[index]["seconds"] == preset.seconds:
+                return
+            records.insert(index, Config.to_record(preset))
+        self.save_config(self.config)
+
+    def remove_preset(self, seconds):
+        with self._lock:
+            records = self.config["presets"]
+            index = bisect.bisect_left(records, seconds, key=lambda record: record["seconds"])
+            if index >= len(records) or records[index]["seconds"] != seconds:
+                return
+            del records[index]
         self.save_config(self.config)
 
+    def get_presets(self):
+        return [Config.from_record(record) for record in self.config["presets"]]
+
+    def add_timer(self, duration, unit):
+        preset = Preset.from_title(f"{duration} {unit}")
+        if preset:
+            self.add_preset(preset)
+
     def delete_timers(self):
-        self.config["timers"] = {}
+        with self._lock:
+            self.config["presets"] = []
         self.save_config(self.config)
 
-    def set_default_option(self, duration, unit):
-        timer_title = f'{duration} ' + f'{unit}'
-        self.config["preferences"]["default_option"] = timer_title
+    def set_default_preset(self, seconds=None):
+        with self._lock:
+            self.config["preferences"]["default_preset"] = seconds
         self.save_config(self.config)
 
-    def get_timers(self):
-        return self.config["timers"]
+    def get_default_preset(self):
+        return self.config["preferences"]["default_preset"]
+
+    def import_presets(self, path, replace=False):
+        with open(path, 'r') as f:
+            library = json.load(f)
 
-    def get_default_option(self):
-        return self.config["preferences"]["default_option"]
+        # accept exported libraries, bare record lists and old style timer maps
+        if isinstance(library, dict):
+            library = library.get("presets", library.get("timers", library))
+
+        # titles are validated in one batch, invalid ones are reported back
+        titles = [record for record in library if isinstance(record, str)]
+        errors = DurationParser.errors(titles)
+        presets = [Config.from_record(record) for record in library]
+        presets = [preset for preset in presets if preset]
+
+        with self._lock:
+            self.config["presets"] = Config.merge_preset_records([] if replace else self.config["presets"], presets)
+        self.save_config(self.config)
+        return len(presets), errors
+
+    def export_presets(self, path):
+        with self._lock:
+            presets = list(self.config["presets"])
+        with open(path, 'w') as f:
+            json.dump({"version": 1, "presets": presets}, f, indent=4)
+        return len(presets)
 
     def get_theme(self):
         return self.config["preferences"]["theme"]
 
     def set_theme(self, theme=None):
-        self.config["preferences"]["theme"] = theme
+        with self._lock:
+            self.config["preferences"]["theme"] = theme
         self.save_config(self.config)
 
     def set_run_on_startup(self, option=None):
-        self.config["preferences"]["run_on_startup"] = option
+        with self._lock:
+            self.config["preferences"]["run_on_startup"] = option
         self.save_config(self.config)
 
     def get_run_on_startup(self):
         return self.config["preferences"]["run_on_startup"]
 
     def set_startup_in_background(self, option=None):
-        self.config["preferences"]["startup_in_background"] = option
+        with self._lock:
+            self.config["preferences"]["startup_in_background"] = option
         self.save_config(self.config)
 
     def get_startup_in_background(self):
         return self.config["preferences"]["startup_in_background"]
 
+    def set_startup_mode(self, mode="login"):
+        with self._lock:
+            self.config["preferences"]["startup_mode"] = mode
+        self.save_config(self.config)
+
+    def get_startup_mode(self):
+        return self.config["preferences"]["startup_mode"]
+
     def set_minimize_on_close(self, option=None):
-        self.config["preferences"]["minimize_on_close"] = option
+        with self._lock:
+            self.config["preferences"]["minimize_on_close"] = option
         self.save_config(self.config)
 
     def get_minimize_on_close(self):
         return self.config["preferences"]["minimize_on_close"]
 
     def set_scheduled(self, option=None):
-        self.config["preferences"]["scheduled"] = option
+        with self._lock:
+            self.config["preferences"]["scheduled"] = option
         self.save_config(self.config)
 
     def get_scheduled(self):
         return self.config["preferences"]["scheduled"]
 
     def add_schedule(self, schedules=None):
-        self.config["scheduled_times"] = schedules
+        with self._lock:
+            self.config["scheduled_times"] = schedules
         self.save_config(self.config)
 
     def set_schedule(self, schedule: dict):
-        self.config["scheduled_times"] = {
-            "days": schedule["days"],
-            "sleep_at": schedule["sleep_at"]
-        }
+        with self._lock:
+            self.config["scheduled_times"] = {
+                "days": schedule["days"],
+                "sleep_at": schedule["sleep_at"]
+            }
         self.save_config(self.config)
 
     def get_schedule(self) -> dict:
@@ -131,14 +618,16 @@ class Config:
         }
 
     def set_enable_notifications(self, option=None):
-        self.config["preferences"]["notifications"] = option
+        with self._lock:
+            self.config["preferences"]["notifications"] = option
         self.save_config(self.config)
 
     def get_enable_notifications(self):
         return self.config["preferences"]["notifications"]
 
     def set_enable_online_updater(self, option=None):
-        self.config["preferences"]["online_updater"] = option
+        with self._lock:
+            self.config["preferences"]["online_updater"] = option
         self.save_config(self.config)
 
     def get_enable_online_updater(self):
@@ -149,27 +638,48 @@ class Config:
         return self.config["preferences"][f"{preference}"]
 
     def set_preference(self, preference=None, option=None):
-        self.config["preferences"][f"{preference}"] = option
+        with self._lock:
+            self.config["preferences"][f"{preference}"] = option
+        self.save_config(self.config)
+
+    def get_http_api(self):
+        return {**self.default_config["http_api"], **self.config.get("http_api", {})}
+
+    def set_http_api(self, **changes):
+        with self._lock:
+            self.config["http_api"] = {**self.get_http_api(), **changes}
         self.save_config(self.config)
 
     def get_skip_version(self):
         return self.config["preferences"]["skip_version"]
 
     def set_skip_version(self, skip_version=None):
-        self.config["preferences"]["skip_version"] = skip_version
+        with self._lock:
+            self.config["preferences"]["skip_version"] = skip_version
         self.save_config(self.config)
 
     def check_for_update(self, window=None):
+        latest_version = self.get_available_update()
+        if latest_version:
+            self.show_update(latest_version, window=window)
+
+    def get_available_update(self):
+        # network only, safe to run off the tk thread; the newer release tag or None
         repo_link = "https://api.github.com/repos/denemir/Simple-Sleep-Timer/releases/latest"
-        response = requests.get(repo_link)
+        response = requests.get(repo_link, timeout=10)
 
         if response.status_code == 200:
             latest_release = response.json()
             latest_version = latest_release["tag_name"]
 
             if version.parse(latest_version) > version.parse(self.version) and latest_version != self.get_skip_version():
-                updater_gui = UpdaterGui(config=self, parent=window, latest_version=latest_version)
-                updater_gui.initialize_window()
+                return latest_version
+        return None
+
+    def show_update(self, latest_version, window=None):
+        if self.updater_gui is None:
+            self.updater_gui = UpdaterGui(config=self, parent=window)
+        self.updater_gui.show(latest_version=latest_version)
 
     def update_application(self, download_url):
         response = requests.get(download_url)
@@ -215,7 +725,8 @@ class Config:
             print("Failed to download the update.")
 
     def merge_missing_config_attributes(self):
-        self.config = self.merge_dicts(self.default_config, self.config)
+        with self._lock:
+            self.config = self.merge_dicts(self.default_config, self.config)
         self.save_config(self.config)
 
     def merge_dicts(self, default_dict, user_dict):
@@ -227,5 +738,11 @@ class Config:
                 else:
                     merged_dict[key] = user_dict[key]
             else:
-                merged_dict[key] = default_dict[key]
+                # never share the defaults' lists or dicts, assign() mutates the result in place
+                merged_dict[key] = copy.deepcopy(default_dict[key])
+
+        # keep user entries the defaults don't know about (custom timers, schedules)
+        for key in user_dict:
+            if key not in merged_dict:
+                merged_dict[key] = user_dict[key]
         return merged_dict
@@ -0,0 +1,126 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import struct
+import sys
+import threading
+
+from runtime import get_runtime
+
+# linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len, followed by the name
+
+
+class FileWatcher:
+    # calls on_change, on the runtime's config queue, after the file at path was written or replaced.
+    # Checks every interval on the runtime's timing thread. With inotify a check is one non-blocking
+    # read of its queue and on_change only follows real changes; without it every check calls on_change
+    # when poll is set, and the watcher does nothing otherwise. Blocking on the fd would take a worker
+    # away from the runtime's fixed set for good
+    POLL_INTERVAL = 1.0  # seconds between checks
+    SETTLE = 0.1  # editors write in several steps, let them finish
+
+    def __init__(self, path, on_change, interval=POLL_INTERVAL, runtime=None, poll=True):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.runtime = runtime
+        self.poll = poll
+        self.mode = None  # "inotify" or "poll" once started, None when there is nothing to watch with
+        self._fd = None
+        self._handle = None
+        self._lock = threading.Lock()  # stop() closes the fd, never while _check reads it
+
+    def start(self):
+        if self._handle is not None:
+            return
+
+        self.runtime = self.runtime or get_runtime()
+        with self._lock:
+            self._fd = self._open_inotify()
+            self.mode = "inotify" if self._fd is not None else "poll" if self.poll else None
+            if self.mode is not None:
+                self._handle = self.runtime.call_later(self.interval, self._check)
+
+    def stop(self):
+        with self._lock:
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _open_inotify(self):
+        # watch the directory, atomic saves replace the file and its inode with it
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            directory = os.path.dirname(os.path.abspath(self.path))
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _check(self):
+        # runs on the timing thread, never blocks
+        with self._lock:
+            if self._handle is None:
+                return  # stopped, the fd may be closed and its number reused
+
+            if self._fd is None:
+                self._submit()
+            elif os.fsencode(os.path.basename(self.path)) in self._read_names():
+                # coalesce the burst of events from one save
+                self.runtime.call_later(self.SETTLE, self._submit)
+            self._handle = self.runtime.call_later(self.interval, self._check)
+
+    def _read_names(self):
+        names = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except (BlockingIOError, OSError):
+            return names
+
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            names.add(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+        return names
+
+    def _submit(self):
+        try:
+            self.runtime.submit("config", self._run, block=False)
+        except (queue.Full, RuntimeError):
+            pass  # one is already waiting, or we are shutting down
+
+    def _run(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Error handling a change of {self.path}: {e}")
+
+
+class ConfigWatcher(FileWatcher):
+    # merges external edits of settings.json into the live config, polling reloads only when its
+    # stat changed
+    def __init__(self, config, interval=FileWatcher.POLL_INTERVAL, runtime=None):
+        super().__init__(config.config_path, config.reload, interval=interval, runtime=runtime)
+        self.config = config
@@ -0,0 +1,339 @@
+import hmac
+import json
+import os
+import secrets
+import socket
+import stat
+
+from clock import SYSTEM_CLOCK
+from durations import DurationError, DurationParser
+from presets import Preset
+from schedule_calendar import DAYS, ScheduleCalendar
+from scheduler import Scheduler
+from status_page import owned, runtime_path
+
+CONTROL_ENV = "SLEEPTIMER_CONTROL"  # path of the control file, 0 to not listen
+MAX_REQUEST = 1024 * 1024
+LISTEN_FDS_START = 3  # the first socket systemd passes on, see sd_listen_fds(3)
+
+USAGE = """commands:
+  start DURATION | pause | cancel | status
+  preset list | preset add DURATION | preset remove DURATION | preset default DURATION|none
+  schedule get | schedule set [days=Mon,Tue,...] [at=HH:MM] | schedule enable | schedule disable
+  preference get [NAME] | preference set NAME VALUE"""
+
+
+def control_path():
+    return os.environ.get(CONTROL_ENV) or runtime_path("control")
+
+
+def read_control_file(path=None):
+    # the control file's contents, OSError unless it is a regular file of ours nobody else can write
+    fd = os.open(path or control_path(), os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    with os.fdopen(fd, "r") as f:
+        info = os.fstat(f.fileno())
+        if not stat.S_ISREG(info.st_mode) or not owned(info) or (hasattr(os, "getuid") and info.st_mode & 0o022):
+            raise OSError(f"{f.name} is not a control file of this user")
+        return json.load(f)
+
+
+def activation_path():
+    # the unix socket systemd listens on for us in on demand mode, see startup.py
+    return runtime_path("sock")
+
+
+def inherited_socket():
+    # the listening socket systemd started us for, None when started any other way
+    try:
+        ours = os.environ.get("LISTEN_PID") == str(os.getpid()) and int(os.environ.get("LISTEN_FDS", "0")) >= 1
+    except ValueError:
+        ours = False
+    for name in ("LISTEN_PID", "LISTEN_FDS", "LISTEN_FDNAMES"):
+        os.environ.pop(name, None)  # not for our children
+    return socket.socket(fileno=LISTEN_FDS_START) if ours else None
+
+
+class CommandError(ValueError):
+    pass
+
+
+class Commands:
+    # runs sleeptimerctl commands, each a list of words, against a config and optionally a live timer.
+    # A run is one config transaction: nothing is saved unless every command succeeds, and timer
+    # commands wait until the config is committed.
+    def __init__(self, config, timer=None, scheduler=None):
+        self.config = config
+        self.timer = timer
+        self.scheduler = scheduler
+        self.calendar = None  # next fire without a live scheduler, a Scheduler would subscribe to the config
+
+    def run(self, commands):
+        results, deferred = [], []
+        with self.config.transaction():
+            for words in commands:
+                results.append(self.execute(list(words), deferred))
+        for action in deferred:
+            action()
+        return results
+
+    def execute(self, words, deferred):
+        if not words:
+            raise CommandError("empty command")
+        name, args = words[0], words[1:]
+        handler = getattr(self, f"do_{name}", None)
+        if handler is None:
+            raise CommandError(f"unknown command {name!r}\n{USAGE}")
+        return handler(args, deferred)
+
+    # timer
+    def require_timer(self, command):
+        if self.timer is None:
+            raise CommandError(f"{command} needs a running instance")
+        return self.timer
+
+    def do_start(self, args, deferred):
+        timer = self.require_timer("start")
+        seconds = self.parse_duration(" ".join(args))
+        deferred.append(lambda: timer.start_timer(selection=f"{seconds} sec"))
+        return {"started": seconds}
+
+    def do_pause(self, args, deferred):
+        deferred.append(self.require_timer("pause").pause_timer)
+
+    def do_cancel(self, args, deferred):
+        deferred.append(self.require_timer("cancel").cancel_timer)
+
+    def do_status(self, args, deferred):
+        snapshot = self.config.snapshot
+        status = {"instance": self.timer is not None, "scheduled": snapshot.scheduled}
+        if self.timer is not None:
+            countdown = self.timer.countdown
+            status.update(running=countdown.running, paused=countdown.paused, remaining=countdown.remaining,
+                          total=countdown.total)
+        if snapshot.scheduled:
+            if self.scheduler is not None:
+                fire = self.scheduler.get_next_fire(snapshot=snapshot)
+            else:
+                if self.calendar is None:
+                    self.calendar = ScheduleCalendar()
+                fire = self.calendar.next_fire(SYSTEM_CLOCK.now(), snapshot.days, snapshot.sleep_at or "",
+                                               grace=Scheduler.FIRE_GRACE)
+            status["next_fire"] = fire.astimezone().isoformat(timespec="seconds") if fire else None
+        return status
+
+    # presets
+    def do_preset(self, args, deferred):
+        action, rest = (args[0], args[1:]) if args else ("list", [])
+        if action == "list":
+            default = self.config.get_default_preset()
+            return [f"{preset.title}{' (default)' if preset.seconds == default else ''}"
+                    for preset in self.config.get_presets()]
+        if action == "add":
+            seconds = self.parse_duration(" ".join(rest))
+            self.config.add_preset(Preset(seconds=seconds))
+            return {"added": seconds}
+        if action == "remove":
+            seconds = self.parse_duration(" ".join(rest))
+            if seconds not in {preset.seconds for preset in self.config.get_presets()}:
+                raise CommandError(f"no preset of {Preset.format_seconds(seconds)}")
+            self.config.remove_preset(seconds)
+            return {"removed": seconds}
+        if action == "default":
+            text = " ".join(rest)
+            seconds = None if text.lower() in ("none", "") else self.parse_duration(text)
+            self.config.set_default_preset(seconds)
+            return {"default": seconds}
+        raise CommandError(f"unknown preset action {action!r}")
+
+    # schedule
+    def do_schedule(self, args, deferred):
+        action, rest = (args[0], args[1:]) if args else ("get", [])
+        if action == "get":
+            return {**self.config.get_schedule(), "enabled": self.config.get_scheduled()}
+        if action in ("enable", "disable"):
+            self.config.set_scheduled(action == "enable")
+            return {"enabled": action == "enable"}
+        if action == "set":
+            schedule = self.config.get_schedule()
+            for word in rest:
+                key, _, value = word.partition("=")
+                if key == "days":
+                    schedule["days"] = self.parse_days(value)
+                elif key == "at":
+                    clock = DurationParser.parse_clock(value)
+                    if clock is None:
+                        raise CommandError(f"not a time of day: {value!r}")
+                    schedule["sleep_at"] = f"{clock[0]:02d}:{clock[1]:02d}"
+                else:
+                    raise CommandError(f"unknown schedule field {key!r}, expected days= or at=")
+            self.config.set_schedule(schedule)
+            return schedule
+        raise CommandError(f"unknown schedule action {action!r}")
+
+    # preferences
+    def do_preference(self, args, deferred):
+        action, rest = (args[0], args[1:]) if args else ("get", [])
+        defaults = self.config.default_config["preferences"]
+        if action == "get":
+            if not rest:
+                return dict(self.config.config["preferences"])
+            self.check_preference(rest[0], defaults)
+            return {rest[0]: self.config.get_preference(rest[0])}
+        if action == "set":
+            if len(rest) != 2:
+                raise CommandError("usage: preference set NAME VALUE")
+            key, value = rest[0], self.parse_value(rest[1])
+            self.check_preference(key, defaults)
+            if not self.config.is_valid_preference(key, value, defaults):
+                raise CommandError(f"invalid value for {key}: {rest[1]!r}")
+            self.config.set_preference(key, value)
+            return {key: value}
+        raise CommandError(f"unknown preference action {action!r}")
+
+    # parsing
+    @staticmethod
+    def check_preference(key, defaults):
+        if key not in defaults:
+            raise CommandError(f"unknown preference {key!r}, one of {', '.join(defaults)}")
+
+    @staticmethod
+    def parse_duration(text):
+        result = DurationParser.parse(text)
+        if isinstance(result, DurationError):
+            raise CommandError(str(result))
+        return result.seconds
+
+    @staticmethod
+    def parse_days(text):
+        # full names or any unambiguous prefix, comma separated; "all" and "none" too
+        if text.lower() == "all":
+            return list(DAYS)
+        if text.lower() in ("none", ""):
+            return []
+        days = set()
+        for word in text.split(","):
+            found = [day for day in DAYS if day.lower().startswith(word.strip().lower())]
+            if len(found) != 1 or len(word.strip()) < 2:
+                raise CommandError(f"not a day: {word!r}")
+            days.update(found)
+        return [day for day in DAYS if day in days]
+
+    @staticmethod
+    def parse_value(text):
+        if not isinstance(text, str):
+            return text  # already typed, from the http api's json
+        lowered = text.lower()
+        if lowered in ("true", "on", "yes"):
+            return True
+        if lowered in ("false", "off", "no"):
+            return False
+        if lowered in ("none", "null"):
+            return None
+        try:
+            return int(text)
+        except ValueError:
+            return text
+
+
+class ControlServer:
+    # a localhost socket for sleeptimerctl. The port and a token go in a per user file only its owner
+    # can read; the accept loop occupies the runtime's control worker and wakes once a second to
+    # notice stop(). Started by systemd it serves the unix socket it was handed instead, that one sits
+    # in the user's runtime directory with mode 0600 so it needs no token
+    ACCEPT_TIMEOUT = 1.0
+    CLIENT_TIMEOUT = 5.0
+
+    def __init__(self, commands, runtime, path=None, listener=None):
+        self.commands = commands
+        self.runtime = runtime
+        self.path = path or control_path()
+        self.token = secrets.token_hex(16)
+        self._socket = listener
+        self._closed = False
+
+    @staticmethod
+    def from_environment(commands, runtime):
+        # None when disabled with SLEEPTIMER_CONTROL=0 or when the socket cannot be opened
+        if os.environ.get(CONTROL_ENV) == "0":
+            return None
+        try:
+            server = ControlServer(commands, runtime, listener=inherited_socket())
+            server.start()
+        except OSError as e:
+            print(f"Error starting control socket: {e}")
+            return None
+        return server
+
+    def start(self):
+        if self._socket is None:
+            self._socket = socket.create_server(("127.0.0.1", 0))
+        self._socket.settimeout(self.ACCEPT_TIMEOUT)
+        info = {"token": self.token, "pid": os.getpid(), "config_path": os.path.abspath(self.commands.config.config_path)}
+        if self.unix:
+            info["unix"] = self._socket.getsockname()
+        else:
+            info["port"] = self._socket.getsockname()[1]
+
+        # a fresh file only we can have created, whatever was planted under the temp name goes first
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0), 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(info, f)
+        os.replace(temp_path, self.path)
+        self.runtime.submit("control", self._serve)
+
+    @property
+    def unix(self):
+        return self._socket is not None and self._socket.family == socket.AF_UNIX
+
+    def stop(self):
+        self._closed = True
+        try:
+            ours = read_control_file(self.path).get("token") == self.token
+            if ours:
+                os.remove(self.path)
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    def _serve(self):
+        with self._socket:
+            while not self._closed:
+                try:
+                    connection, _ = self._socket.accept()
+                except socket.timeout:
+                    continue
+                except OSError:
+                    return
+                with connection:
+                    self._handle(connection)
+
+    def _handle(self, connection):
+        connection.settimeout(self.CLIENT_TIMEOUT)
+        try:
+            data = b""
+            while not data.endswith(b"\n") and len(data) < MAX_REQUEST:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            request = json.loads(data)
+            if not self.unix and not hmac.compare_digest(str(request.get("token", "")), self.token):
+                response = {"ok": False, "error": "bad token"}
+            else:
+                response = {"ok": True, "results": self.commands.run(request.get("commands", []))}
+        except CommandError as e:
+            response = {"ok": False, "error": str(e)}
+        except (OSError, ValueError) as e:
+            response = {"ok": False, "error": f"bad request: {e}"}
+        except Exception as e:
+            print(f"Error in control command: {e}")
+            response = {"ok": False, "error": f"internal error: {e}"}
+
+        try:
+            connection.sendall(json.dumps(response, default=str).encode() + b"\n")
+        except OSError:
+            pass
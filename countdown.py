@@ -0,0 +1,96 @@
+import math
+
+from events import CancelledEvent, PausedEvent, SleepRequestedEvent, StartedEvent, TickEvent, WarningEvent
+from metrics import Metrics
+
+
+class Countdown:
+    # countdown state without threads or sleeping, the threaded Timer and the asyncio
+    # front end both drive it with monotonic timestamps and publish what it returns
+    WARNING_FRACTION = 0.1  # warn when this share of the run is left
+
+    def __init__(self):
+        self.total = 0
+        self.remaining = 0  # whole seconds, what the display shows
+        self.running = False
+        self.paused = False
+        self.deadline = None  # monotonic time the run ends, None while paused or idle
+        self.left = 0.0  # exact seconds left while paused
+        self.warned = False
+        self.generation = 0  # bumped by every start, events and scheduled ticks carry it
+        self.drift = 0.0  # summed lateness of this run's ticks
+
+    def start(self, seconds, now):
+        self.generation += 1
+        self.total = seconds
+        self.remaining = seconds
+        self.running = True
+        self.paused = False
+        self.deadline = now + seconds
+        self.warned = False
+        self.drift = 0.0
+        Metrics.set("timer_drift_seconds", 0.0)
+        return [StartedEvent(total=seconds, run=self.generation)]
+
+    def pause(self, now):
+        # toggles, the partial second in progress is kept
+        if not self.running:
+            return []
+        if self.paused:
+            self.deadline = now + self.left
+        else:
+            self.left = max(self.deadline - now, 0.0)
+            self.deadline = None
+        self.paused = not self.paused
+        return [PausedEvent(paused=self.paused, remaining=self.remaining, run=self.generation)]
+
+    def cancel(self):
+        events = [CancelledEvent(remaining=self.remaining, run=self.generation)] if self.running else []
+        self.total = 0
+        self.remaining = 0
+        self.running = False
+        self.paused = False
+        self.deadline = None
+        self.warned = False
+        return events
+
+    def is_current(self, run):
+        # False for events and callbacks from a run that was cancelled or restarted since
+        return run == self.generation and self.running
+
+    def next_tick(self):
+        # monotonic time of the next whole second, None when nothing is due
+        if not self.running or self.paused:
+            return None
+        return self.deadline - (self.remaining - 1)
+
+    def advance(self, now):
+        # catch up to now, one tick event however many seconds were missed
+        due = self.next_tick()
+        if due is None or now < due:
+            return []
+
+        lateness = now - due
+        Metrics.inc("timer_ticks_total")
+        Metrics.observe("timer_tick_jitter_seconds", lateness)
+        self.drift += lateness
+        Metrics.set("timer_drift_seconds", self.drift)
+
+        self.remaining = max(math.ceil(self.deadline - now - 1e-6), 0)
+        events = [TickEvent(remaining=self.remaining, total=self.total, run=self.generation)]
+
+        if not self.warned and self.total > 0 and self.remaining <= self.total * self.WARNING_FRACTION:
+            self.warned = True
+            events.append(WarningEvent(source="timer", remaining=self.remaining, run=self.generation))
+
+        if self.remaining <= 0:
+            self.running = False
+            self.deadline = None
+            events.append(SleepRequestedEvent(source="timer", run=self.generation))
+        return events
+
+    def format_remaining(self):
+        hours = self.remaining // 3600
+        minutes = (self.remaining % 3600) // 60
+        seconds = self.remaining % 60
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,123 @@
+import datetime
+import functools
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+UNIT_SECONDS = {"h": 3600, "m": 60, "s": 1}
+
+# compiled once, shared by the timer, the gui and the preset registry
+_UNIT = r"(?P<unit>hours?|hrs?|h|minutes?|mins?|m|seconds?|secs?|s)\b"
+_TERM = re.compile(r"(?P<value>\d+(?:\.\d+)?)\s*" + _UNIT, re.IGNORECASE)
+_SEPARATOR = re.compile(r"(?:\s|,|\band\b)+", re.IGNORECASE)
+_CLOCK = re.compile(r"(?P<hours>\d+):(?P<minutes>[0-5]\d)(?::(?P<seconds>[0-5]\d))?")
+_TIME_OF_DAY = r"(?P<hour>[01]?\d|2[0-3]):(?P<minute>[0-5]\d)"
+_AT = re.compile(r"at\s+" + _TIME_OF_DAY, re.IGNORECASE)
+_CLOCK_TIME = re.compile(_TIME_OF_DAY)
+_NOISE = re.compile(r"[^\w\s:.,]")
+
+
+@dataclass(frozen=True)
+class Duration:
+    seconds: int
+    at: Optional[datetime.time] = None  # set for "at HH:MM" inputs
+
+
+@dataclass(frozen=True)
+class DurationError:
+    text: str
+    position: int
+    message: str
+
+    def __str__(self):
+        return f"{self.message} (at position {self.position} in {self.text!r})"
+
+
+class DurationParser:
+    FORMAT_HELP = "Enter a duration like \"90 min\", \"1h 30m\", \"90s\", \"1:30:00\" or a time like \"at 23:15\"."
+
+    @staticmethod
+    def parse(text, now=None):
+        # returns a Duration or a DurationError, never raises or shows ui
+        if not isinstance(text, str):
+            return DurationError(text=repr(text), position=0, message="Duration must be text")
+
+        cleaned = _NOISE.sub("", text).strip()
+        at = _AT.fullmatch(cleaned)
+        if at:
+            return DurationParser.until(int(at["hour"]), int(at["minute"]), now=now)
+        return DurationParser._parse_relative(cleaned)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _parse_relative(text):
+        if not text:
+            return DurationError(text=text, position=0, message="Duration is empty")
+
+        clock = _CLOCK.fullmatch(text)
+        if clock:
+            # h:mm or h:mm:ss
+            seconds = int(clock["hours"]) * 3600 + int(clock["minutes"]) * 60 + int(clock["seconds"] or 0)
+            return DurationParser._positive(text, seconds)
+
+        total = 0.0
+        position = 0
+        seen = set()
+        while position < len(text):
+            separator = _SEPARATOR.match(text, position)
+            if separator and separator.end() > position:
+                position = separator.end()
+                continue
+
+            term = _TERM.match(text, position)
+            if not term:
+                if text[position].isdigit():
+                    return DurationError(text=text, position=position, message="Missing unit (sec, min or hrs)")
+                return DurationError(text=text, position=position, message="Unrecognized duration")
+
+            unit = term["unit"][0].lower()
+            if unit in seen:
+                return DurationError(text=text, position=term.start("unit"), message="Unit given more than once")
+            seen.add(unit)
+
+            total += float(term["value"]) * UNIT_SECONDS[unit]
+            position = term.end()
+
+        return DurationParser._positive(text, round(total))
+
+    @staticmethod
+    def _positive(text, seconds):
+        if seconds <= 0:
+            return DurationError(text=text, position=0, message="Duration must be greater than zero")
+        return Duration(seconds=seconds)
+
+    @staticmethod
+    def until(hour, minute, now=None):
+        # seconds until the next local hour:minute, dst aware; now is an aware local time
+        if now is None:
+            now = datetime.datetime.now().astimezone()
+        target = now.replace(tzinfo=None, hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now.replace(tzinfo=None):
+            target += datetime.timedelta(days=1)
+        seconds = round((target.astimezone() - now).total_seconds())
+        return Duration(seconds=max(seconds, 1), at=datetime.time(hour, minute))
+
+    @staticmethod
+    def parse_clock(text):
+        # "HH:MM" time of day as (hour, minute), None when invalid
+        match = _CLOCK_TIME.fullmatch(text) if isinstance(text, str) else None
+        return (int(match["hour"]), int(match["minute"])) if match else None
+
+    @staticmethod
+    def parse_seconds(text):
+        result = DurationParser.parse(text)
+        return result.seconds if isinstance(result, Duration) else None
+
+    @staticmethod
+    def parse_many(texts):
+        # batch validation for preset libraries: (text, Duration | DurationError) pairs
+        return [(text, DurationParser.parse(text)) for text in texts]
+
+    @staticmethod
+    def errors(texts):
+        return [result for _, result in DurationParser.parse_many(texts) if isinstance(result, DurationError)]
@@ -0,0 +1,248 @@
+import argparse
+import collections
+import dataclasses
+import datetime
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_PATH = "events.jsonl"
+LOG_ENV = "SLEEPTIMER_EVENT_LOG"  # path of the log, 0 to not keep one
+MAX_BYTES = 1024 * 1024  # rotate once the live file would grow past this
+BACKUPS = 5  # events.jsonl.1 is the newest rotated file
+FLUSH_INTERVAL = 5.0  # seconds between background writes
+FLUSH_SIZE = 256  # entries that trigger a write before the interval is up
+NIGHT_START_HOUR = 12  # a night runs from noon to noon, sleeps after midnight count for the evening before
+
+# bus event class name -> log kind, ticks are left out on purpose
+EVENT_KINDS = {
+    "StartedEvent": "timer_start",
+    "PausedEvent": "timer_pause",
+    "CancelledEvent": "timer_cancel",
+    "WarningEvent": "warning",
+    "SleepRequestedEvent": "sleep_requested",
+}
+
+
+class EventLog:
+    # append-only jsonl of what the app did, recording is a dict and a list append,
+    # serialization and disk writes happen on the runtime's log queue
+    _path = None  # None until start(), record() is a no-op until then
+    _buffer = []
+    _lock = threading.Lock()
+    _write_lock = threading.Lock()
+    _runtime = None
+    _handle = None
+    _flush_queued = False
+    max_bytes = MAX_BYTES
+    backups = BACKUPS
+
+    @staticmethod
+    def start(runtime, path=None):
+        # False when disabled through SLEEPTIMER_EVENT_LOG=0
+        path = path or os.environ.get(LOG_ENV) or LOG_PATH
+        if path == "0":
+            return False
+        EventLog._path = path
+        EventLog._runtime = runtime
+        EventLog._handle = runtime.call_later(FLUSH_INTERVAL, EventLog._on_interval)
+        return True
+
+    @staticmethod
+    def stop():
+        # write out whatever is left on the calling thread, later records are dropped
+        if EventLog._handle is not None:
+            EventLog._handle.cancel()
+            EventLog._handle = None
+        EventLog.flush()
+        EventLog._path = None
+
+    @staticmethod
+    def record(kind, **fields):
+        if EventLog._path is None:
+            return
+        entry = {"ts": time.time(), "kind": kind, **fields}
+        with EventLog._lock:
+            EventLog._buffer.append(entry)
+            submit = len(EventLog._buffer) >= FLUSH_SIZE and not EventLog._flush_queued
+            if submit:
+                EventLog._flush_queued = True
+        if submit:
+            EventLog._submit_flush()
+
+    @staticmethod
+    def record_event(event):
+        # sync bus subscriber for the types in EVENT_KINDS
+        kind = EVENT_KINDS.get(type(event).__name__)
+        if kind is None or EventLog._path is None:
+            return
+        fields = {field.name: getattr(event, field.name) for field in dataclasses.fields(event)
+                  if field.name != "created"}
+        EventLog.record(kind, **fields)
+
+    @staticmethod
+    def _on_interval():
+        # timing thread, never blocks
+        if EventLog._path is None:
+            return
+        with EventLog._lock:
+            submit = bool(EventLog._buffer) and not EventLog._flush_queued
+            if submit:
+                EventLog._flush_queued = True
+        if submit:
+            EventLog._submit_flush()
+        EventLog._handle = EventLog._runtime.call_later(FLUSH_INTERVAL, EventLog._on_interval)
+
+    @staticmethod
+    def _submit_flush():
+        try:
+            EventLog._runtime.submit("log", EventLog.flush, block=False)
+        except (queue.Full, RuntimeError):
+            # stays buffered, the next interval or stop() writes it
+            with EventLog._lock:
+                EventLog._flush_queued = False
+
+    @staticmethod
+    def flush():
+        with EventLog._lock:
+            entries, EventLog._buffer = EventLog._buffer, []
+            EventLog._flush_queued = False
+        path = EventLog._path
+        if not entries or path is None:
+            return
+
+        lines = [(json.dumps(entry, default=str) + "\n").encode() for entry in entries]
+        with EventLog._write_lock:
+            try:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    size = 0
+                # one write per file, rotating as often as a big batch needs
+                chunk = []
+                for line in lines:
+                    if size and size + len(line) > EventLog.max_bytes:
+                        if chunk:
+                            EventLog._append(path, chunk)
+                            chunk = []
+                        EventLog.rotate(path, EventLog.backups)
+                        size = 0
+                    chunk.append(line)
+                    size += len(line)
+                EventLog._append(path, chunk)
+            except OSError as e:
+                print(f"Error writing event log: {e}")
+
+    @staticmethod
+    def _append(path, lines):
+        with open(path, "ab") as f:
+            f.write(b"".join(lines))
+
+    @staticmethod
+    def rotate(path, backups):
+        # events.jsonl -> .1 -> .2 ..., the oldest falls off
+        for index in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+
+# query tool, streams the files line by line so the history never has to fit in memory
+
+def log_files(path, backups=BACKUPS):
+    # oldest first
+    rotated = [f"{path}.{index}" for index in range(backups, 0, -1)]
+    return [file for file in rotated + [path] if os.path.exists(file)]
+
+
+def read_entries(paths):
+    for path in paths:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a crash
+
+
+def matches(entry, kinds=None, since=None, until=None, where=None):
+    if kinds and entry.get("kind") not in kinds:
+        return False
+    ts = entry.get("ts", 0)
+    if since is not None and ts < since:
+        return False
+    if until is not None and ts >= until:
+        return False
+    return all(str(entry.get(key)) == value for key, value in (where or {}).items())
+
+
+def group_key(entry, by):
+    if by == "kind":
+        return entry.get("kind")
+    local = datetime.datetime.fromtimestamp(entry.get("ts", 0))
+    if by == "night":
+        return (local - datetime.timedelta(hours=NIGHT_START_HOUR)).date().isoformat()
+    if by == "day":
+        return local.date().isoformat()
+    if by == "hour":
+        return f"{local.hour:02d}:00"
+    return str(entry.get(by))
+
+
+def parse_time(text):
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def parse_condition(text):
+    # argparse reports the message through parser.error, usage and exit status 2
+    field, sep, value = text.partition("=")
+    if not sep or not field:
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE, got {text!r}")
+    return field, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Filter and aggregate the Simple Sleep Timer event log")
+    parser.add_argument("command", nargs="?", choices=("show", "count"), default="show")
+    parser.add_argument("--path", default=os.environ.get(LOG_ENV) or LOG_PATH)
+    parser.add_argument("--kind", action="append", help="only these kinds, repeatable")
+    parser.add_argument("--where", action="append", default=[], type=parse_condition, metavar="FIELD=VALUE",
+                        help="only entries whose field equals value, e.g. ok=True, repeatable")
+    parser.add_argument("--days", type=float, help="only the last n days")
+    parser.add_argument("--since", type=parse_time, help="local ISO date or time")
+    parser.add_argument("--until", type=parse_time, help="local ISO date or time")
+    parser.add_argument("--by", default="kind", help="count grouping: kind, night, day, hour or a field name")
+    args = parser.parse_args(argv)
+
+    since = args.since
+    if args.days is not None:
+        since = max(since or 0, time.time() - args.days * 86400)
+    where = dict(args.where)
+
+    entries = (entry for entry in read_entries(log_files(args.path))
+               if matches(entry, set(args.kind or ()), since, args.until, where))
+
+    try:
+        if args.command == "show":
+            for entry in entries:
+                stamp = datetime.datetime.fromtimestamp(entry.pop("ts", 0)).strftime("%Y-%m-%d %H:%M:%S")
+                kind = entry.pop("kind", "?")
+                print(f"{stamp}  {kind:<16} {json.dumps(entry, default=str)}")
+        else:
+            counts = collections.Counter(group_key(entry, args.by) for entry in entries)
+            for key in sorted(counts, key=str):
+                print(f"{key}\t{counts[key]}")
+            print(f"total\t{sum(counts.values())}")
+    except BrokenPipeError:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
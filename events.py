@@ -0,0 +1,167 @@
+import collections
+import datetime
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from metrics import Metrics
+from runtime import get_runtime
+
+SYNC = "sync"  # called on the publishing thread, keep it cheap
+QUEUED = "queued"  # every event, in order, on the runtime's events queue
+LATEST = "latest"  # only the newest pending event, on the runtime's events queue
+POLICIES = (SYNC, QUEUED, LATEST)
+
+
+@dataclass(frozen=True)
+class Event:
+    created: float = field(default_factory=time.monotonic, kw_only=True)
+    run: int = field(default=0, kw_only=True)  # countdown generation, 0 for schedule events
+
+
+@dataclass(frozen=True)
+class StartedEvent(Event):
+    total: int
+
+
+@dataclass(frozen=True)
+class TickEvent(Event):
+    remaining: int
+    total: int
+
+
+@dataclass(frozen=True)
+class PausedEvent(Event):
+    paused: bool  # False when resumed
+    remaining: int
+
+
+@dataclass(frozen=True)
+class CancelledEvent(Event):
+    remaining: int
+
+
+@dataclass(frozen=True)
+class WarningEvent(Event):
+    source: str  # "timer" or "schedule"
+    remaining: int
+
+
+@dataclass(frozen=True)
+class ScheduleArmedEvent(Event):
+    fire: Optional[datetime.datetime]  # utc, None when disarmed
+
+
+@dataclass(frozen=True)
+class SleepRequestedEvent(Event):
+    source: str
+
+
+class Subscription:
+    def __init__(self, event_type, callback, policy=SYNC, maxsize=1024):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown delivery policy {policy!r}")
+        self.event_type = event_type
+        self.callback = callback
+        self.policy = policy
+        self.pending = collections.deque(maxlen=1 if policy == LATEST else maxsize)
+        self.scheduled = False  # already in the dispatch queue
+        self.dropped = 0
+
+    def offer(self, event):
+        # never blocks, a full queue loses its oldest event
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+            if self.policy == QUEUED:
+                Metrics.inc("events_dropped_total")
+        self.pending.append(event)
+
+
+class EventBus:
+    def __init__(self, name="events", runtime=None):
+        self.name = name
+        self.runtime = runtime  # queued and latest deliveries run on its events queue
+        self._subscribers = {}  # event type -> tuple of subscriptions, replaced on change
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._ready = collections.deque()  # subscriptions with pending events
+        self._draining = False  # a drain job is queued or running
+        self._closed = False
+
+    def subscribe(self, event_type, callback, policy=SYNC, maxsize=1024):
+        # subscribing to Event receives everything
+        subscription = Subscription(event_type, callback, policy=policy, maxsize=maxsize)
+        with self._lock:
+            self._subscribers[event_type] = self._subscribers.get(event_type, ()) + (subscription,)
+        if policy != SYNC and self.runtime is None:
+            self.runtime = get_runtime()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.event_type, ())
+            self._subscribers[subscription.event_type] = tuple(s for s in subscriptions if s is not subscription)
+            subscription.pending.clear()
+
+    def publish(self, event):
+        # the publisher only pays for sync subscribers and a deque append per async one
+        submit = False
+        for event_type in type(event).__mro__:
+            for subscription in self._subscribers.get(event_type, ()):
+                if subscription.policy == SYNC:
+                    self._deliver(subscription, event)
+                    continue
+
+                with self._lock:
+                    subscription.offer(event)
+                    if not subscription.scheduled:
+                        subscription.scheduled = True
+                        self._ready.append(subscription)
+                    if not self._draining and not self._closed:
+                        self._draining = submit = True
+
+        if submit:
+            try:
+                self.runtime.submit("events", self._drain, block=False)
+            except queue.Full:
+                # events stay pending, the next publish tries again
+                with self._lock:
+                    self._draining = False
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._ready:
+                    self._draining = False
+                    self._condition.notify_all()
+                    return
+                subscription = self._ready.popleft()
+                events = list(subscription.pending)
+                subscription.pending.clear()
+                subscription.scheduled = False
+
+            for event in events:
+                self._deliver(subscription, event)
+
+    @staticmethod
+    def _deliver(subscription, event):
+        try:
+            subscription.callback(event)
+        except Exception as e:
+            print(f"Error in {type(event).__name__} subscriber: {e}")
+
+    def close(self, timeout=None):
+        # wait for what is already queued to be delivered, later events are dropped
+        with self._lock:
+            self._closed = True
+            if self._ready and not self._draining:
+                self._draining = True
+                submit = True
+            else:
+                submit = False
+        if submit:
+            self.runtime.submit("events", self._drain)
+        with self._lock:
+            self._condition.wait_for(lambda: not self._draining, timeout)
@@ -1,19 +1,23 @@
 import tkinter
+import tkinter.filedialog
 import tkinter.messagebox
 import webbrowser
 from tkinter import ttk
 from TkToolTip import ToolTip
 import sv_ttk
-import re
 
+from durations import DurationError, DurationParser
 from gui_common import GuiCommon
+from metrics import Metrics
 from preferences_gui import PreferencesGui
+from preset_picker import PresetPicker
 from scheduler_gui import SchedulerGui
 
 
 class GUI:
     def __init__(self, prog=None, config=None, default_option=None, theme=None, version=None):
         self.root = tkinter.Tk()
+        GuiCommon.set_app_icon(self.root)  # before any modal is built
         self.prog = prog
         self.config = config
         self.options = self.prog.get_all_options()
@@ -33,17 +37,30 @@ class GUI:
         self.add_timer_button = None
         self.top_frame = None
         self.menu_bar = None
+        self.tray_icon = None  # built on the first minimize to tray, see Minimize
 
         # timer display
         self.timer_display = None
+        self.display_text = None
+        self.display_value = "00:00:00"
         self.running = False
         self.paused = False
 
+        # view state, see render_view
+        self.view_state = None
+        self.views = {}  # (running, paused, editing) -> [(widget, property, value)]
+        self.applied = {}  # (widget, property) -> value currently on screen
+        self.edit_tooltip = None
+
         # add timer modal
         self.input_box = None
         self.unit_dropdown = None
         self.save_button = None
 
+        # modals, built on first use
+        self.preferences_gui = None
+        self.scheduler_gui = None
+
         # schedule modal
         self.schedule_menu = None
         self.scheduled = self.config.get_scheduled()
@@ -66,8 +83,6 @@ class GUI:
         self.root.minsize(250, 75)
         self.root.resizable(False, False)
         GuiCommon.center_window(self.root)
-        icon_path = GuiCommon.resource_path('icon.ico')
-        self.root.iconbitmap(icon_path)
         self.set_theme()
 
         # add menu options & buttons
@@ -77,6 +92,8 @@ class GUI:
         file_menu = tkinter.Menu(self.menu_bar, tearoff=0)
         file_menu.add_cascade(label="Preferences", command=self.show_preferences_menu)
         file_menu.add_cascade(label="Toggle Theme", command=self.toggle_theme)
+        file_menu.add_cascade(label="Import Presets...", command=self.import_presets)
+        file_menu.add_cascade(label="Export Presets...", command=self.export_presets)
         file_menu.add_cascade(label="Version: " + self.version, state="disabled")
         file_menu.add_separator()
         file_menu.add_cascade(label="Check me out!", command=self.github)
@@ -95,15 +112,7 @@ class GUI:
         self.menu_bar.add_cascade(label="Help", menu=help_menu)
 
         # top frame
-        ttk.Label(self.top_frame, text="Timers:").pack(anchor="w")
-        self.selected_timer = tkinter.StringVar(value="90 min" if self.default_option is None else self.default_option)
-        self.timer_dropdown = ttk.Combobox(self.top_frame, textvariable=self.selected_timer,
-                                           values=self.options,
-                                           state="readonly", width=18)
-        self.timer_dropdown.bind("<<ComboboxSelected>>", self.on_timer_select)
-        self.timer_dropdown.pack(side="left")
-
-        self.initialize_edit_buttons()
+        self.initialize_top_frame()
 
         # bottom frame
         self.start_button = ttk.Button(self.root, text='Start Timer', command=self.start_timer, state='enabled')
@@ -115,6 +124,8 @@ class GUI:
         self.pause_button = ttk.Button(self.root, text='Pause Timer', command=self.pause_timer, state='disabled')
         self.pause_button.pack(padx=3, pady=3, side="left")
 
+        self.render_view()
+
         self.root.bind('<Return>', self.start_timer)
         self.root.bind('<Alt_L>', self.show_config_menu)
         self.root.mainloop()
@@ -137,28 +148,28 @@ class GUI:
             )
 
     def start_timer(self, event=None):
+        result = DurationParser.parse(self.selected_timer.get())
+        if isinstance(result, DurationError):
+            tkinter.messagebox.showerror("Invalid Input", f"{result.message}.\n\n{DurationParser.FORMAT_HELP}")
+            return
+
         self.prog.start_timer(selection=self.selected_timer.get())
         if not self.running:
-            cleaned_timer = re.sub(r'[^\w\s]', '', self.selected_timer.get())
-            duration, unit = cleaned_timer.split()
-
-            if int(duration) > 0:
+            if result.seconds > 0:
                 self.running = True
-                self.reinitialize_top_frame()
-                self.toggle_start_stop_buttons()
                 self.editing = False
+                self.render_view()
 
     def cancel_timer(self):
         self.running = False
         self.paused = False
-        self.reinitialize_top_frame()
-        self.toggle_start_stop_buttons()
+        self.render_view()
         self.prog.cancel_timer()
 
     def pause_timer(self):
         self.prog.pause_timer()
         self.paused = not self.paused
-        self.toggle_start_stop_buttons()
+        self.render_view()
 
     def add_timer(self):
         add_timer_gui = AddTimerGUI(parent=self.root, callback=self.save_timer)
@@ -166,49 +177,74 @@ class GUI:
 
     def edit_timer(self):
         self.editing = not self.editing
-        self.initialize_edit_buttons()
+        self.render_view()
 
     def clear_timers(self):
         self.prog.clear_timers()
         self.options = self.prog.get_all_options()
-        self.timer_dropdown["values"] = self.options
+        self.timer_dropdown.refresh()
 
     def set_default_timer(self):
-        if self.default_option:
-            self.default_option = self.default_option.replace(f" {self.star_symbol}", "")
+        preset = self.prog.find_preset(self.selected_timer.get())
+        if preset is None:
+            return
 
         # add a star to the default option to better highlight it
-        self.default_option = self.selected_timer.get()
-        if not self.default_option.endswith(f" {self.star_symbol}"):
-            self.default_option = self.default_option + f" {self.star_symbol}"
+        self.default_option = f"{preset.title} {self.star_symbol}"
+        self.prog.set_default_timer(preset)
+
+    def import_presets(self):
+        path = tkinter.filedialog.askopenfilename(parent=self.root, title="Import Presets",
+                                                  filetypes=[("Preset library", "*.json")])
+        if not path:
+            return
+
+        try:
+            count, errors = self.prog.import_presets(path)
+        except (OSError, ValueError, TypeError) as e:
+            tkinter.messagebox.showerror("Import Failed", f"Could not import presets: {e}")
+            return
+        self.options = self.prog.get_all_options()
+        self.timer_dropdown.refresh()
+
+        if errors:
+            skipped = "\n".join(str(error) for error in errors[:5])
+            tkinter.messagebox.showwarning("Import Presets",
+                                           f"Imported {count} presets, skipped {len(errors)}:\n{skipped}")
+
+    def export_presets(self):
+        path = tkinter.filedialog.asksaveasfilename(parent=self.root, title="Export Presets",
+                                                    defaultextension=".json",
+                                                    filetypes=[("Preset library", "*.json")])
+        if not path:
+            return
 
-        timer = self.parse_timer()
-        self.prog.set_default_timer(duration=timer["duration"], unit=timer["unit"])
+        try:
+            self.prog.export_presets(path)
+        except OSError as e:
+            tkinter.messagebox.showerror("Export Failed", f"Could not export presets: {e}")
 
     def save_timer(self, duration, unit):
         self.prog.save_timer(duration=duration, unit=unit)
         self.options = self.prog.get_all_options()
-        self.timer_dropdown["values"] = self.options
+        self.timer_dropdown.refresh()
 
     def on_timer_select(self, event):
         self.timer_dropdown.selection_clear()
 
     def toggle_start_stop_buttons(self):
-        if self.running and not self.paused:
-            self.stop_button["state"] = "enabled"
-            self.start_button["state"] = "disabled"
-            self.pause_button["state"] = "enabled"
-            self.pause_button["text"] = "Pause Timer"
-        elif self.running and self.paused:
-            self.stop_button["state"] = "enabled"
-            self.start_button["state"] = "disabled"
-            self.pause_button["state"] = "enabled"
-            self.pause_button["text"] = "Unpause Timer"
-        elif not self.running:
-            self.stop_button["state"] = "disabled"
-            self.start_button["state"] = "enabled"
-            self.pause_button["state"] = "disabled"
-            self.pause_button["text"] = "Pause Timer"
+        self.render_view()
+
+    def sync_timer_state(self, running, paused):
+        # the timer changed outside this window, see App.on_timer_state
+        if (running, paused) == (self.running, self.paused):
+            return
+        if running and not self.running:
+            self.editing = False
+        self.running = running
+        self.paused = paused
+        if self.view_state is not None:
+            self.render_view()
 
     def toggle_theme(self):
         if self.theme == "light":
@@ -230,8 +266,9 @@ class GUI:
         self.prog.scheduler.restart()
 
     def show_scheduler(self):
-        scheduler_gui = SchedulerGui(parent=self.root, config=self.config, callback=self.on_schedule_saved) # replace callback with save schedule funct
-        scheduler_gui.initialize_gui()
+        if self.scheduler_gui is None:
+            self.scheduler_gui = SchedulerGui(parent=self.root, config=self.config, callback=self.on_schedule_saved)
+        self.scheduler_gui.show()
 
     def on_schedule_saved(self):
         self.scheduled = self.config.get_scheduled()
@@ -240,113 +277,106 @@ class GUI:
         self.prog.scheduler.restart()
 
     def update_timer_display(self):
+        with Metrics.timed("gui_update_timer_display_seconds"):
+            self._update_timer_display()
+
+    def _update_timer_display(self):
         time_remaining = self.prog.get_remaining_time()
-        hours, minutes, seconds = map(int, time_remaining.split(':'))
 
-        if self.timer_display is not None:
-            self.timer_display["state"] = "normal"
-            self.timer_display.delete(0, "end")
-            self.timer_display.insert(0, f"{time_remaining}")
-            self.timer_display["state"] = "readonly"
+        # only touch tk when the text actually changes
+        if time_remaining != self.display_value:
+            self.display_value = time_remaining
+            self.display_text.set(time_remaining)
 
-        if (hours + minutes + seconds) <= 0:
+        if time_remaining == "00:00:00":
             self.running = False
-            self.reinitialize_top_frame()
+            self.render_view()
 
     def refresh_timers(self):
         self.options = self.prog.get_all_options()
-        self.selected_timer = tkinter.StringVar(value=self.default_option)
-        self.timer_dropdown["values"] = self.options
-        self.timer_dropdown["textvariable"] = self.selected_timer
-
-    def initialize_edit_buttons(self):
-        # clear existing buttons
-        if self.add_timer_button:
-            self.add_timer_button.pack_forget()
-        self.clear_edit_buttons()
-
-        # if editing, initialize editing buttons
-        if not self.editing:
-            self.edit_button = ttk.Button(self.top_frame, text="🖉",
-                                          command=self.edit_timer)
-            self.edit_button.pack(padx=3, side="left")
-            ToolTip(self.edit_button, text="Edit Timer", delay=.75)
-
-            self.add_timer_button = ttk.Button(self.top_frame, text='+', command=self.add_timer, state='enabled')
-            self.add_timer_button.pack(side="left")
-            ToolTip(self.add_timer_button, text="Add Timer", delay=.75)
-        elif self.editing:
-            self.edit_button = ttk.Button(self.top_frame, text="✍", style="Small.TButton",
-                                          command=self.edit_timer)
-            self.edit_button.pack(padx=(3, 0), side="left")
-            ToolTip(self.edit_button, text="Hide Edit Timer", delay=.75)
-
-            self.remove_button = ttk.Button(self.top_frame, text="🗑", style="Small.TButton",
-                                            command=None)
-            self.remove_button.pack(padx=3, side="left")
-            ToolTip(self.remove_button, text="Remove Timer", delay=.75)
-
-            self.favorite_button = ttk.Button(self.top_frame, text="★", style="Small.TButton",
-                                              command=self.set_default_timer)
-            self.favorite_button.pack(side="left")
-            ToolTip(self.favorite_button, text="Set Timer as Default", delay=.75)
-
-    def reinitialize_top_frame(self):
-        # clear top frame
-        if self.timer_dropdown is not None:
-            self.timer_dropdown.pack_forget()
-        if self.timer_display is not None:
-            self.timer_display.pack_forget()
-        self.clear_edit_buttons()
-        self.add_timer_button.pack_forget()
-
-        # reinitialize top frame
-        if self.running:
-            # add timer display and re-add add button
-            self.timer_display = ttk.Entry(self.top_frame, state="disabled", width=29)
-            self.timer_display.pack(side="left")
-            self.add_timer_button = ttk.Button(self.top_frame, text='+', command=self.add_timer, state='enabled')
-            self.add_timer_button.pack(padx=3, side="left")
-
-            # update timer
-            self.update_timer_display()
-        elif not self.running:
-            # add timer dropdown and re-add add button
-            self.selected_timer = tkinter.StringVar(
-                value=self.selected_timer.get())
-            self.timer_dropdown = ttk.Combobox(self.top_frame, textvariable=self.selected_timer,
-                                               values=self.options,
-                                               state="readonly", width=24)
-            self.timer_dropdown.bind("<<ComboboxSelected>>", self.on_timer_select)
-            self.timer_dropdown.pack(side="left")
-            self.initialize_edit_buttons()
-
-    def clear_edit_buttons(self):
-        if self.edit_button:
-            self.edit_button.pack_forget()
-        if self.remove_button:
-            self.remove_button.pack_forget()
-        if self.favorite_button:
-            self.favorite_button.pack_forget()
-
-    def parse_timer(self):
-        # check format
-        try:
-            match = re.match(r"(\d+)\s*(min|hrs?|sec)", self.selected_timer.get().lower())
-            if not match:
-                raise ValueError(f"Invalid duration format: {self.selected_timer.get()}")
-        except ValueError as e:
-            tkinter.messagebox.showerror(
-                "Invalid Input",
-                "Please enter a valid time in this format: { Duration } { Units }"
-            )
-            return None
+        self.selected_timer.set(self.default_option)
+        self.timer_dropdown.refresh()
 
-        # parse values
-        duration, unit = match.groups()
-        duration = int(duration)
+    def initialize_top_frame(self):
+        # every widget is created once, render_view only shows, hides and reconfigures them
+        ttk.Label(self.top_frame, text="Timers:").grid(row=0, column=0, columnspan=5, sticky="w")
 
-        return {"duration": duration, "unit": unit}
+        self.selected_timer = tkinter.StringVar(value="90 min" if self.default_option is None else self.default_option)
+        self.timer_dropdown = PresetPicker(self.top_frame, registry=self.prog.presets,
+                                           textvariable=self.selected_timer, width=18)
+        self.timer_dropdown.bind("<<PresetSelected>>", self.on_timer_select)
+        self.timer_dropdown.grid(row=1, column=0, sticky="w")
+
+        self.display_text = tkinter.StringVar(value=self.display_value)
+        self.timer_display = ttk.Entry(self.top_frame, textvariable=self.display_text, state="readonly", width=29)
+        self.timer_display.grid(row=1, column=0, sticky="w")
+
+        self.edit_button = ttk.Button(self.top_frame, text="🖉", command=self.edit_timer)
+        self.edit_button.grid(row=1, column=1, padx=(3, 0))
+        self.edit_tooltip = ToolTip(self.edit_button, text="Edit Timer", delay=.75)
+
+        self.add_timer_button = ttk.Button(self.top_frame, text='+', command=self.add_timer, state='enabled')
+        self.add_timer_button.grid(row=1, column=2, padx=(3, 0))
+        ToolTip(self.add_timer_button, text="Add Timer", delay=.75)
+
+        self.remove_button = ttk.Button(self.top_frame, text="🗑", style="Small.TButton", command=None)
+        self.remove_button.grid(row=1, column=3, padx=(3, 0))
+        ToolTip(self.remove_button, text="Remove Timer", delay=.75)
+
+        self.favorite_button = ttk.Button(self.top_frame, text="★", style="Small.TButton",
+                                          command=self.set_default_timer)
+        self.favorite_button.grid(row=1, column=4, padx=(3, 0))
+        ToolTip(self.favorite_button, text="Set Timer as Default", delay=.75)
+
+    def describe_view(self, running, paused, editing):
+        idle = not running
+        return {
+            "timer_dropdown": {"visible": idle},
+            "timer_display": {"visible": running},
+            "edit_button": {"visible": idle, "text": "✍" if editing else "🖉",
+                            "style": "Small.TButton" if editing else "TButton"},
+            "edit_tooltip": {"text": "Hide Edit Timer" if editing else "Edit Timer"},
+            "add_timer_button": {"visible": running or not editing},
+            "remove_button": {"visible": idle and editing},
+            "favorite_button": {"visible": idle and editing},
+            "start_button": {"state": "disabled" if running else "enabled"},
+            "stop_button": {"state": "enabled" if running else "disabled"},
+            "pause_button": {"state": "enabled" if running else "disabled",
+                             "text": "Unpause Timer" if running and paused else "Pause Timer"},
+        }
+
+    def render_view(self):
+        state = (self.running, self.paused, self.editing)
+        if state == self.view_state:
+            return
+
+        view = self.views.get(state)
+        if view is None:
+            # flatten once per state, later transitions are dict lookups
+            view = self.views[state] = [(name, prop, value)
+                                        for name, props in self.describe_view(*state).items()
+                                        for prop, value in props.items()]
+
+        for name, prop, value in view:
+            key = (name, prop)
+            if self.applied.get(key) == value:
+                continue
+            self.applied[key] = value
+
+            widget = getattr(self, name)
+            if name == "edit_tooltip":
+                widget.text = value
+            elif prop == "visible":
+                if value:
+                    widget.grid()
+                else:
+                    widget.grid_remove()
+            else:
+                widget[prop] = value
+
+        self.view_state = state
+        if self.running:
+            self.update_timer_display()
 
     def show_config_menu(self, event=None):
         self.root.config(menu=self.menu_bar)
@@ -358,8 +388,13 @@ class GUI:
         )
 
     def show_preferences_menu(self):
-        preferences_gui = PreferencesGui(parent=self.root, config=self.config)
-        preferences_gui.initialize_gui()
+        if self.preferences_gui is None:
+            self.preferences_gui = PreferencesGui(parent=self.root, callback=self.prog.apply_startup,
+                                                  config=self.config)
+        self.preferences_gui.show()
+
+    def show_startup_error(self, message):
+        tkinter.messagebox.showerror("Run on startup", f"Could not update the startup registration:\n\n{message}")
 
     def github(self):
         url = "https://github.com/denemir/"
@@ -380,8 +415,6 @@ class AddTimerGUI:
         self.window.minsize(200, 50)
         self.window.resizable(False, False)
         self.window.transient(parent)  # window modal
-        icon_path = GuiCommon.resource_path('icon.ico')
-        self.window.iconbitmap(icon_path)
         self.window.grab_set()
 
         # inputs
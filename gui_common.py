@@ -1,8 +1,34 @@
 import os
 import sys
+import tkinter
 
 
 class GuiCommon:
+    _icon_image = None  # decoded once per process
+
+    @staticmethod
+    def set_app_icon(root):
+        # applied as the default, every later toplevel inherits it without touching disk
+        if GuiCommon._icon_image is None:
+            GuiCommon._icon_image = tkinter.PhotoImage(master=root, file=GuiCommon.resource_path('icon.png'))
+        root.iconphoto(True, GuiCommon._icon_image)
+
+        if sys.platform == "win32":
+            root.iconbitmap(default=GuiCommon.resource_path('icon.ico'))
+
+    @staticmethod
+    def show_modal(window, parent):
+        window.deiconify()
+        window.transient(parent)
+        window.lift()
+        window.focus_force()
+        window.grab_set()
+
+    @staticmethod
+    def hide_modal(window):
+        window.grab_release()
+        window.withdraw()
+
     @staticmethod
     def center_window(window):
         window.update_idletasks()
@@ -0,0 +1,406 @@
+import asyncio
+import dataclasses
+import hmac
+import json
+import queue
+import secrets
+import socket
+import threading
+from dataclasses import dataclass
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from control import CommandError
+from events import (CancelledEvent, PausedEvent, ScheduleArmedEvent, SleepRequestedEvent, StartedEvent, TickEvent,
+                    WarningEvent)
+from metrics import Metrics
+
+MAX_HEADER = 16 * 1024
+MAX_BODY = 64 * 1024
+MAX_BUFFERED = 64 * 1024  # bytes an event stream may fall behind by before it is closed
+KEEPALIVE_INTERVAL = 15.0  # seconds between comments on idle event streams
+
+# bus event -> server-sent event name
+STREAM_EVENTS = {
+    TickEvent: "tick",
+    StartedEvent: "started",
+    PausedEvent: "paused",
+    CancelledEvent: "cancelled",
+    WarningEvent: "warning",
+    SleepRequestedEvent: "sleep",
+    ScheduleArmedEvent: "schedule",
+}
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+           408: "Request Timeout", 413: "Content Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class Request:
+    method: str
+    path: str
+    query: dict
+    headers: dict  # lowercase names
+    body: bytes
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError as e:
+            raise HttpError(400, f"invalid json: {e}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "expected a json object")
+        return data
+
+
+class HttpApi:
+    # a small http/json api over the same Commands as sleeptimerctl, plus a server-sent event stream
+    # of the countdown. One asyncio loop on the runtime's http worker serves every client, so streams
+    # cost a socket each and no threads. The timing thread hands each event over with a single
+    # call_soon_threadsafe however many streams are open; the loop writes it out to all of them.
+    # Commands take the config lock and may wait on its writes, they run on the runtime's config
+    # worker, in order with the writes, so a slow one never holds up the loop
+    CLIENT_TIMEOUT = 10.0
+    START_TIMEOUT = 5.0
+
+    def __init__(self, commands, events, runtime, host="127.0.0.1", port=8765, token=None):
+        self.commands = commands
+        self.config = commands.config
+        self.events = events
+        self.runtime = runtime
+        self.host = host
+        self.port = port  # 0 picks a free one, the real port is set once listening
+        self.token = token or secrets.token_urlsafe(24)
+        self._loop = None
+        self._stopping = None  # asyncio.Event, set from stop()
+        self._ready = threading.Event()
+        self._error = None
+        self._served = None  # future of the serving job
+        self._streams = {}  # StreamWriter -> its handler task, open event streams, loop thread only
+        self._subscriptions = []
+
+    @staticmethod
+    def from_config(commands, events, runtime):
+        # None unless enabled in settings.json or when the address cannot be bound
+        settings = commands.config.get_http_api()
+        if not settings["enabled"]:
+            return None
+        if not settings["token"]:
+            settings["token"] = secrets.token_urlsafe(24)
+            commands.config.set_http_api(token=settings["token"])
+        api = HttpApi(commands, events, runtime, host=settings["host"], port=settings["port"],
+                      token=settings["token"])
+        try:
+            api.start()
+        except OSError as e:
+            print(f"Error starting http api: {e}")
+            return None
+        return api
+
+    # lifecycle, from any thread
+    def start(self):
+        self._served = self.runtime.submit("http", self._serve)
+        if not self._ready.wait(self.START_TIMEOUT):
+            raise OSError(f"http api did not start listening on {self.host}:{self.port}")
+        if self._error is not None:
+            raise self._error
+        self._subscriptions = [self.events.subscribe(event_type, self._on_event) for event_type in STREAM_EVENTS]
+
+    def stop(self, timeout=5.0):
+        for subscription in self._subscriptions:
+            self.events.unsubscribe(subscription)
+        self._subscriptions = []
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                pass  # already closed
+        if self._served is not None:
+            try:
+                self._served.result(timeout)
+            except Exception as e:
+                print(f"Error stopping http api: {e}")
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @staticmethod
+    def _family(host):
+        return socket.AF_INET6 if ":" in host else socket.AF_INET
+
+    def _serve(self):
+        try:
+            asyncio.run(self._main())
+        except OSError as e:
+            self._error = e
+        finally:
+            self._loop = None
+            self._ready.set()
+
+    async def _main(self):
+        self._stopping = asyncio.Event()
+        # bound here rather than by host and port, asyncio would resolve those on an executor thread
+        listener = socket.create_server((self.host, self.port), family=self._family(self.host))
+        server = await asyncio.start_server(self._handle, sock=listener, limit=MAX_HEADER)
+        self.port = listener.getsockname()[1]
+        self._loop = asyncio.get_running_loop()
+        self._ready.set()
+        keepalive = asyncio.create_task(self._keepalive())
+        async with server:
+            await self._stopping.wait()
+            # streams never end on their own, closing the server waits for its connections
+            keepalive.cancel()
+            handlers = list(self._streams.values())
+            for writer in list(self._streams):
+                writer.transport.abort()
+            if handlers:
+                await asyncio.wait(handlers, timeout=1.0)
+
+    # events
+    def _on_event(self, event):
+        # sync bus subscriber on the publishing thread, O(1) whatever the number of streams
+        loop = self._loop
+        if loop is None or not self._streams:
+            return
+        try:
+            loop.call_soon_threadsafe(self._broadcast, event)
+        except RuntimeError:
+            pass  # the loop closed under us during stop()
+
+    def _broadcast(self, event):
+        fields = {field.name: getattr(event, field.name) for field in dataclasses.fields(event)
+                  if field.name != "created"}
+        data = f"event: {STREAM_EVENTS[type(event)]}\ndata: {json.dumps(fields, default=str)}\n\n".encode()
+        with Metrics.timed("http_broadcast_seconds"):
+            self._write_all(data)
+
+    def _write_all(self, data):
+        # writes only queue on the transport; a client that stopped reading is dropped, never waited for
+        for writer in list(self._streams):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                self._drop(writer)
+                continue
+            writer.write(data)
+
+    def _drop(self, writer):
+        self._streams.pop(writer, None)
+        writer.transport.abort()
+        Metrics.inc("http_subscribers_dropped_total")
+        Metrics.set("http_subscribers", len(self._streams))
+
+    async def _keepalive(self):
+        while True:
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            self._write_all(b": keepalive\n\n")
+
+    # http
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), self.CLIENT_TIMEOUT)
+                self._authorize(request)
+                if request.method == "GET" and request.path == "/events":
+                    await self._stream(request, reader, writer)
+                    return
+                status, body = 200, {"ok": True, "result": await self._call(self._dispatch, request)}
+            except HttpError as e:
+                status, body = e.status, {"ok": False, "error": str(e)}
+            except CommandError as e:
+                status, body = 400, {"ok": False, "error": str(e)}
+            except asyncio.TimeoutError:
+                status, body = 408, {"ok": False, "error": "request timed out"}
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except Exception as e:
+                print(f"Error in http api: {e}")
+                status, body = 500, {"ok": False, "error": f"internal error: {e}"}
+
+            Metrics.inc("http_requests_total")
+            payload = json.dumps(body, default=str).encode()
+            writer.write(self._head(status, "application/json", len(payload)) + payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if writer not in self._streams:
+                writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HttpError(413, "headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(400, "invalid content-length")
+        if length > MAX_BODY:
+            raise HttpError(413, "body too large")
+        body = await reader.readexactly(length) if length > 0 else b""
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return Request(method.upper(), url.path.rstrip("/") or "/", query, headers, body)
+
+    def _authorize(self, request):
+        # a bearer token, or ?token= for EventSource which cannot set headers
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            token = request.query.get("token", "")
+        if not hmac.compare_digest(token.encode(), self.token.encode()):
+            raise HttpError(401, "bad token")
+
+    @staticmethod
+    def _head(status, content_type, length=None, extra=()):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                 "Cache-Control: no-store", *extra]
+        lines.append(f"Content-Length: {length}" if length is not None else "Connection: keep-alive")
+        if length is not None:
+            lines.append("Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    async def _stream(self, request, reader, writer):
+        # the current state first, then every event until either side hangs up
+        status = await self._call(self._run, ["status"])
+        writer.write(self._head(200, "text/event-stream", extra=("X-Accel-Buffering: no",))
+                     + f"retry: 2000\nevent: status\ndata: {json.dumps(status, default=str)}\n\n".encode())
+        self._streams[writer] = asyncio.current_task()
+        Metrics.inc("http_requests_total")
+        Metrics.set("http_subscribers", len(self._streams))
+        try:
+            while await reader.read(1024):
+                pass  # nothing is expected from the client, EOF means it left
+        except ConnectionError:
+            pass
+        finally:
+            if writer in self._streams:
+                del self._streams[writer]
+                Metrics.set("http_subscribers", len(self._streams))
+            writer.close()
+
+    async def _call(self, function, *args):
+        # never blocks the loop, a full queue is answered with 503
+        try:
+            future = self.runtime.submit("config", self._answer, function, args, block=False)
+        except queue.Full:
+            raise HttpError(503, "busy, try again")
+        result, error = await asyncio.wrap_future(future)
+        if error is not None:
+            raise error
+        return result
+
+    @staticmethod
+    def _answer(function, args):
+        # the client's own mistakes come back as values, the worker would log them as job errors
+        try:
+            return function(*args), None
+        except (HttpError, CommandError) as e:
+            return None, e
+
+    # routes, on the config worker through _call
+    def _dispatch(self, request):
+        method, parts = request.method, [unquote(part) for part in request.path.strip("/").split("/")]
+        route = parts[0]
+        if route == "status" and len(parts) == 1:
+            self._allow(method, "GET")
+            return self._run(["status"])
+        if route == "timer" and len(parts) == 2:
+            self._allow(method, "POST")
+            if parts[1] == "start":
+                return self._run(["start", self._duration(request.json())])
+            if parts[1] in ("pause", "cancel"):
+                return self._run([parts[1]])
+        if route == "presets":
+            return self._presets(request, parts[1:])
+        if route == "schedule" and len(parts) == 1:
+            return self._schedule(request)
+        if route == "preferences" and len(parts) == 1:
+            self._allow(method, "GET", "PUT")
+            if method == "GET":
+                return self._run(["preference", "get"])
+            changes = request.json()
+            results = self.commands.run([["preference", "set", key, value] for key, value in changes.items()])
+            return {key: value for result in results for key, value in result.items()}
+        if route == "commands" and len(parts) == 1:
+            # sleeptimerctl's word lists, all or nothing
+            self._allow(method, "POST")
+            commands = request.json().get("commands")
+            if not isinstance(commands, list) or not all(isinstance(words, list) for words in commands):
+                raise HttpError(400, "expected {\"commands\": [[word, ...], ...]}")
+            return self.commands.run([[str(word) for word in words] for words in commands])
+        raise HttpError(404, f"no such resource {request.path}")
+
+    def _presets(self, request, rest):
+        method = request.method
+        if not rest:
+            self._allow(method, "GET", "POST")
+            if method == "POST":
+                return self._run(["preset", "add", self._duration(request.json())])
+            default = self.config.get_default_preset()
+            return [{"seconds": preset.seconds, "title": preset.title, "default": preset.seconds == default}
+                    for preset in self.config.get_presets()]
+        if rest == ["default"]:
+            self._allow(method, "PUT")
+            data = request.json()
+            if data.get("duration") is None and data.get("seconds") is None:
+                return self._run(["preset", "default", "none"])
+            return self._run(["preset", "default", self._duration(data)])
+        if len(rest) == 1:
+            self._allow(method, "DELETE")
+            text = rest[0]
+            return self._run(["preset", "remove", f"{text} sec" if text.isdigit() else text])
+        raise HttpError(404, f"no such resource {request.path}")
+
+    def _schedule(self, request):
+        self._allow(request.method, "GET", "PUT")
+        if request.method == "GET":
+            return self._run(["schedule", "get"])
+        data = request.json()
+        words = ["schedule", "set"]
+        if "days" in data:
+            days = data["days"]
+            words.append(f"days={','.join(days) if isinstance(days, list) else days}")
+        if "at" in data:
+            words.append(f"at={data['at']}")
+        commands = [words]
+        if "enabled" in data:
+            commands.append(["schedule", "enable" if data["enabled"] else "disable"])
+        self.commands.run(commands)
+        return self._run(["schedule", "get"])
+
+    def _run(self, words):
+        return self.commands.run([words])[0]
+
+    @staticmethod
+    def _allow(method, *methods):
+        if method not in methods:
+            raise HttpError(405, f"{method} not allowed, use {' or '.join(methods)}")
+
+    @staticmethod
+    def _duration(data):
+        # {"duration": "90 min"} or {"seconds": 5400}
+        if isinstance(data.get("seconds"), int) and not isinstance(data["seconds"], bool):
+            return f"{data['seconds']} sec"
+        if isinstance(data.get("duration"), str):
+            return data["duration"]
+        raise HttpError(400, "expected \"duration\" text or \"seconds\"")
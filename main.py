@@ -1,36 +1,114 @@
 import os
 import platform
+import queue
 import subprocess
 import sys
+import time
 
 from gui import GUI
+from clock import ClockWatcher
 from config import Config
+from config_watcher import ConfigWatcher, FileWatcher
+from control import Commands, ControlServer
+from event_log import EventLog
+from http_api import HttpApi
+from events import (LATEST, QUEUED, CancelledEvent, EventBus, PausedEvent, ScheduleArmedEvent, SleepRequestedEvent,
+                    StartedEvent, TickEvent, WarningEvent)
+from metrics import Metrics
 from minimize import Minimize
 from notifications import Notifications
+from presets import Preset, PresetRegistry
+from profiling import AllocationSampler, StartupProfiler
+from runtime import get_runtime
+from schedule_calendar import LOCALTIME
 from scheduler import Scheduler
-from startup import Startup
+from stall_watchdog import Watchdog
+from startup import ON_DEMAND, Startup
+from status_page import StatusPage
 from timer import Timer
 
+METRICS_INTERVAL_MS = 15000
+
 
 class App:
-    def __init__(self):
+    def __init__(self, headless=False, config_path="settings.json"):
         self.duration = 0
+        self.headless = headless  # no window, tray or startup registration
 
         # options
         self.default_options = ["15 min", "30 min", "1 hrs", "90 min", "2 hrs", "3 hrs"]
-        self.default_option = None  # default options only
-        self.custom_options = None  # custom options only
-        self.all_options = None  # all options collectively
+        self.default_option = None  # title of the default preset
+        self.presets = PresetRegistry()  # built-in and custom presets, keyed by seconds
+
+        # one timing thread and a fixed set of io workers, see runtime.py
+        self.runtime = get_runtime()
+        EventLog.start(self.runtime)
 
-        self.config = Config()
+        self.config = Config(config_path=config_path, runtime=self.runtime)
         self.config.merge_missing_config_attributes()
-        self.timer = Timer(callback=self.sleep, config=self.config, update_call=self.update_timer_dropdown)
+        # timer and scheduler only publish, everything reacting to them subscribes here
+        self.events = EventBus(runtime=self.runtime)
+        self.events.subscribe(TickEvent, self.on_tick, policy=LATEST)
+        self.events.subscribe(WarningEvent, self.on_warning, policy=QUEUED)
+        self.events.subscribe(SleepRequestedEvent, self.on_sleep_requested, policy=QUEUED)
+        # the window follows the timer whoever drives it, sleeptimerctl and the http api included
+        for event_type in (StartedEvent, PausedEvent, CancelledEvent):
+            self.events.subscribe(event_type, self.on_timer_state, policy=LATEST)
+        # what happened goes to the event log too, ticks excepted
+        for event_type in (StartedEvent, PausedEvent, CancelledEvent, WarningEvent, SleepRequestedEvent):
+            self.events.subscribe(event_type, EventLog.record_event)
+        self.timer = Timer(config=self.config, events=self.events, runtime=self.runtime)
+
+        # state for external monitors, rewritten on transitions only, never on ticks
+        self.status = StatusPage.from_environment()
+        if self.status:
+            for event_type in (StartedEvent, PausedEvent, CancelledEvent, SleepRequestedEvent):
+                self.events.subscribe(event_type, self.on_timer_transition)
+            self.events.subscribe(ScheduleArmedEvent, self.on_schedule_armed)
+        self.load_presets()
         self.parse_file_for_default_option()
         self.version = self.config.version
+        self.gui = None
+        self.watchdog = None
+
+        if not self.headless:
+            self.initialize_window()
+
+        self.scheduler = Scheduler(config=self.config, events=self.events, runtime=self.runtime)
+        self.scheduler.start()
+        # resumes, clock steps and zone changes wake it now rather than at its next poll
+        self.clock_watcher = ClockWatcher(self.scheduler.on_clock_jumped, runtime=self.runtime)
+        self.clock_watcher.start()
+        self.zone_watcher = FileWatcher(LOCALTIME, self.scheduler.on_timezone_changed, runtime=self.runtime,
+                                        poll=False)
+        self.zone_watcher.start()
+
+        # sleeptimerctl talks to us through this
+        commands = Commands(self.config, timer=self.timer, scheduler=self.scheduler)
+        self.control = ControlServer.from_environment(commands, self.runtime)
+        # and anything speaking http, when enabled in settings.json
+        self.http_api = HttpApi.from_config(commands, self.events, self.runtime)
+
+        # settings.json edits made while we run are merged in live
+        self.config.subscribe(("presets", "preferences.default_preset"), self.on_presets_changed)
+        self.config.subscribe(("preferences.theme",), self.on_theme_changed)
+        self.watcher = ConfigWatcher(self.config, runtime=self.runtime)
+        self.watcher.start()
+
+        if self.gui:
+            self.gui.root.after(METRICS_INTERVAL_MS, self.export_metrics)
+
+    def initialize_window(self):
         self.gui = GUI(prog=self, config=self.config, theme=self.config.get_theme(), default_option=self.default_option, version=self.version)
 
+        # optional main loop stall detection
+        self.watchdog = Watchdog.from_environment(self.gui.root)
+        if self.watchdog:
+            self.watchdog.start()
+
         if self.config.get_enable_online_updater():
-            self.config.check_for_update(window=self.gui.root)
+            update = self.runtime.submit("network", self.config.get_available_update)
+            update.add_done_callback(self.on_update_checked)
 
         if "--background" in sys.argv:
             Minimize.minimize_to_tray(self.gui)
@@ -39,14 +117,17 @@ class App:
 
         self.gui.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        Startup.set_startup(enabled=self.config.get_run_on_startup(),
-                            background=self.config.get_startup_in_background())
+        self.apply_startup()
+        # started on demand, systemd's timer has to follow the schedule
+        self.config.subscribe(("preferences.scheduled", "scheduled_times"), self.on_schedule_changed)
 
-        self.scheduler = Scheduler(config=self.config, sleep_callback=self.sleep)
-        self.scheduler.start()
+    def on_update_checked(self, future):
+        # network thread, the dialog is built in the tk loop
+        if future.exception() is None and future.result():
+            self.gui.root.after(0, self.config.show_update, future.result(), self.gui.root)
 
     def start_timer(self, selection=None):
-        self.timer.start_timer(selection=selection, on_complete=self.sleep)
+        self.timer.start_timer(selection=selection)
 
     def pause_timer(self):
         self.timer.pause_timer()
@@ -56,76 +137,224 @@ class App:
         self.duration = 0
 
     def save_timer(self, duration, unit):
-        self.config.add_timer(duration=duration, unit=unit)
+        preset = Preset.from_title(f"{duration} {unit}")
+        if preset:
+            self.config.add_preset(preset)
+            self.presets.add(preset)
 
     def clear_timers(self):
         self.config.delete_timers()
+        default = self.presets.default
+        self.load_presets()
+        self.presets.set_default(default)
 
     def sleep(self):
         # determine OS
         system = platform.system()
+        Metrics.inc("power_actions_total")
+        start = time.perf_counter()
+        result, error = None, None
         try:
             if system == "Windows":
                 # ctypes.windll.user32.SendMessageW(65535, 274, 61808, 2) monitor off
-                os.system("rundll32.exe powrprof.dll,SetSuspendState 0,1,0")
+                result = os.system("rundll32.exe powrprof.dll,SetSuspendState 0,1,0")
             elif system == "Darwin":
-                subprocess.run(["pmset", "sleepnow"])
+                result = subprocess.run(["pmset", "sleepnow"]).returncode
             elif system == "Linux":
-                subprocess.run(["systemctl", "suspend"])
+                result = subprocess.run(["systemctl", "suspend"]).returncode
         except Exception as e:
+            error = str(e)
             print(f"An error occurred while putting the system to sleep: {e}")
-
-        # reset buttons
-        self.gui.toggle_start_stop_buttons()
+        elapsed = time.perf_counter() - start
+        Metrics.observe("power_action_seconds", elapsed)
+        EventLog.record("sleep", system=system, ok=error is None and result == 0, returncode=result, error=error,
+                        seconds=round(elapsed, 3))
+
+        # reset buttons, we are on the power worker
+        if self.gui:
+            self.call_in_gui(self.gui.toggle_start_stop_buttons)
+
+    def on_tick(self, event):
+        # events worker; a latest-value tick can still be in flight after a restart
+        if self.timer.countdown.is_current(event.run) or event.remaining == 0:
+            self.call_in_gui(self.update_timer_dropdown)
+
+    def on_timer_state(self, event):
+        # events worker, the countdown is read again in the tk loop so a late event cannot roll it back
+        self.call_in_gui(self.sync_timer_state)
+
+    def sync_timer_state(self):
+        if self.gui:
+            self.gui.sync_timer_state(self.timer.countdown.running, self.timer.countdown.paused)
+
+    def on_warning(self, event):
+        if not self.config.snapshot.notifications:
+            return
+        # toasts are slow to show, a full queue drops them rather than stall event delivery
+        try:
+            if event.source == "timer":
+                self.runtime.submit("notifications", Notifications.notify_custom_timer_warning, event.remaining,
+                                    block=False)
+            else:
+                self.runtime.submit("notifications", Notifications.notify_schedule_warning, block=False)
+        except queue.Full:
+            pass
+
+    def on_sleep_requested(self, event):
+        self.runtime.submit("power", self.sleep)
+
+    def on_schedule_changed(self, snapshot):
+        if self.config.get_run_on_startup() and self.config.get_startup_mode() == ON_DEMAND:
+            self.apply_startup()
+
+    def apply_startup(self):
+        # systemctl can take seconds, so on the config worker; it reads the preferences when it runs
+        try:
+            future = self.runtime.submit("config", Startup.apply, self.config, block=False)
+        except queue.Full:
+            return  # a queued one catches up
+        future.add_done_callback(self.on_startup_applied)
+
+    def on_startup_applied(self, future):
+        error = future.exception() or future.result()
+        if error and self.gui:
+            self.call_in_gui(self.gui.show_startup_error, str(error))
+
+    def on_timer_transition(self, event):
+        self.status.update_timer(self.timer.countdown, self.timer.clock)
+
+    def on_schedule_armed(self, event):
+        self.status.update_schedule(event.fire)
+
+    def load_presets(self):
+        self.presets.clear()
+        for title in self.default_options:
+            self.presets.add(Preset.from_title(title))
+        for preset in self.config.get_presets():
+            if preset:
+                self.presets.add(preset)
+
+    def import_presets(self, path):
+        count, errors = self.config.import_presets(path)
+        default = self.presets.default
+        self.load_presets()
+        self.presets.set_default(default)
+        return count, errors
+
+    def export_presets(self, path):
+        return self.config.export_presets(path)
 
     def parse_file_for_default_option(self):
-        self.default_option = self.config.get_default_option()
+        self.presets.set_default(self.config.get_default_preset())
+        preset = self.presets.get_default()
+        self.default_option = preset.title if preset else None
 
     def get_default_option(self):
         return self.default_option
 
     def get_all_options(self):
-        self.custom_options = self.config.get_timers()
-
-        self.all_options = self.default_options + [opt for opt in self.custom_options if
-                                                   opt not in self.default_options]
-
-        if self.default_option in self.all_options:
-            index = self.all_options.index(self.default_option)
-            self.all_options[index] = self.all_options[index] + " ★"
+        return self.presets.titles()
 
-        return self.all_options
+    def find_preset(self, title):
+        return self.presets.find(title)
 
     def get_remaining_time(self):
         return self.timer.get_remaining_time()
 
-    def set_default_option(self, duration=None, unit=None):
-        # check if option with star exists in list of options
-        if (self.default_option is not None and self.default_option + " ★") in self.all_options:
-            index = self.all_options.index(self.default_option + " ★")
+    def set_default_option(self, preset):
+        self.presets.set_default(preset.seconds)
+        self.default_option = preset.title
 
-            # update all options to ensure star is no longer on old default option
-            self.all_options[index] = self.all_options[index].replace(f" ★", "")
-        self.default_option = str(duration) + ' ' + unit
-
-    def set_default_timer(self, duration, unit):
-        self.config.set_default_option(duration=duration, unit=unit)
-        self.set_default_option(duration=duration, unit=unit)
-        self.gui.refresh_timers()
+    def set_default_timer(self, preset):
+        self.config.set_default_preset(preset.seconds)
+        self.set_default_option(preset)
+        if self.gui:
+            self.gui.refresh_timers()
 
     def update_timer_dropdown(self):
-        self.gui.update_timer_display()
+        if self.gui:
+            self.gui.update_timer_display()
 
     def update_theme(self, theme=None):
         self.config.set_theme(theme=theme)
 
-    def run(self):
+    def call_in_gui(self, function, *args):
+        # config callbacks can arrive on the watcher thread, tk work happens in the main loop
+        if self.gui:
+            self.gui.root.after(0, function, *args)
+        else:
+            function(*args)
+
+    def on_presets_changed(self, snapshot):
+        self.call_in_gui(self.reload_presets)
+
+    def reload_presets(self):
+        self.load_presets()
+        self.parse_file_for_default_option()
+        if self.gui and self.gui.timer_dropdown:
+            self.gui.timer_dropdown.refresh()
+
+    def on_theme_changed(self, snapshot):
+        theme = snapshot.get("preferences.theme")
+        if self.gui and self.gui.theme != theme:
+            self.call_in_gui(self.apply_theme, theme)
+
+    def apply_theme(self, theme):
+        self.gui.theme = theme
+        self.gui.set_theme()
+
+    def export_metrics(self):
+        # the tk loop only keeps time, the file is written on the log worker
+        try:
+            self.runtime.submit("log", Metrics.write_prometheus, block=False)
+        except queue.Full:
+            pass  # the next interval writes it
+        self.gui.root.after(METRICS_INTERVAL_MS, self.export_metrics)
+
+    def run(self, profiler=None):
+        if profiler:
+            # first timer event fires once the window is built and the main loop is running
+            self.gui.root.after(0, profiler.stop)
         self.gui.initialize_gui()
+        if self.watchdog:
+            self.watchdog.stop()
+        self.shutdown()
+
+    def shutdown(self):
+        # producers first, then let the queues drain, config writes land last
+        if self.control:
+            self.control.stop()
+        if self.http_api:
+            self.http_api.stop()
+        self.clock_watcher.stop()
+        self.zone_watcher.stop()
+        self.scheduler.stop()
+        self.watcher.stop()
+        self.timer.cancel_timer()
+        self.events.close(timeout=1)
+        try:
+            self.config.flush(timeout=5)
+        except OSError:
+            pass  # already reported when the write failed
+        self.runtime.shutdown()
+        if self.status:
+            self.status.close()
+        EventLog.stop()
+        Metrics.write_prometheus()
 
     def on_close(self):
         minimize_on_close = "tray" if self.config.get_minimize_on_close() else "quit"
         Minimize.on_close(self.gui, minimize_on_close)
 
 if __name__ == "__main__":
+    # opt-in profiling, both are None unless requested
+    profiler = StartupProfiler.from_environment()
+    sampler = AllocationSampler.from_environment()
+    if sampler:
+        sampler.start()
+    if profiler:
+        profiler.start()
+
     prog = App()
-    prog.run()
+    prog.run(profiler=profiler)
+
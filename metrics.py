@@ -0,0 +1,186 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_PATH = "metrics.prom"
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+JITTER_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+ERROR_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts, histogram.sum, histogram.count = list(self.counts), self.sum, self.count
+        return histogram
+
+
+class Metrics:
+    # name: (type, help, buckets)
+    DEFINITIONS = {
+        "timer_ticks_total": ("counter", "Countdown ticks processed.", None),
+        "timer_tick_jitter_seconds": ("histogram", "Lateness of each countdown tick.", JITTER_BUCKETS),
+        "timer_drift_seconds": ("gauge", "Cumulative countdown drift of the current run.", None),
+        "scheduler_wakeups_total": ("counter", "Scheduler loop wakeups.", None),
+        "scheduler_fires_total": ("counter", "Scheduled sleeps fired.", None),
+        "scheduler_fire_error_seconds": ("histogram", "Distance between scheduled and actual fire time.",
+                                         ERROR_BUCKETS),
+        "gui_update_timer_display_seconds": ("histogram", "Time spent in update_timer_display.",
+                                             LATENCY_BUCKETS),
+        "runtime_rejected_total": ("counter", "Jobs refused because their runtime queue was full.", None),
+        "events_dropped_total": ("counter", "Queued events dropped because a subscriber fell behind.", None),
+        "notification_dispatch_seconds": ("histogram", "Time to dispatch a notification.", LATENCY_BUCKETS),
+        "notification_errors_total": ("counter", "Notifications that failed to dispatch.", None),
+        "config_writes_total": ("counter", "Config writes to disk.", None),
+        "config_write_bytes_total": ("counter", "Bytes written to the config file.", None),
+        "config_reloads_total": ("counter", "External edits of the config file loaded.", None),
+        "config_merges_total": ("counter", "Writes merged with a concurrent external edit.", None),
+        "power_actions_total": ("counter", "Sleep requests sent to the OS.", None),
+        "power_action_seconds": ("histogram", "Latency of the OS sleep request.", LATENCY_BUCKETS),
+        "http_requests_total": ("counter", "Requests answered by the http api.", None),
+        "http_subscribers": ("gauge", "Open event streams on the http api.", None),
+        "http_subscribers_dropped_total": ("counter", "Event streams closed because the client fell behind.", None),
+        "http_broadcast_seconds": ("histogram", "Time to write one event to every stream.", LATENCY_BUCKETS),
+    }
+
+    _values = {}
+    _started = time.time()
+    _lock = threading.Lock()  # updates come from the timing, worker, http and tk threads
+
+    @staticmethod
+    def inc(name, amount=1):
+        with Metrics._lock:
+            Metrics._values[name] = Metrics._values.get(name, 0) + amount
+
+    @staticmethod
+    def set(name, value):
+        with Metrics._lock:
+            Metrics._values[name] = value
+
+    @staticmethod
+    def observe(name, value):
+        with Metrics._lock:
+            histogram = Metrics._values.get(name)
+            if histogram is None:
+                histogram = Metrics._values[name] = Histogram(Metrics.DEFINITIONS[name][2])
+            histogram.observe(value)
+
+    @staticmethod
+    @contextmanager
+    def timed(name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            Metrics.observe(name, time.perf_counter() - start)
+
+    @staticmethod
+    def get(name):
+        return Metrics._values.get(name)
+
+    @staticmethod
+    def reset():
+        with Metrics._lock:
+            Metrics._values = {}
+
+    @staticmethod
+    def render_prometheus():
+        lines = []
+        with Metrics._lock:
+            values = {name: value.copy() if isinstance(value, Histogram) else value
+                      for name, value in Metrics._values.items()}
+
+        for name, (kind, help_text, buckets) in Metrics.DEFINITIONS.items():
+            metric = f"sleeptimer_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            value = values.get(name)
+
+            if kind == "histogram":
+                histogram = value if value is not None else Histogram(buckets)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+            else:
+                lines.append(f"{metric} {value if value is not None else 0}")
+
+        lines.append("# TYPE sleeptimer_start_time_seconds gauge")
+        lines.append(f"sleeptimer_start_time_seconds {Metrics._started}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def write_prometheus(path=METRICS_PATH):
+        # write then swap so scrapers never see a partial file
+        try:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(Metrics.render_prometheus())
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    @staticmethod
+    def read_prometheus(path=METRICS_PATH):
+        samples = {}
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    @staticmethod
+    def format_status(samples):
+        def average(name):
+            count = samples.get(f"sleeptimer_{name}_count", 0)
+            return samples.get(f"sleeptimer_{name}_sum", 0) / count if count else 0.0
+
+        started = samples.get("sleeptimer_start_time_seconds", time.time())
+        rows = [
+            ("uptime", f"{time.time() - started:.0f}s"),
+            ("timer ticks", f"{samples.get('sleeptimer_timer_ticks_total', 0):.0f}"),
+            ("tick jitter (avg)", f"{average('timer_tick_jitter_seconds') * 1000:.2f}ms"),
+            ("timer drift", f"{samples.get('sleeptimer_timer_drift_seconds', 0) * 1000:.1f}ms"),
+            ("scheduler wakeups", f"{samples.get('sleeptimer_scheduler_wakeups_total', 0):.0f}"),
+            ("scheduler fires", f"{samples.get('sleeptimer_scheduler_fires_total', 0):.0f}"),
+            ("fire error (avg)", f"{average('scheduler_fire_error_seconds'):.2f}s"),
+            ("display update (avg)", f"{average('gui_update_timer_display_seconds') * 1000:.3f}ms"),
+            ("notification (avg)", f"{average('notification_dispatch_seconds') * 1000:.1f}ms"),
+            ("config writes", f"{samples.get('sleeptimer_config_writes_total', 0):.0f}"),
+            ("config bytes", f"{samples.get('sleeptimer_config_write_bytes_total', 0):.0f}"),
+            ("power actions", f"{samples.get('sleeptimer_power_actions_total', 0):.0f}"),
+            ("power action (avg)", f"{average('power_action_seconds') * 1000:.1f}ms"),
+        ]
+        width = max(len(label) for label, _ in rows)
+        return "\n".join(f"{label.ljust(width)}  {value}" for label, value in rows)
+
+
+if __name__ == "__main__":
+    # python metrics.py [status] [path]
+    args = [arg for arg in sys.argv[1:] if arg != "status"]
+    metrics_path = args[0] if args else METRICS_PATH
+    try:
+        print(Metrics.format_status(Metrics.read_prometheus(metrics_path)))
+    except OSError as e:
+        print(f"Could not read metrics from {metrics_path}: {e}")
+        sys.exit(1)
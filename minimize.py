@@ -1,6 +1,5 @@
 import pystray
 from PIL import Image, ImageDraw
-import threading
 
 from gui_common import GuiCommon
 
@@ -12,37 +11,46 @@ class Minimize:
         return Image.open(icon_path).resize((32, 32))
 
     @staticmethod
-    def build_tray_icon(app):
-        menu = pystray.Menu(
-            pystray.MenuItem("Show", lambda icon, item: Minimize.restore_from_tray(app)),
-            pystray.MenuItem("Quit", lambda icon, item: Minimize.quit_from_tray(app))
-        )
-        icon = pystray.Icon("SimpleSleepTimer", Minimize.create_tray_icon_image(), "Simple Sleep Timer", menu)
-        app.tray_icon = icon
-        icon.run()
+    def get_tray_icon(app):
+        # one icon for the life of the process, minimizing only toggles its visibility
+        icon = getattr(app, 'tray_icon', None)
+        if icon is None:
+            menu = pystray.Menu(
+                pystray.MenuItem("Show", lambda icon, item: app.root.after(0, Minimize.restore_from_tray, app)),
+                pystray.MenuItem("Quit", lambda icon, item: app.root.after(0, Minimize.quit_from_tray, app))
+            )
+            icon = pystray.Icon("SimpleSleepTimer", Minimize.create_tray_icon_image(), "Simple Sleep Timer", menu)
+            app.tray_icon = icon
+            icon.run_detached(setup=lambda icon: None)  # stays hidden until the first minimize
+        return icon
 
     @staticmethod
     def minimize_to_tray(app):
         app.root.withdraw()
-        thread = threading.Thread(target=Minimize.build_tray_icon, args=(app,), daemon=True)
-        thread.start()
+        Minimize.get_tray_icon(app).visible = True
 
     @staticmethod
     def restore_from_tray(app):
-        if hasattr(app, 'tray_icon'):
-            app.tray_icon.stop()
+        if getattr(app, 'tray_icon', None):
+            app.tray_icon.visible = False
         app.root.deiconify()
         app.root.lift()
 
     @staticmethod
     def quit_from_tray(app):
-        if hasattr(app, 'tray_icon'):
-            app.tray_icon.stop()
+        Minimize.stop_tray_icon(app)
         app.root.destroy()
 
+    @staticmethod
+    def stop_tray_icon(app):
+        if getattr(app, 'tray_icon', None):
+            app.tray_icon.stop()
+            app.tray_icon = None
+
     @staticmethod
     def on_close(app, behavior=None):
         if behavior == "tray":
             Minimize.minimize_to_tray(app)
         elif behavior == "quit":
+            Minimize.stop_tray_icon(app)
             app.root.destroy()
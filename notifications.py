@@ -1,7 +1,15 @@
-from winotify import Notification, audio
 import os
 import sys
 
+from metrics import Metrics
+
+try:
+    from winotify import Notification, audio
+except ImportError:
+    # toasts are windows only, elsewhere notifications are skipped
+    Notification = None
+    audio = None
+
 APP_NAME = "Simple Sleep Timer"
 APP_ID = "SimpleSleepTimer"
 
@@ -13,23 +21,32 @@ class Notifications:
         return path if os.path.exists(path) else ""
 
     @staticmethod
-    def _send(title: str, message: str, sound=audio.Default, duration="short"):
-        toast = Notification(
-            app_id=APP_ID,
-            title=title,
-            msg=message,
-            duration=duration,
-            icon=Notifications.get_icon_path()
-        )
-        toast.set_audio(sound, loop=False)
-        toast.show()
+    def _send(title: str, message: str, sound="Default", duration="short"):
+        if Notification is None:
+            return
+
+        # a toast that fails is counted and skipped, nothing waits on it
+        try:
+            with Metrics.timed("notification_dispatch_seconds"):
+                toast = Notification(
+                    app_id=APP_ID,
+                    title=title,
+                    msg=message,
+                    duration=duration,
+                    icon=Notifications.get_icon_path()
+                )
+                toast.set_audio(getattr(audio, sound), loop=False)
+                toast.show()
+        except Exception as e:
+            Metrics.inc("notification_errors_total")
+            print(f"Error showing notification: {e}")
 
     @staticmethod
     def notify_running_in_background():
         Notifications._send(
             title=f"{APP_NAME} is running",
             message="The app is running in the background.",
-            sound=audio.Default,
+            sound="Default",
             duration="short"
         )
 
@@ -38,7 +55,7 @@ class Notifications:
         Notifications._send(
             title="Sleep in 5 minutes",
             message="Your scheduled sleep time is coming up in 5 minutes.",
-            sound=audio.Reminder,
+            sound="Reminder",
             duration="short"
         )
 
@@ -51,6 +68,6 @@ class Notifications:
         Notifications._send(
             title="Sleep Timer Warning",
             message=f"Your system will sleep in {time_str}.",
-            sound=audio.Reminder,
+            sound="Reminder",
             duration="short"
         )
\ No newline at end of file
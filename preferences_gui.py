@@ -1,42 +1,69 @@
-import logging
+import sys
 import tkinter
-from gc import enable
 from tkinter import ttk
 
 from gui_common import GuiCommon
-from startup import Startup
+from startup import LOGIN, ON_DEMAND
 
 
 class PreferencesGui:
     def __init__(self, parent=None, callback=None, config=None):
-        self.window = tkinter.Toplevel(parent)
-        self.window.focus_force()
+        # the window is built on first show and reused after that
+        self.parent = parent
+        self.window = None
         self.callback = callback
         self.config = config
 
-        # setup window
-        self.window.title('Preferences')
-        self.window.minsize(300, 100)
-        self.window.resizable(False, False)
-        self.window.transient(parent)
-        icon_path = GuiCommon.resource_path('icon.ico')
-        self.window.iconbitmap(icon_path)
-        self.window.grab_set()
-
         # tab values
-        self.run_on_startup = tkinter.BooleanVar(value=self.config.get_preference("run_on_startup"))
-        self.startup_in_background = tkinter.BooleanVar(value=self.config.get_startup_in_background())
-        self.minimize_on_close = tkinter.BooleanVar(value=self.config.get_minimize_on_close())
-        self.enable_notifications = tkinter.BooleanVar(value=self.config.get_enable_notifications())
-        self.enable_online_updater = tkinter.BooleanVar(value=self.config.get_enable_online_updater())
+        self.run_on_startup = None
+        self.startup_in_background = None
+        self.startup_on_demand = None  # Linux only
+        self.minimize_on_close = None
+        self.enable_notifications = None
+        self.enable_online_updater = None
 
         # toggleable items
         self.startup_in_background_box = None
+        self.startup_on_demand_box = None
+
+    def show(self):
+        if self.window is None:
+            self.initialize_gui()
+        self.refresh()
+        GuiCommon.show_modal(self.window, self.parent)
+
+    def hide(self):
+        GuiCommon.hide_modal(self.window)
+
+    def refresh(self):
+        # config may have changed while hidden
+        self.run_on_startup.set(self.config.get_preference("run_on_startup"))
+        self.startup_in_background.set(self.config.get_startup_in_background())
+        self.startup_on_demand.set(self.config.get_startup_mode() == ON_DEMAND)
+        self.minimize_on_close.set(self.config.get_minimize_on_close())
+        self.enable_notifications.set(self.config.get_enable_notifications())
+        self.enable_online_updater.set(self.config.get_enable_online_updater())
+        self.toggle_startup_in_background_box()
 
     def initialize_gui(self):
+        self.window = tkinter.Toplevel(self.parent)
+        self.window.withdraw()
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+
+        # setup window
+        self.window.title('Preferences')
+        self.window.minsize(300, 100)
+        self.window.resizable(False, False)
+
+        self.run_on_startup = tkinter.BooleanVar()
+        self.startup_in_background = tkinter.BooleanVar()
+        self.startup_on_demand = tkinter.BooleanVar()
+        self.minimize_on_close = tkinter.BooleanVar()
+        self.enable_notifications = tkinter.BooleanVar()
+        self.enable_online_updater = tkinter.BooleanVar()
+
         top_frame = ttk.Frame(self.window)
         top_frame.pack(side="top", fill="x")
-        GuiCommon.center_window(self.window)
 
         # tabs
         tab_style = ttk.Style()
@@ -59,6 +86,8 @@ class PreferencesGui:
         self.render_notification_tab(notification_tab)
         self.render_other_tab(other_tab)
 
+        GuiCommon.center_window(self.window)
+
     def render_interface_tab(self, tab):
         run_on_startup_box = ttk.Checkbutton(tab,
              text="Run on startup", variable=self.run_on_startup,
@@ -69,9 +98,7 @@ class PreferencesGui:
             command=lambda: [self.config.set_startup_in_background(
             self.startup_in_background.get()
             ),
-            self.set_startup()],
-            state=(
-                tkinter.NORMAL if self.run_on_startup.get() else tkinter.DISABLED)
+            self.set_startup()]
         )
         minimize_on_close_box = ttk.Checkbutton(tab,
             text="Minimize on close", variable=self.minimize_on_close,
@@ -85,6 +112,17 @@ class PreferencesGui:
             minimize_on_close_box
         ]
 
+        # systemd starts us for sleeptimerctl or a scheduled sleep, nothing runs at login
+        if sys.platform.startswith("linux"):
+            self.startup_on_demand_box = ttk.Checkbutton(tab,
+                text="Only start when needed", variable=self.startup_on_demand,
+                command=lambda: [self.config.set_startup_mode(
+                    ON_DEMAND if self.startup_on_demand.get() else LOGIN
+                ),
+                self.set_startup()]
+            )
+            checkboxes.insert(2, self.startup_on_demand_box)
+
         self.pack_checkboxes(checkboxes=checkboxes)
 
     def render_notification_tab(self, tab):
@@ -126,11 +164,15 @@ class PreferencesGui:
         self.set_startup()
 
     def toggle_startup_in_background_box(self):
-        self.startup_in_background_box.config(state=(tkinter.NORMAL if self.run_on_startup.get() else tkinter.DISABLED))
+        state = tkinter.NORMAL if self.run_on_startup.get() else tkinter.DISABLED
+        self.startup_in_background_box.config(state=state)
+        if self.startup_on_demand_box:
+            self.startup_on_demand_box.config(state=state)
 
     def set_startup(self):
-        Startup.set_startup(enabled=self.run_on_startup.get(),
-                            background=self.startup_in_background.get())
+        # off the tk thread, see App.apply_startup
+        if self.callback:
+            self.callback()
 
     @staticmethod
     def pack_checkboxes(checkboxes=None):
@@ -0,0 +1,206 @@
+import tkinter
+from tkinter import ttk
+
+NAVIGATION_KEYS = {"Up", "Down", "Return", "KP_Enter", "Escape", "Tab", "Prior", "Next"}
+
+
+class PresetPicker(ttk.Frame):
+    def __init__(self, parent, registry, textvariable=None, width=18, max_rows=10):
+        super().__init__(parent)
+        self.registry = registry
+        self.variable = textvariable if textvariable is not None else tkinter.StringVar()
+        self.max_rows = max_rows
+
+        # filter state, only matches[offset:offset + max_rows] is ever rendered
+        self.matches = []
+        self.offset = 0
+        self.active = 0
+        self.rows = []  # titles currently in the listbox
+
+        self.popup = None
+        self.listbox = None
+
+        self.entry = ttk.Entry(self, textvariable=self.variable, width=width)
+        self.entry.pack(side="left")
+        self.arrow = ttk.Button(self, text="▾", width=2, command=self.toggle_popup)
+        self.arrow.pack(side="left")
+
+        self.entry.bind("<KeyRelease>", self.on_key)
+        self.entry.bind("<Down>", lambda event: self.move(1))
+        self.entry.bind("<Up>", lambda event: self.move(-1))
+        self.entry.bind("<Next>", lambda event: self.move(self.max_rows))
+        self.entry.bind("<Prior>", lambda event: self.move(-self.max_rows))
+        self.entry.bind("<Return>", self.on_return)
+        self.entry.bind("<Escape>", lambda event: self.hide_popup())
+        self.entry.bind("<FocusOut>", lambda event: self.after(150, self.hide_if_unfocused))
+
+    def set_variable(self, variable):
+        self.variable = variable
+        self.entry["textvariable"] = variable
+
+    def selection_clear(self, **kw):
+        self.entry.selection_clear()
+
+    # popup
+    def build_popup(self):
+        # built once, hidden and shown after that
+        self.popup = tkinter.Toplevel(self)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+        self.listbox = tkinter.Listbox(self.popup, height=1, exportselection=False, activestyle="none",
+                                       borderwidth=1, relief="solid")
+        self.listbox.pack(fill="both", expand=True)
+        self.listbox.bind("<ButtonRelease-1>", self.on_click)
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-1))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(1))
+
+    def is_shown(self):
+        return self.popup is not None and self.popup.winfo_ismapped()
+
+    def show_popup(self):
+        if self.popup is None:
+            self.build_popup()
+
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.popup.geometry(f"{self.winfo_width()}x{self.listbox.winfo_reqheight()}+{x}+{y}")
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide_popup(self):
+        if self.is_shown():
+            self.popup.withdraw()
+
+    def hide_if_unfocused(self):
+        if self.focus_get() not in (self.entry, self.listbox):
+            self.hide_popup()
+
+    def toggle_popup(self):
+        if self.is_shown():
+            self.hide_popup()
+            return
+
+        # opening from the arrow lists everything with the current selection active
+        self.filter("")
+        preset = self.registry.find(self.variable.get()) if self.variable.get() else None
+        if preset is not None and preset.seconds in self.registry:
+            self.set_active(self.registry.index_of(preset.seconds))
+        self.show_popup()
+        self.entry.focus_set()
+
+    # filtering and rendering
+    def filter(self, query):
+        self.matches = self.registry.search(query)
+        self.offset = 0
+        self.active = 0
+        self.render()
+
+    def refresh(self):
+        # registry changed, keep the filter and redraw only what differs
+        if self.listbox is None:
+            return
+        self.matches = self.registry.search(self.variable.get() if self.is_shown() else "")
+        self.offset = min(self.offset, max(0, len(self.matches) - self.max_rows))
+        self.active = min(self.active, max(0, len(self.matches) - 1))
+        self.render()
+
+    def render(self):
+        if self.listbox is None:
+            self.build_popup()
+
+        rows = [self.registry.title(seconds) for seconds in self.matches[self.offset:self.offset + self.max_rows]]
+        old_rows = self.rows
+
+        # replace only the middle section that changed
+        start = 0
+        while start < len(old_rows) and start < len(rows) and old_rows[start] == rows[start]:
+            start += 1
+        old_end, new_end = len(old_rows), len(rows)
+        while old_end > start and new_end > start and old_rows[old_end - 1] == rows[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+
+        if old_end > start:
+            self.listbox.delete(start, old_end - 1)
+        if new_end > start:
+            self.listbox.insert(start, *rows[start:new_end])
+
+        if len(rows) != len(old_rows):
+            self.listbox["height"] = max(1, len(rows))
+            if self.is_shown():
+                self.show_popup()
+        self.rows = rows
+        self.highlight()
+
+    def highlight(self):
+        self.listbox.selection_clear(0, "end")
+        if self.matches and self.offset <= self.active < self.offset + len(self.rows):
+            self.listbox.selection_set(self.active - self.offset)
+
+    def scroll(self, delta):
+        offset = max(0, min(self.offset + delta, len(self.matches) - self.max_rows))
+        if offset == self.offset:
+            return "break"
+
+        # shift the window, only rows entering or leaving are touched
+        shift = offset - self.offset
+        self.offset = offset
+        if abs(shift) >= len(self.rows):
+            self.render()
+            return "break"
+
+        entering = [self.registry.title(seconds) for seconds in
+                    (self.matches[offset + len(self.rows) - shift:offset + len(self.rows)] if shift > 0
+                     else self.matches[offset:offset - shift])]
+        if shift > 0:
+            self.listbox.delete(0, shift - 1)
+            self.listbox.insert("end", *entering)
+            self.rows = self.rows[shift:] + entering
+        else:
+            self.listbox.delete(len(self.rows) + shift, "end")
+            self.listbox.insert(0, *entering)
+            self.rows = entering + self.rows[:shift]
+        self.highlight()
+        return "break"
+
+    def set_active(self, index):
+        if not self.matches:
+            return
+        self.active = max(0, min(index, len(self.matches) - 1))
+        if self.active < self.offset:
+            self.scroll(self.active - self.offset)
+        elif self.active >= self.offset + self.max_rows:
+            self.scroll(self.active - self.offset - self.max_rows + 1)
+        self.highlight()
+
+    def move(self, delta):
+        if not self.is_shown():
+            self.filter(self.variable.get() if self.registry.find(self.variable.get()) is None else "")
+            self.show_popup()
+        self.set_active(self.active + delta)
+        return "break"
+
+    # events
+    def on_key(self, event):
+        if event.keysym in NAVIGATION_KEYS:
+            return
+        self.filter(self.variable.get())
+        self.show_popup()
+
+    def on_click(self, event):
+        index = self.listbox.nearest(event.y)
+        if 0 <= index < len(self.rows):
+            self.pick(self.offset + index)
+
+    def on_return(self, event):
+        if not self.is_shown() or not self.matches:
+            return None  # let the window's <Return> start the timer
+        self.pick(self.active)
+        return "break"
+
+    def pick(self, index):
+        self.variable.set(self.registry.title(self.matches[index]))
+        self.hide_popup()
+        self.entry.icursor("end")
+        self.event_generate("<<PresetSelected>>")
@@ -0,0 +1,144 @@
+import bisect
+from dataclasses import dataclass
+from typing import Optional
+
+from durations import Duration, DurationParser
+
+STAR_SYMBOL = "★"
+
+
+@dataclass(frozen=True)
+class Preset:
+    seconds: int
+    label: Optional[str] = None
+
+    @property
+    def title(self):
+        return self.label if self.label else Preset.format_seconds(self.seconds)
+
+    @staticmethod
+    def format_seconds(seconds):
+        if seconds % 3600 == 0:
+            return f"{seconds // 3600} hrs"
+        if seconds % 60 == 0:
+            return f"{seconds // 60} min"
+        return f"{seconds} sec"
+
+    @staticmethod
+    def from_title(title):
+        title = " ".join(title.replace(STAR_SYMBOL, "").lower().split())
+        result = DurationParser.parse(title)
+        if not isinstance(result, Duration) or result.at is not None:
+            return None
+        return Preset(seconds=result.seconds, label=title)
+
+
+class PresetRegistry:
+    def __init__(self, presets=(), default=None):
+        self._presets = {}  # seconds -> Preset
+        self._keys = []  # seconds, ascending
+        self._titles = []  # display strings, parallel to _keys
+        self._by_title = {}  # display string (starred or not) -> seconds
+        self._prefixes = []  # (lowercase title, seconds), sorted for prefix search
+        self.default = None
+
+        for preset in presets:
+            self.add(preset)
+        self.set_default(default)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, seconds):
+        return seconds in self._presets
+
+    def __iter__(self):
+        return (self._presets[seconds] for seconds in self._keys)
+
+    def get(self, seconds):
+        return self._presets.get(seconds)
+
+    def find(self, title):
+        # O(1) lookup of whatever the dropdown shows
+        seconds = self._by_title.get(title.strip())
+        if seconds is None:
+            preset = Preset.from_title(title)
+            seconds = preset.seconds if preset else None
+        return self._presets.get(seconds)
+
+    def add(self, preset):
+        if preset.seconds in self._presets:
+            return False
+
+        index = bisect.bisect_left(self._keys, preset.seconds)
+        self._presets[preset.seconds] = preset
+        self._keys.insert(index, preset.seconds)
+        self._titles.insert(index, preset.title)
+        self._by_title[preset.title] = preset.seconds
+        self._by_title[f"{preset.title} {STAR_SYMBOL}"] = preset.seconds
+        bisect.insort(self._prefixes, (preset.title.lower(), preset.seconds))
+        return True
+
+    def remove(self, seconds):
+        preset = self._presets.pop(seconds, None)
+        if preset is None:
+            return None
+
+        index = bisect.bisect_left(self._keys, seconds)
+        del self._keys[index]
+        del self._titles[index]
+        self._by_title.pop(preset.title, None)
+        self._by_title.pop(f"{preset.title} {STAR_SYMBOL}", None)
+        del self._prefixes[bisect.bisect_left(self._prefixes, (preset.title.lower(), seconds))]
+        if self.default == seconds:
+            self.default = None
+        return preset
+
+    def clear(self):
+        self._presets.clear()
+        self._keys.clear()
+        self._titles.clear()
+        self._by_title.clear()
+        self._prefixes.clear()
+        self.default = None
+
+    def set_default(self, seconds):
+        # only the old and new default entries change
+        if self.default is not None:
+            self._set_title(self.default, self._presets[self.default].title)
+
+        self.default = seconds if seconds in self._presets else None
+        if self.default is not None:
+            self._set_title(self.default, f"{self._presets[self.default].title} {STAR_SYMBOL}")
+
+    def get_default(self):
+        return self._presets.get(self.default) if self.default is not None else None
+
+    def _set_title(self, seconds, title):
+        self._titles[bisect.bisect_left(self._keys, seconds)] = title
+
+    def index_of(self, seconds):
+        index = bisect.bisect_left(self._keys, seconds)
+        return index if index < len(self._keys) and self._keys[index] == seconds else None
+
+    def titles(self):
+        return self._titles
+
+    def title(self, seconds):
+        return self._titles[self.index_of(seconds)]
+
+    def search(self, query):
+        # matching keys in duration order, the full index for an empty query
+        query = query.replace(STAR_SYMBOL, "").strip().lower()
+        if not query:
+            return self._keys
+
+        low = bisect.bisect_left(self._prefixes, (query,))
+        high = bisect.bisect_left(self._prefixes, (query + "\uffff",))
+        matches = sorted(seconds for _, seconds in self._prefixes[low:high])
+
+        # "60 min" also finds the "1 hrs" preset
+        preset = Preset.from_title(query)
+        if preset and preset.seconds in self._presets and preset.seconds not in matches:
+            matches.insert(0, preset.seconds)
+        return matches
@@ -0,0 +1,110 @@
+import atexit
+import cProfile
+import os
+import sys
+import threading
+import tracemalloc
+
+PROFILE_ENV = "SLEEPTIMER_PROFILE"  # output path, or 1 for the default path
+PROFILE_PATH = "startup.pstats"
+TRACEMALLOC_ENV = "SLEEPTIMER_TRACEMALLOC"  # snapshot interval in seconds
+TRACEMALLOC_PATH = "allocations.txt"
+
+
+class StartupProfiler:
+    def __init__(self, path=PROFILE_PATH):
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.running = False
+
+    @staticmethod
+    def from_environment():
+        # nothing is created unless --profile or SLEEPTIMER_PROFILE is given
+        path = os.environ.get(PROFILE_ENV)
+        if not path and "--profile" not in sys.argv:
+            return None
+        return StartupProfiler(path=PROFILE_PATH if path in (None, "", "1") else path)
+
+    def start(self):
+        self.running = True
+        self.profile.enable()
+
+    def stop(self):
+        if not self.running:
+            return
+
+        self.profile.disable()
+        self.running = False
+        try:
+            self.profile.dump_stats(self.path)
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+
+class AllocationSampler:
+    def __init__(self, interval=30.0, path=TRACEMALLOC_PATH, top=25, frames=10):
+        self.interval = interval
+        self.path = path
+        self.top = top
+        self.frames = frames
+        self.first_snapshot = None
+        self.last_snapshot = None
+        self.peak = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def from_environment():
+        interval = os.environ.get(TRACEMALLOC_ENV)
+        if not interval and "--tracemalloc" not in sys.argv:
+            return None
+
+        try:
+            return AllocationSampler(interval=float(interval) if interval else 30.0)
+        except ValueError:
+            return AllocationSampler()
+
+    def start(self):
+        tracemalloc.start(self.frames)
+        self.first_snapshot = self.take_snapshot()
+        self._thread = threading.Thread(target=self._run, name="tracemalloc-sampler", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def take_snapshot(self):
+        # leave our own bookkeeping out of the report
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        return snapshot
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.last_snapshot = self.take_snapshot()
+
+    def stop(self):
+        if not tracemalloc.is_tracing():
+            return
+
+        self._stop_event.set()
+        self.last_snapshot = self.take_snapshot()
+        tracemalloc.stop()
+
+        try:
+            with open(self.path, "w") as f:
+                f.write(self.format_report())
+        except OSError as e:
+            print(f"Error writing allocation report: {e}")
+
+    def format_report(self):
+        lines = [f"peak traced memory: {self.peak / 1024:.1f} KiB", "", f"top {self.top} allocation sites:"]
+        for stat in self.last_snapshot.statistics("lineno")[:self.top]:
+            lines.append(f"  {stat}")
+
+        lines += ["", f"top {self.top} growth since startup:"]
+        for stat in self.last_snapshot.compare_to(self.first_snapshot, "lineno")[:self.top]:
+            lines.append(f"  {stat}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,170 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import Metrics
+
+# name -> bound, each queue has exactly one worker so its jobs run in order
+IO_QUEUES = {
+    "events": 256,  # queued and latest event deliveries
+    "config": 64,  # settings.json reads and writes
+    "notifications": 32,
+    "network": 8,  # update checks and downloads
+    "power": 4,  # sleep requests
+    "log": 16,  # event log writes
+    "control": 4,  # the control socket, see control.py
+    "http": 1,  # the http api's event loop, see http_api.py
+}
+SHUTDOWN_ORDER = ("events", "notifications", "power", "network", "config", "log")  # config writes land last
+
+
+class Handle:
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Runtime:
+    # one timing thread for everything scheduled plus one worker per named I/O queue,
+    # all started up front so the thread count never changes after start()
+    def __init__(self, queues=None):
+        self.queues = {name: queue.Queue(maxsize) for name, maxsize in (queues or IO_QUEUES).items()}
+        self._timers = []  # heap of (due, sequence, handle)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = {}
+        self._started = False
+        self._closing = False
+
+    def start(self):
+        with self._condition:
+            if self._started:
+                return self
+            self._started = True
+
+        self._threads["timing"] = threading.Thread(target=self._run_timers, name="runtime-timing", daemon=True)
+        for name in self.queues:
+            self._threads[name] = threading.Thread(target=self._run_queue, args=(name,), name=f"runtime-{name}",
+                                                   daemon=True)
+        for thread in self._threads.values():
+            thread.start()
+        return self
+
+    def is_running(self):
+        return self._started and not self._closing
+
+    # timing thread
+    def call_at(self, due, callback, *args):
+        # due is a time.monotonic() value, the callback must not block
+        handle = Handle(due, callback, args)
+        with self._condition:
+            if self._closing:
+                handle.cancel()
+                return handle
+            heapq.heappush(self._timers, (due, next(self._sequence), handle))
+            if self._timers[0][2] is handle:
+                self._condition.notify()
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def call_soon(self, callback, *args):
+        return self.call_at(time.monotonic(), callback, *args)
+
+    def _run_timers(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closing:
+                        return
+                    while self._timers and self._timers[0][2].cancelled:
+                        heapq.heappop(self._timers)
+                    timeout = self._timers[0][0] - time.monotonic() if self._timers else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                _, _, handle = heapq.heappop(self._timers)
+
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"Error in scheduled callback: {e}")
+
+    # io pool
+    def submit(self, name, function, *args, block=True, timeout=None):
+        # blocks while the queue is full, with block=False raises queue.Full instead
+        future = Future()
+        if self._closing:
+            future.set_exception(RuntimeError("Runtime is shutting down"))
+            return future
+        if not self._started:
+            self.start()
+
+        try:
+            self.queues[name].put((future, function, args), block=block, timeout=timeout)
+        except queue.Full:
+            Metrics.inc("runtime_rejected_total")
+            raise
+        return future
+
+    def _run_queue(self, name):
+        jobs = self.queues[name]
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            future, function, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args))
+            except Exception as e:
+                print(f"Error in {name} job: {e}")
+                future.set_exception(e)
+
+    def thread_count(self):
+        return sum(thread.is_alive() for thread in self._threads.values())
+
+    def shutdown(self, timeout=5.0):
+        # timers stop first so nothing new is produced, then each queue drains and joins in order
+        with self._condition:
+            if self._closing or not self._started:
+                self._closing = True
+                return
+            self._closing = True
+            self._condition.notify_all()
+
+        deadline = time.monotonic() + timeout
+        self._threads["timing"].join(max(deadline - time.monotonic(), 0))
+        names = [name for name in SHUTDOWN_ORDER if name in self.queues]
+        names += [name for name in self.queues if name not in names]
+        for name in names:
+            try:
+                # after everything already queued
+                self.queues[name].put(None, timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Full:
+                print(f"Runtime {name} queue did not drain")
+                continue
+            self._threads[name].join(max(deadline - time.monotonic(), 0))
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime():
+    # the process wide runtime, started on first use and again after a shutdown
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None or _runtime._closing:
+            _runtime = Runtime().start()
+        return _runtime
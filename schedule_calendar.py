@@ -0,0 +1,160 @@
+import datetime
+import os
+import time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+UTC = datetime.timezone.utc
+LOCALTIME = "/etc/localtime"  # the system zone on unix, a link into the tz database or a copy of a zone file
+
+
+class ScheduleCalendar:
+    def __init__(self, zone=None, horizon_days=366):
+        self.horizon_days = horizon_days
+        self._fixed_zone = zone  # explicit zone, never re-detected
+        self.zone = None
+        self._signature = None
+
+        # precomputed lookup tables, keyed by local date
+        self._first_day = None
+        self._last_day = None
+        self._offsets = {}
+        self._transitions = {}
+
+        self.recompute()
+
+    @staticmethod
+    def get_local_zone():
+        # prefer a real tz database zone so DST rules are known in advance
+        key = os.environ.get("TZ", "").lstrip(":")
+        if key:
+            try:
+                return ZoneInfo(key)
+            except (ZoneInfoNotFoundError, ValueError):
+                pass
+
+        try:
+            path = os.path.realpath(LOCALTIME)
+            if "zoneinfo" + os.sep in path:
+                return ZoneInfo(path.split("zoneinfo" + os.sep, 1)[1])
+            with open(LOCALTIME, "rb") as f:
+                return ZoneInfo.from_file(f, key="localtime")
+        except (OSError, ZoneInfoNotFoundError, ValueError):
+            pass
+
+        # no tz database (e.g. windows without tzdata), use the os rules instead
+        return None
+
+    @staticmethod
+    def get_zone_signature():
+        if hasattr(time, "tzset"):
+            time.tzset()
+
+        try:
+            stat = os.stat(LOCALTIME)
+            localtime = (os.path.realpath(LOCALTIME), stat.st_mtime_ns)
+        except OSError:
+            localtime = None
+
+        return os.environ.get("TZ"), localtime, time.tzname, time.timezone, time.altzone
+
+    def zone_changed(self):
+        return self._fixed_zone is None and self.get_zone_signature() != self._signature
+
+    def recompute(self, today=None):
+        self._signature = self.get_zone_signature()
+        self.zone = self._fixed_zone if self._fixed_zone is not None else self.get_local_zone()
+
+        if today is None:
+            today = self.local_now().date()
+        self._first_day = today - datetime.timedelta(days=1)
+        self._last_day = today + datetime.timedelta(days=self.horizon_days)
+        self._offsets = {}
+        self._transitions = {}
+
+        # walk the horizon in utc hour steps, pinpoint every offset change
+        start = datetime.datetime.combine(self._first_day, datetime.time(), tzinfo=UTC) - datetime.timedelta(days=1)
+        end = datetime.datetime.combine(self._last_day, datetime.time(), tzinfo=UTC) + datetime.timedelta(days=2)
+        step = datetime.timedelta(hours=1)
+
+        instant = start
+        offset = self.offset_at(instant)
+        while instant < end:
+            following = instant + step
+            next_offset = self.offset_at(following)
+            if next_offset != offset:
+                transition = self._find_transition(instant, following, offset)
+                local_day = (transition + offset).date()
+                self._transitions[local_day] = (transition, offset, next_offset)
+
+            day = (following + next_offset).date()
+            if day not in self._offsets:
+                self._offsets[day] = next_offset
+            instant, offset = following, next_offset
+
+        # transition days start on the "before" offset
+        for day, (_, before, _) in self._transitions.items():
+            self._offsets[day] = before
+
+    def _find_transition(self, low, high, low_offset):
+        # bisect to the second, transitions never fall between seconds
+        while (high - low).total_seconds() > 1:
+            middle = low + (high - low) / 2
+            if self.offset_at(middle) == low_offset:
+                low = middle
+            else:
+                high = middle
+        return high.replace(microsecond=0)
+
+    def offset_at(self, instant):
+        if self.zone is None:
+            return instant.astimezone().utcoffset()
+        return instant.astimezone(self.zone).utcoffset()
+
+    def local_now(self, now=None):
+        if now is None:
+            now = datetime.datetime.now(UTC)
+        if self.zone is None:
+            return now.astimezone()
+        return now.astimezone(self.zone)
+
+    def to_utc(self, day, hour, minute):
+        if not (self._first_day <= day <= self._last_day):
+            self.recompute(today=day)
+
+        wall = datetime.datetime.combine(day, datetime.time(hour, minute), tzinfo=UTC)
+        transition = self._transitions.get(day)
+        if transition is None:
+            return wall - self._offsets[day]
+
+        instant, before, after = transition
+        # repeated wall time resolves to its first occurrence
+        if wall - before < instant:
+            return wall - before
+        if wall - after >= instant:
+            return wall - after
+
+        # wall time skipped by a forward jump, fire as soon as it is passed
+        return instant
+
+    def next_fire(self, now, days, sleep_at, grace=0):
+        if not days or not sleep_at:
+            return None
+
+        hour, minute = map(int, sleep_at.split(":"))
+        today = self.local_now(now).date()
+        earliest = now - datetime.timedelta(seconds=grace)
+
+        # at most a week ahead, one table lookup per day
+        for i in range(8):
+            day = today + datetime.timedelta(days=i)
+            if DAYS[day.weekday()] not in days:
+                continue
+            fire = self.to_utc(day, hour, minute)
+            if fire >= earliest:
+                return fire
+
+        return None
+
+    def get_transitions(self):
+        return sorted(self._transitions.values())
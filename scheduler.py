@@ -1,65 +1,152 @@
 import threading
-import datetime
-import time
 
-from notifications import Notifications
+from clock import SYSTEM_CLOCK
+from event_log import EventLog
+from events import EventBus, ScheduleArmedEvent, SleepRequestedEvent, WarningEvent
+from metrics import Metrics
+from runtime import get_runtime
+from schedule_calendar import ScheduleCalendar
 
 
 class Scheduler:
-    def __init__(self, config, sleep_callback):
+    # The app calls on_clock_jumped from a ClockWatcher and on_timezone_changed when /etc/localtime
+    # changes. A zone change those cannot see, TZ or the zone setting on windows, is still found by
+    # step() polling zone_changed() and is then up to MAX_WAIT late
+    WARNING_LEAD = 300  # seconds before the fire time
+    WARNING_WINDOW = 30
+    FIRE_GRACE = 30
+    MAX_WAIT = 60  # upper bound on a wait, catches suspend and wall clock jumps
+
+    def __init__(self, config, sleep_callback=None, events=None, runtime=None, clock=None):
         self.config = config
         self.sleep_callback = sleep_callback
-        self._thread = None
-        self._stop_event = threading.Event()
+        self.runtime = runtime
+        self.clock = clock if clock is not None else SYSTEM_CLOCK
+        self.events = events if events is not None else EventBus(runtime=runtime)
 
-    def start(self):
-        # already running
-        if self._thread and self._thread.is_alive():
-            return
+        # wakeups are timers on the runtime's timing thread, see _call_soon and _call_later
+        self._lock = threading.Lock()
+        self._handle = None
+        self._chain = 0  # bumped on every reschedule so a superseded wakeup does not re-arm
+
+        self.calendar = ScheduleCalendar()
+        self._fired = None  # utc fire time already acted on
+        self._warned = None
+        self._armed = None  # last fire time announced with ScheduleArmedEvent
 
-        self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
+        # re-plan only when the schedule itself changes
+        self._subscription = self.config.subscribe(("preferences.scheduled", "scheduled_times"),
+                                                   self.on_config_changed)
+
+    def start(self):
+        with self._lock:
+            # already running
+            if self._handle is not None:
+                return
+            self._chain += 1
+            self._handle = self._call_soon(self._wakeup, self._chain)
 
     def stop(self):
-        self._stop_event.set()
-        if self._thread:
-            self._thread.join()
+        with self._lock:
+            self._chain += 1
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
 
     def restart(self):
         self.stop()
         self.start()
 
-    def _run(self):
-        fired_today = None
-        warning_sent_today = None # tracker for notification warning
+    def on_timezone_changed(self):
+        # step() recomputes the calendar on the wakeup this causes, never beside a running step
+        self._reschedule()
+
+    def on_config_changed(self, snapshot):
+        self._reschedule()
+
+    def on_clock_jumped(self):
+        # resume from suspend or a wall clock change, don't wait for MAX_WAIT to notice
+        self._reschedule()
+
+    def get_next_fire(self, now=None, snapshot=None):
+        if now is None:
+            now = self.clock.now()
+        if snapshot is None:
+            snapshot = self.config.snapshot
+
+        return self.calendar.next_fire(now, snapshot.days, snapshot.sleep_at or "", grace=self.FIRE_GRACE)
+
+    def _reschedule(self):
+        # check again right away, only while started
+        with self._lock:
+            if self._handle is None:
+                return
+            self._handle.cancel()
+            self._chain += 1
+            self._handle = self._call_soon(self._wakeup, self._chain)
+
+    def _wakeup(self, chain):
+        if chain != self._chain:
+            return
+        timeout = self.step()
+        with self._lock:
+            if chain == self._chain and self._handle is not None:
+                self._handle = self._call_later(timeout, self._wakeup, chain)
+
+    def _run_sleep_callback(self):
+        # plain callbacks may block, keep them off the timing thread
+        (self.runtime or get_runtime()).submit("power", self.sleep_callback)
+
+    def _call_soon(self, callback, *args):
+        if self.runtime is None:
+            self.runtime = get_runtime()
+        return self.runtime.call_soon(callback, *args)
+
+    def _call_later(self, delay, callback, *args):
+        return self.runtime.call_later(delay, callback, *args)
 
-        while not self._stop_event.is_set():
-            try:
-                if self.config.get_scheduled():
-                    schedule = self.config.get_schedule()
-                    now = datetime.datetime.now()
-                    current_day = now.strftime("%A")
-                    today = now.date()
+    def step(self, now=None):
+        # one wakeup, returns how long until the next one is needed
+        Metrics.inc("scheduler_wakeups_total")
+        try:
+            if self.calendar.zone_changed():
+                self.calendar.recompute()
+            return self._check(now if now is not None else self.clock.now())
+        except Exception as e:
+            print(f"Scheduler error: {e}")
+            EventLog.record("error", source="scheduler", message=str(e))
+            return self.MAX_WAIT
 
-                    days = schedule.get("days", [])
-                    sleep_at = schedule.get("sleep_at", "")
+    def _check(self, now):
+        snapshot = self.config.snapshot
+        fire = self.get_next_fire(now, snapshot) if snapshot.scheduled else None
+        if fire != self._armed:
+            self._armed = fire
+            self.events.publish(ScheduleArmedEvent(fire=fire))
+        if fire is None:
+            return self.MAX_WAIT
 
-                    if current_day in days and sleep_at:
-                        sleep_hour, sleep_minute = map(int, sleep_at.split(":"))
-                        sleep_time = now.replace(hour=sleep_hour, minute=sleep_minute, second=0, microsecond=0)
-                        delta = (sleep_time - now).total_seconds()
+        delta = (fire - now).total_seconds()
 
-                        if 270 <= delta <= 330 and warning_sent_today != today:
-                            if self.config.get_enable_notifications():
-                                warning_sent_today = today
-                                Notifications.notify_schedule_warning()
+        if abs(delta - self.WARNING_LEAD) <= self.WARNING_WINDOW and self._warned != fire:
+            self._warned = fire
+            self.events.publish(WarningEvent(source="schedule", remaining=round(delta)))
 
-                        if -30 <= delta <= 30 and fired_today != today:
-                            fired_today = today
-                            self.sleep_callback()
+        if abs(delta) <= self.FIRE_GRACE and self._fired != fire:
+            self._fired = fire
+            Metrics.inc("scheduler_fires_total")
+            Metrics.observe("scheduler_fire_error_seconds", abs(delta))
+            EventLog.record("schedule_fire", fire=fire.isoformat(), error=round(-delta, 3))
+            self.events.publish(SleepRequestedEvent(source="schedule"))
+            if self.sleep_callback:
+                self._run_sleep_callback()
 
-            except Exception as e:
-                print(f"Scheduler error: {e}")
+        # sleep until the next thing that has to happen
+        if self._fired == fire:
+            wait = delta + self.FIRE_GRACE + 1
+        elif delta > self.WARNING_LEAD and self._warned != fire:
+            wait = delta - self.WARNING_LEAD
+        else:
+            wait = delta
 
-            time.sleep(5)
\ No newline at end of file
+        return min(max(wait, 0.5), self.MAX_WAIT)
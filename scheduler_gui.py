@@ -9,37 +9,58 @@ MINUTES = [f"{m:02d}" for m in range(0, 60, 5)]
 
 class SchedulerGui:
     def __init__(self, parent=None, config=None, callback=None):
-        self.window = tkinter.Toplevel(parent)
-        self.window.focus_force()
+        # the window is built on first show and reused after that
+        self.parent = parent
+        self.window = None
         self.callback = callback
         self.config = config
-
-        # setup window
-        self.window.title('Scheduler')
-        self.window.minsize(200, 50)
-        self.window.resizable(True, True)
-        self.window.transient(parent)  # window modal
-        self.window.grab_set()
-        icon_path = GuiCommon.resource_path('icon.ico')
-        self.window.iconbitmap(icon_path)
         self.content_frame = None
 
         # sleep vars
+        self.schedule = None
+        self.day_vars = None
+        self.sleep_at = None
+        self.sleep_hour = None
+        self.sleep_minute = None
+        self.scheduler_enabled = None
+
+    def show(self):
+        if self.window is None:
+            self.initialize_gui()
+        self.refresh()
+        GuiCommon.show_modal(self.window, self.parent)
+
+    def hide(self):
+        GuiCommon.hide_modal(self.window)
+
+    def refresh(self):
+        # reload the saved schedule, unsaved edits from last time are dropped
         self.schedule = self.config.get_schedule() if self.config else {}
-        self.day_vars = {
-            day: tkinter.BooleanVar(value=day in self.schedule.get("days", []))
-            for day in DAYS
-        }
+        for day, var in self.day_vars.items():
+            var.set(day in self.schedule.get("days", []))
         self.sleep_at = self.schedule.get("sleep_at", "22:00").split(":")
-        self.sleep_hour = tkinter.StringVar(value=self.sleep_at[0])
-        self.sleep_minute = tkinter.StringVar(value=self.sleep_at[1])
-
-        self.scheduler_enabled = tkinter.BooleanVar(value=self.config.get_scheduled())
+        self.sleep_hour.set(self.sleep_at[0])
+        self.sleep_minute.set(self.sleep_at[1])
+        self.scheduler_enabled.set(self.config.get_scheduled() if self.config else False)
+        self.on_toggle_schedule()
 
     def initialize_gui(self):
+        self.window = tkinter.Toplevel(self.parent)
+        self.window.withdraw()
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+
+        # setup window
+        self.window.title('Scheduler')
+        self.window.minsize(200, 50)
+        self.window.resizable(True, True)
+
+        self.day_vars = {day: tkinter.BooleanVar() for day in DAYS}
+        self.sleep_hour = tkinter.StringVar()
+        self.sleep_minute = tkinter.StringVar()
+        self.scheduler_enabled = tkinter.BooleanVar()
+
         top_frame = ttk.Frame(self.window)
         top_frame.pack(padx=3, pady=3, side="top", fill="x")
-        GuiCommon.center_window(self.window)
 
         # warning banner
         warning = ttk.Label(top_frame, text="'Run on startup' must be enabled in Preferences in order to use the Scheduler.",
@@ -53,6 +74,8 @@ class SchedulerGui:
         self.render_date_boxes(self.content_frame)
         self.render_save_button()
 
+        GuiCommon.center_window(self.window)
+
     def render_enable_field_and_sleep_at(self):
         top_bar = ttk.Frame(self.window)
         top_bar.pack(fill="x", padx=10, pady=(5, 0))
@@ -118,7 +141,7 @@ class SchedulerGui:
         if self.callback:
             self.callback()
 
-        self.window.destroy()
+        self.hide()
 
     def get_schedule(self):
         return {
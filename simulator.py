@@ -0,0 +1,300 @@
+import argparse
+import datetime
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from zoneinfo import ZoneInfo
+
+REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_PATH)
+
+from clock import UTC, VirtualClock  # noqa: E402
+from config import Config  # noqa: E402
+from events import EventBus, ScheduleArmedEvent, SleepRequestedEvent, WarningEvent  # noqa: E402
+from runtime import Handle  # noqa: E402
+from schedule_calendar import DAYS, ScheduleCalendar  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+
+SLEEP_TIMES = ["02:30", "01:30", "02:00", "03:00", "00:05", "23:00", "22:15"]  # the first four meet dst changes
+FAST_MAX_WAIT = 6 * 3600  # safe once resumes are announced, see Simulation
+
+
+class SimulatedRuntime:
+    # the Runtime interface on a VirtualClock, callbacks run on the caller's thread in due order
+    def __init__(self, clock):
+        self.clock = clock
+        self._timers = []  # heap of (due, sequence, handle)
+        self._sequence = itertools.count()
+        self.callbacks = 0
+
+    def is_running(self):
+        return True
+
+    def call_at(self, due, callback, *args):
+        handle = Handle(due, callback, args)
+        heapq.heappush(self._timers, (due, next(self._sequence), handle))
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock.monotonic() + delay, callback, *args)
+
+    def call_soon(self, callback, *args):
+        return self.call_at(self.clock.monotonic(), callback, *args)
+
+    def submit(self, name, function, *args, block=True, timeout=None):
+        # no workers, jobs run straight away
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def next_due(self):
+        while self._timers and self._timers[0][2].cancelled:
+            heapq.heappop(self._timers)
+        return self._timers[0][0] if self._timers else None
+
+    def run_next(self):
+        # advance the clock to the earliest timer and run it
+        due, _, handle = heapq.heappop(self._timers)
+        self.clock.advance(max(due - self.clock.monotonic(), 0.0))
+        self.callbacks += 1
+        handle.callback(*handle.args)
+
+
+def resolve_local(zone, day, hour, minute):
+    # what a sleep_at should mean, worked out with zoneinfo alone so it can check ScheduleCalendar:
+    # repeated wall times fire on their first occurrence, skipped ones at the transition
+    wall = datetime.datetime.combine(day, datetime.time(hour, minute))
+    first = wall.replace(tzinfo=zone, fold=0).astimezone(UTC)
+    if first.astimezone(zone).replace(tzinfo=None) == wall:
+        return first
+
+    low, high = wall.replace(tzinfo=zone, fold=1).astimezone(UTC), first
+    before = low.astimezone(zone).utcoffset()
+    while (high - low).total_seconds() > 1:
+        middle = low + (high - low) / 2
+        if middle.astimezone(zone).utcoffset() == before:
+            low = middle
+        else:
+            high = middle
+    return high.replace(microsecond=0)
+
+
+def make_scenario(rng, zone, start, days, suspends_per_week=2.0):
+    # (wall, kind, payload) actions, schedule edits in the afternoon and suspends at any time
+    actions = []
+    local_start = start.astimezone(zone).date()
+    day = 0
+    while day < days:
+        day += rng.randint(3, 14)
+        at = datetime.datetime.combine(local_start + datetime.timedelta(days=day),
+                                       datetime.time(rng.randint(12, 17), rng.randint(0, 59)), tzinfo=zone)
+        if rng.random() < 0.1:
+            actions.append((at.astimezone(UTC), "scheduled", False))
+            at += datetime.timedelta(days=rng.randint(1, 5))
+            actions.append((at.astimezone(UTC), "scheduled", True))
+        else:
+            chosen = [name for name in DAYS if rng.random() < 0.5] or [rng.choice(DAYS)]
+            actions.append((at.astimezone(UTC), "schedule", {"days": chosen, "sleep_at": rng.choice(SLEEP_TIMES)}))
+
+    for _ in range(round(days / 7 * suspends_per_week)):
+        at = start + datetime.timedelta(seconds=rng.uniform(0, days * 86400))
+        actions.append((at, "suspend", rng.uniform(60, 8 * 3600)))
+
+    return sorted((action for action in actions if action[0] < start + datetime.timedelta(days=days)),
+                  key=lambda action: action[0])
+
+
+class Simulation:
+    # a Scheduler on a VirtualClock and SimulatedRuntime against a real Config, every warning and
+    # fire is recorded with its error and the fires are checked against resolve_local.
+    # Fast mode announces each resume through on_clock_jumped as the app's ClockWatcher does, so waits
+    # can be long; with max_wait=Scheduler.MAX_WAIT and wake_on_resume=False it replays the polling
+    # fallback alone.
+    def __init__(self, workdir, zone="America/New_York", start=None, days=365, seed=None,
+                 schedule=None, suspends_per_week=2.0, max_wait=FAST_MAX_WAIT, wake_on_resume=True):
+        self.zone = ZoneInfo(zone)
+        self.start = start if start is not None else datetime.datetime(2026, 1, 1, tzinfo=UTC)
+        self.end = self.start + datetime.timedelta(days=days)
+        self.wake_on_resume = wake_on_resume
+        rng = random.Random(seed)
+
+        self.clock = VirtualClock(self.start)
+        self.runtime = SimulatedRuntime(self.clock)
+        self.config = Config(config_path=os.path.join(workdir, "settings.json"))
+        self.config.merge_missing_config_attributes()
+        self.config.set_schedule(schedule or {"days": DAYS, "sleep_at": "02:30"})
+        self.config.set_scheduled(True)
+
+        self.events = EventBus(runtime=self.runtime)
+        self.scheduler = Scheduler(config=self.config, events=self.events, runtime=self.runtime, clock=self.clock)
+        self.scheduler.MAX_WAIT = max_wait
+        self.scheduler.calendar = ScheduleCalendar(zone=self.zone)
+        self.scheduler.calendar.recompute(today=self.start.astimezone(self.zone).date())
+
+        self.actions = make_scenario(rng, self.zone, self.start, days, suspends_per_week)
+        self.suspended = []  # (from, until) wall times
+        self.periods = []  # (from, scheduled, days, sleep_at), the schedule in force from that wall time
+        self.records = []  # warnings and fires, in order
+        self._armed = None
+
+        self.events.subscribe(ScheduleArmedEvent, self.on_armed)
+        self.events.subscribe(WarningEvent, self.on_warning)
+        self.events.subscribe(SleepRequestedEvent, self.on_sleep)
+
+    # recording, sync subscribers so the clock still reads the publish time
+    def on_armed(self, event):
+        self._armed = event.fire
+
+    def on_warning(self, event):
+        if event.source == "schedule":
+            target = self._armed - datetime.timedelta(seconds=Scheduler.WARNING_LEAD)
+            self.record("warning", target)
+
+    def on_sleep(self, event):
+        if event.source == "schedule":
+            self.record("fire", self._armed)
+
+    def record(self, kind, target):
+        now = self.clock.now()
+        self.records.append({"kind": kind, "at": now, "target": target, "error": (now - target).total_seconds()})
+
+    # replay
+    def apply(self, kind, payload):
+        if kind == "suspend":
+            started = self.clock.now()
+            self.clock.suspend(payload)
+            self.suspended.append((started, self.clock.now()))
+            if self.wake_on_resume:
+                self.scheduler.on_clock_jumped()
+            return
+        if kind == "schedule":
+            self.config.set_schedule(payload)
+        elif kind == "scheduled":
+            self.config.set_scheduled(payload)
+        self.note_period()
+
+    def note_period(self):
+        snapshot = self.config.snapshot
+        self.periods.append((self.clock.now(), snapshot.scheduled, snapshot.days, snapshot.sleep_at))
+
+    def run(self):
+        self.note_period()
+        self.scheduler.start()
+        actions = list(reversed(self.actions))
+        while True:
+            due = self.runtime.next_due()
+            timer_at = self.clock.now() + datetime.timedelta(seconds=due - self.clock.monotonic()) \
+                if due is not None else None
+            action_at = actions[-1][0] if actions else None
+            if action_at is not None and (timer_at is None or action_at <= timer_at):
+                _, kind, payload = actions.pop()
+                self.clock.advance(max((action_at - self.clock.now()).total_seconds(), 0.0))
+                self.apply(kind, payload)
+            elif timer_at is not None and timer_at < self.end:
+                self.runtime.run_next()
+            else:
+                break
+        self.scheduler.stop()
+        return self.records
+
+    # checking
+    def expected_fires(self):
+        grace = datetime.timedelta(seconds=Scheduler.FIRE_GRACE)
+        bounds = self.periods[1:] + [(self.end,)]
+        for (since, scheduled, days, sleep_at), (until, *_) in zip(self.periods, bounds):
+            if not scheduled or not days or not sleep_at:
+                continue
+            hour, minute = map(int, sleep_at.split(":"))
+            day = since.astimezone(self.zone).date() - datetime.timedelta(days=1)
+            while day <= until.astimezone(self.zone).date():
+                if DAYS[day.weekday()] in days:
+                    fire = resolve_local(self.zone, day, hour, minute)
+                    if since - grace <= fire < until:
+                        yield fire
+                day += datetime.timedelta(days=1)
+
+    def was_suspended(self, at):
+        return any(started <= at < resumed for started, resumed in self.suspended)
+
+    def check(self):
+        # problems are fires that should not have happened, or that went missing while awake
+        grace = Scheduler.FIRE_GRACE
+        fired = {record["target"]: record for record in self.records if record["kind"] == "fire"}
+        expected = set(self.expected_fires())
+        problems, skipped = [], []
+        for fire in sorted(expected - set(fired)):
+            (skipped if self.was_suspended(fire) else problems).append(f"missed fire at {fire:%Y-%m-%d %H:%M:%S}Z")
+        for target in sorted(set(fired) - expected):
+            problems.append(f"unexpected fire for {target:%Y-%m-%d %H:%M:%S}Z")
+        for record in self.records:
+            if abs(record["error"]) > grace:
+                problems.append(f"{record['kind']} for {record['target']:%Y-%m-%d %H:%M:%S}Z "
+                                f"off by {record['error']:+.3f}s")
+        return problems, skipped
+
+    def format_record(self, record):
+        local = record["at"].astimezone(self.zone)
+        return (f"{record['at']:%Y-%m-%d %H:%M:%S}Z  {local:%a %H:%M:%S %Z}  {record['kind']:<7}  "
+                f"target {record['target']:%Y-%m-%d %H:%M:%S}Z  error {record['error']:+.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Simple Sleep Timer schedules on a virtual clock")
+    parser.add_argument("--zone", default="America/New_York")
+    parser.add_argument("--start", help="utc date to start from, YYYY-MM-DD")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--suspends-per-week", type=float, default=2.0)
+    parser.add_argument("--poll", action="store_true",
+                        help="wake every Scheduler.MAX_WAIT and don't announce resumes, like the app does")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    parser.add_argument("--output", help="also write the records and problems as json to this path")
+    args = parser.parse_args()
+
+    start = None
+    if args.start:
+        start = datetime.datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=UTC)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        simulation = Simulation(workdir, zone=args.zone, start=start, days=args.days, seed=args.seed,
+                                suspends_per_week=args.suspends_per_week,
+                                max_wait=Scheduler.MAX_WAIT if args.poll else FAST_MAX_WAIT,
+                                wake_on_resume=not args.poll)
+        started = time.perf_counter()
+        records = simulation.run()
+        elapsed = time.perf_counter() - started
+        problems, skipped = simulation.check()
+
+    if not args.quiet:
+        for record in records:
+            print(simulation.format_record(record))
+        for message in skipped:
+            print(f"suspended: {message}")
+    for message in problems:
+        print(f"PROBLEM: {message}")
+
+    errors = [abs(record["error"]) for record in records]
+    print(f"\n{args.days} days in {elapsed:.3f}s, {simulation.runtime.callbacks} wakeups, "
+          f"{sum(record['kind'] == 'fire' for record in records)} fires, "
+          f"{sum(record['kind'] == 'warning' for record in records)} warnings, "
+          f"{len(simulation.suspended)} suspends, {len(simulation.periods) - 1} config edits, "
+          f"{len(skipped)} fires slept through, max error {max(errors, default=0):.3f}s, {len(problems)} problems")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"records": records, "problems": problems, "skipped": skipped}, f, indent=4, default=str)
+
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import shlex
+import socket
+import sys
+
+REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_PATH)
+
+from control import USAGE, CommandError, Commands, activation_path, read_control_file  # noqa: E402
+
+TIMEOUT = 5.0
+ACTIVATION_TIMEOUT = 60.0  # the first call in on demand mode waits for the app to start
+
+
+class NotRunning(Exception):
+    # nothing listens where the instance should be, it is safe to edit settings.json instead
+    pass
+
+
+def pid_alive(pid):
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    if sys.platform == "win32":
+        # os.kill would terminate it there
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        alive = kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) and code.value == 259  # STILL_ACTIVE
+        kernel32.CloseHandle(handle)
+        return bool(alive)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def find_instance(path=None):
+    # the running app's control file, else the socket systemd starts it on, None when there is neither;
+    # a file left behind by an instance that is gone, or that is not ours, is ignored
+    try:
+        instance = read_control_file(path)
+        if isinstance(instance, dict) and pid_alive(instance.get("pid")):
+            return instance
+    except (OSError, json.JSONDecodeError):
+        pass
+    try:
+        if os.path.exists(activation_path()):
+            return {"unix": activation_path(), "token": "", "activation": True}
+    except OSError:
+        pass
+    return None
+
+
+def connect(instance, timeout):
+    if "unix" in instance:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(ACTIVATION_TIMEOUT if instance.get("activation") else timeout)
+        try:
+            connection.connect(instance["unix"])
+        except OSError:
+            connection.close()
+            raise
+        return connection
+    return socket.create_connection(("127.0.0.1", instance["port"]), timeout=timeout)
+
+
+def send(instance, commands, timeout=TIMEOUT):
+    # one request, one json line back; NotRunning when nobody is listening any more. Once connected
+    # the instance may have run the commands, any later failure is an OSError or ValueError
+    request = {"token": instance["token"], "commands": commands}
+    try:
+        connection = connect(instance, timeout)
+    except (ConnectionRefusedError, FileNotFoundError) as e:
+        raise NotRunning(str(e))
+    with connection:
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def run_offline(config_path, commands):
+    # no app running, edit settings.json in place; an app started later picks the changes up
+    from config import Config
+
+    config = Config(config_path=config_path)
+    config.merge_missing_config_attributes()
+    try:
+        results = Commands(config).run(commands)
+        config.flush()
+    except CommandError as e:
+        return {"ok": False, "error": str(e)}
+    except OSError as e:
+        return {"ok": False, "error": f"could not save {config_path}: {e}"}
+    return {"ok": True, "results": results}
+
+
+def read_batch(path):
+    # one command per line, shell quoting, # comments
+    f = sys.stdin if path == "-" else open(path, "r")
+    with f:
+        return [words for words in (shlex.split(line, comments=True) for line in f) if words]
+
+
+def format_result(result):
+    if result is None:
+        return []
+    if isinstance(result, dict):
+        return [f"{key}: {value}" for key, value in result.items()]
+    if isinstance(result, list):
+        return [str(item) for item in result]
+    return [str(result)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sleeptimerctl", description="Control Simple Sleep Timer",
+                                     epilog=USAGE, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="one command, see below")
+    parser.add_argument("--batch", metavar="FILE", help="run the commands in FILE (- for stdin) as one transaction")
+    parser.add_argument("--config", help="settings.json to edit when no instance is running")
+    parser.add_argument("--offline", action="store_true", help="edit settings.json even if an instance is running")
+    parser.add_argument("--json", action="store_true", help="print the raw results as json")
+    args = parser.parse_args(argv)
+
+    commands = read_batch(args.batch) if args.batch else ([args.command] if args.command else [])
+    if not commands:
+        parser.print_help()
+        return 2
+
+    instance = find_instance()
+    response = None
+    if instance is not None and not args.offline:
+        try:
+            response = send(instance, commands)
+        except NotRunning:
+            pass  # left behind by an instance that did not shut down cleanly
+        except (OSError, ValueError) as e:
+            # it may have applied them, running them again offline could do it twice
+            response = {"ok": False, "error": f"no answer from the running instance: {e}"}
+    if response is None:
+        config_path = args.config or (instance or {}).get("config_path") or "settings.json"
+        response = run_offline(config_path, commands)
+
+    if args.json:
+        print(json.dumps(response, indent=4, default=str))
+    elif response.get("ok"):
+        for result in response["results"]:
+            for line in format_result(result):
+                print(line)
+    else:
+        print(f"error: {response.get('error')}", file=sys.stderr)
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+WATCHDOG_ENV = "SLEEPTIMER_WATCHDOG"  # stall threshold in milliseconds
+WATCHDOG_LOG_PATH = "watchdog.log"
+
+logger = logging.getLogger("sleeptimer.watchdog")
+
+
+class Watchdog:
+    def __init__(self, root, threshold=0.25, interval=0.05):
+        self.root = root
+        self.threshold = threshold
+        self.interval = interval
+        self._main_ident = threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._stall_stack = None
+        self._stall_started = None
+        self._after_id = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def from_environment(root):
+        # opt-in via --watchdog or SLEEPTIMER_WATCHDOG=<threshold ms>
+        threshold = os.environ.get(WATCHDOG_ENV)
+        if threshold is None and "--watchdog" not in sys.argv:
+            return None
+
+        if not logger.handlers:
+            handler = logging.FileHandler(WATCHDOG_LOG_PATH)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+        try:
+            return Watchdog(root, threshold=int(threshold) / 1000 if threshold else 0.25)
+        except ValueError:
+            return Watchdog(root)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._last_beat = time.monotonic()
+        self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+        self._thread = threading.Thread(target=self._monitor, name="watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass  # root already destroyed
+            self._after_id = None
+
+    def _beat(self):
+        # runs on the tk thread, only gets here when the event loop is responsive
+        self._last_beat = time.monotonic()
+        self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+
+    def _monitor(self):
+        # reported as soon as it crosses the threshold, a loop that never comes back still leaves a stack
+        while not self._stop_event.wait(self.interval):
+            lateness = time.monotonic() - self._last_beat - self.interval
+
+            if lateness > self.threshold and self._stall_stack is None:
+                # main thread is stuck, grab where it is right now
+                self._stall_started = self._last_beat + self.interval
+                frame = sys._current_frames().get(self._main_ident)
+                self._stall_stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+                self.report_stall(time.monotonic() - self._stall_started, self._stall_stack)
+
+            elif lateness <= self.threshold and self._stall_stack is not None:
+                self.report_recovery(self._last_beat - self._stall_started)
+                self._stall_stack = None
+                self._stall_started = None
+
+    @staticmethod
+    def report_stall(waited, stack):
+        logger.warning(f"Tk main loop stalled for {waited * 1000:.0f}ms so far at:\n{stack}")
+
+    @staticmethod
+    def report_recovery(duration):
+        logger.warning(f"Tk main loop recovered after a {duration * 1000:.0f}ms stall")
@@ -1,25 +1,63 @@
 import os.path
+import shutil
+import subprocess
 import sys
-import winreg
+
+from control import activation_path
+from scheduler import Scheduler
+from schedule_calendar import DAYS
 
 APP_NAME = "SimpleSleepTimer"
+UNIT_NAME = "simple-sleep-timer"
 
-class Startup:
-    @staticmethod
-    def get_executable_path(background: bool = False) -> str:
-        if getattr(sys, 'frozen', False):
-            return sys.executable
-        else:
-            path = f'pythonw.exe "{os.path.abspath(sys.argv[0])}"'
+LOGIN = "login"  # start with the desktop session
+ON_DEMAND = "on_demand"  # Linux only: systemd starts us on the first sleeptimerctl call or ahead of a scheduled sleep
+STARTUP_MODES = (LOGIN, ON_DEMAND)
 
-        if background:
-            path += " --background"
-        return path
+# an on demand start happens this long before the scheduled sleep, enough to start up and still warn
+ACTIVATION_LEAD = Scheduler.WARNING_LEAD + 120
+
+
+def command_line(background=False):
+    # argv that starts this app again, for the Linux entries
+    if getattr(sys, 'frozen', False):
+        argv = [sys.executable]
+    else:
+        argv = [sys.executable, os.path.abspath(sys.argv[0])]
+    line = " ".join(f'"{arg}"' for arg in argv)
+    return f"{line} --background" if background else line
+
+
+def write_if_changed(path, content):
+    # True when the file had to be written
+    try:
+        with open(path, "r") as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+
+def remove_if_exists(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class WindowsStartup:
+    KEY_PATH = r"Software\Microsoft\Windows\CurrentVersion\Run"
 
     @staticmethod
-    def set_startup(enabled: bool, background: bool = False):
-        key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
-        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, winreg.KEY_SET_VALUE) as key:
+    def set_startup(enabled, background=False, mode=LOGIN, schedule=None):
+        import winreg
+
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, WindowsStartup.KEY_PATH, 0, winreg.KEY_SET_VALUE) as key:
             if enabled:
                 winreg.SetValueEx(key, APP_NAME, 0, winreg.REG_SZ, Startup.get_executable_path(background))
             else:
@@ -30,10 +68,225 @@ class Startup:
 
     @staticmethod
     def is_startup_enabled() -> bool:
-        key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
+        import winreg
+
         try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path) as key:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, WindowsStartup.KEY_PATH) as key:
                 winreg.QueryValueEx(key, APP_NAME)
                 return True
         except FileNotFoundError:
-            return False
\ No newline at end of file
+            return False
+
+
+class LinuxStartup:
+    # a systemd user service where a user manager runs, an XDG autostart entry otherwise.
+    # In on demand mode nothing starts at login: systemd holds the control socket and a timer for the
+    # next scheduled sleep, and starts the service when either fires
+    @staticmethod
+    def config_home():
+        return os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+
+    @staticmethod
+    def autostart_path():
+        return os.path.join(LinuxStartup.config_home(), "autostart", f"{UNIT_NAME}.desktop")
+
+    @staticmethod
+    def unit_path(suffix):
+        return os.path.join(LinuxStartup.config_home(), "systemd", "user", f"{UNIT_NAME}.{suffix}")
+
+    @staticmethod
+    def has_systemd():
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+        return bool(shutil.which("systemctl") and runtime_dir and os.path.isdir(os.path.join(runtime_dir, "systemd")))
+
+    @staticmethod
+    def systemctl(errors, *args):
+        # failures are collected in errors, later steps still run
+        try:
+            result = subprocess.run(["systemctl", "--user", *args], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            errors.append(f"systemctl {' '.join(args)}: {e}")
+            return False
+        if result.returncode != 0:
+            errors.append(f"systemctl {' '.join(args)} failed: {result.stderr.strip()}")
+        return result.returncode == 0
+
+    @staticmethod
+    def set_startup(enabled, background=False, mode=LOGIN, schedule=None):
+        # a list of what went wrong, empty when everything is registered
+        errors = []
+        systemd = LinuxStartup.has_systemd()
+        on_demand = enabled and mode == ON_DEMAND and systemd
+        if enabled and mode == ON_DEMAND and not systemd:
+            errors.append("Starting on demand needs a systemd user manager, starting at login instead")
+
+        # autostart entry when there is no systemd to do it
+        if enabled and not systemd:
+            write_if_changed(LinuxStartup.autostart_path(), LinuxStartup.desktop_entry(background))
+        else:
+            remove_if_exists(LinuxStartup.autostart_path())
+        if not systemd:
+            return errors
+
+        units = {
+            "service": LinuxStartup.service_unit(background or on_demand) if enabled else None,
+            "socket": LinuxStartup.socket_unit() if on_demand else None,
+            "timer": LinuxStartup.timer_unit(schedule) if on_demand and schedule else None,
+        }
+        enable = {"service": enabled and not on_demand, "socket": on_demand, "timer": units["timer"] is not None}
+
+        # disable before the files go away, reload once, enable what is left
+        changed = False
+        for suffix, content in units.items():
+            if content is None and os.path.exists(LinuxStartup.unit_path(suffix)):
+                # never --now for the service, that would be us
+                now = ["--now"] if suffix != "service" else []
+                LinuxStartup.systemctl(errors, "disable", *now, f"{UNIT_NAME}.{suffix}")
+                changed |= remove_if_exists(LinuxStartup.unit_path(suffix))
+            elif content is not None:
+                changed |= write_if_changed(LinuxStartup.unit_path(suffix), content)
+        if not changed:
+            return errors
+
+        LinuxStartup.systemctl(errors, "daemon-reload")
+        if enable["socket"]:
+            LinuxStartup.systemctl(errors, "enable", "--now", f"{UNIT_NAME}.socket")
+        if enable["timer"]:
+            # restarted so a changed schedule is planned again
+            LinuxStartup.systemctl(errors, "enable", f"{UNIT_NAME}.timer")
+            LinuxStartup.systemctl(errors, "restart", f"{UNIT_NAME}.timer")
+        if units["service"] is not None:
+            LinuxStartup.systemctl(errors, "enable" if enable["service"] else "disable", f"{UNIT_NAME}.service")
+        return errors
+
+    @staticmethod
+    def is_startup_enabled() -> bool:
+        return any(os.path.exists(path) for path in (LinuxStartup.autostart_path(), LinuxStartup.unit_path("service")))
+
+    # file contents
+    @staticmethod
+    def desktop_entry(background):
+        return (
+            "[Desktop Entry]\n"
+            "Type=Application\n"
+            "Name=Simple Sleep Timer\n"
+            f"Exec={command_line(background)}\n"
+            f"Path={os.getcwd()}\n"
+            f"Icon={os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icon.png')}\n"
+            "Terminal=false\n"
+            "X-GNOME-Autostart-enabled=true\n"
+        )
+
+    @staticmethod
+    def service_unit(background):
+        # settings.json is looked up in the working directory, keep the one in use now
+        return (
+            "[Unit]\n"
+            "Description=Simple Sleep Timer\n"
+            "After=graphical-session.target\n"
+            "PartOf=graphical-session.target\n"
+            "\n"
+            "[Service]\n"
+            f"ExecStart={command_line(background)}\n"
+            f"WorkingDirectory={os.getcwd()}\n"
+            "\n"
+            "[Install]\n"
+            "WantedBy=graphical-session.target\n"
+        )
+
+    @staticmethod
+    def socket_unit():
+        # a unix socket in the per user runtime directory, only its owner can connect
+        return (
+            "[Unit]\n"
+            "Description=Simple Sleep Timer control socket\n"
+            "\n"
+            "[Socket]\n"
+            f"ListenStream=%t/{os.path.basename(activation_path())}\n"
+            "SocketMode=0600\n"
+            "\n"
+            "[Install]\n"
+            "WantedBy=sockets.target\n"
+        )
+
+    @staticmethod
+    def timer_unit(schedule):
+        calendars = LinuxStartup.on_calendar(schedule["days"], schedule["sleep_at"])
+        if not calendars:
+            return None
+        return (
+            "[Unit]\n"
+            "Description=Start Simple Sleep Timer ahead of the scheduled sleep\n"
+            "\n"
+            "[Timer]\n"
+            + "".join(f"OnCalendar={calendar}\n" for calendar in calendars)
+            + "AccuracySec=1s\n"
+            "\n"
+            "[Install]\n"
+            "WantedBy=timers.target\n"
+        )
+
+    @staticmethod
+    def on_calendar(days, sleep_at):
+        # OnCalendar= values ACTIVATION_LEAD before each scheduled sleep, grouped by time of day;
+        # a lead that crosses midnight moves to the day before
+        hours, minutes = (int(part) for part in sleep_at.split(":"))
+        start = hours * 3600 + minutes * 60 - ACTIVATION_LEAD
+        times = {}
+        for day in days:
+            index = DAYS.index(day) + (start // 86400)
+            seconds = start % 86400
+            stamp = f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+            times.setdefault(stamp, set()).add(index % 7)
+        return [f"{','.join(DAYS[index][:3] for index in sorted(indexes))} *-*-* {stamp}"
+                for stamp, indexes in sorted(times.items())]
+
+
+class Startup:
+    # registration with the OS to start at login, or on demand where that is supported
+    @staticmethod
+    def get_executable_path(background: bool = False) -> str:
+        if getattr(sys, 'frozen', False):
+            return sys.executable
+        else:
+            path = f'pythonw.exe "{os.path.abspath(sys.argv[0])}"'
+
+        if background:
+            path += " --background"
+        return path
+
+    @staticmethod
+    def backend():
+        # None where there is nothing to register with
+        if sys.platform == "win32":
+            return WindowsStartup
+        if sys.platform.startswith("linux"):
+            return LinuxStartup
+        return None
+
+    @staticmethod
+    def set_startup(enabled: bool, background: bool = False, mode: str = LOGIN, schedule: dict = None):
+        # schedule is {"days": [...], "sleep_at": "HH:MM"} while a scheduled sleep is enabled;
+        # returns what went wrong, None when all went well. Can take seconds on Linux, not for the tk thread
+        backend = Startup.backend()
+        if backend is None:
+            return None
+        try:
+            errors = backend.set_startup(enabled, background=background, mode=mode, schedule=schedule) or []
+        except OSError as e:
+            errors = [str(e)]
+        for error in errors:
+            print(f"Error updating startup registration: {error}")
+        return "\n".join(errors) or None
+
+    @staticmethod
+    def apply(config):
+        # from the current preferences, again whenever they or the schedule change
+        return Startup.set_startup(enabled=config.get_run_on_startup(), background=config.get_startup_in_background(),
+                            mode=config.get_startup_mode(),
+                            schedule=config.get_schedule() if config.get_scheduled() else None)
+
+    @staticmethod
+    def is_startup_enabled() -> bool:
+        backend = Startup.backend()
+        return backend.is_startup_enabled() if backend else False
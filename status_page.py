@@ -0,0 +1,231 @@
+import getpass
+import math
+import mmap
+import os
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+# A fixed 64 byte page other processes can map and poll. Only the standard library is used here so
+# monitoring agents can copy this file on its own; StatusReader is all they need.
+#
+#   offset  type  field
+#   0       4s    magic b"SSTS"
+#   4       H     layout version
+#   6       B     state, see IDLE/RUNNING
+#   7       B     paused flag
+#   8       Q     sequence, odd while a write is in progress
+#   16      d     deadline, unix seconds the countdown ends, 0 while idle or paused
+#   24      d     remaining seconds, exact while paused, at the last transition otherwise
+#   32      d     total seconds of the run
+#   40      d     next scheduled fire, unix seconds, 0 when none is armed
+#   48      d     unix seconds of the last write
+#   56      I     pid of the writer, 0 once it has exited
+#   60      4x    reserved
+MAGIC = b"SSTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHBB")
+SEQUENCE = struct.Struct("<Q")
+FIELDS = struct.Struct("<dddddI4x")
+SEQUENCE_OFFSET = HEADER.size
+FIELDS_OFFSET = SEQUENCE_OFFSET + SEQUENCE.size
+SIZE = FIELDS_OFFSET + FIELDS.size  # 64
+
+IDLE = 0
+RUNNING = 1  # counting down or paused
+
+STATUS_ENV = "SLEEPTIMER_STATUS"  # path of the page, 0 to not publish one
+
+
+def runtime_path(suffix):
+    # per user, and in memory where XDG_RUNTIME_DIR exists; OSError when no private directory can be had
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = str(os.getpid())
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if directory:
+        return os.path.join(directory, f"simple-sleep-timer-{user}.{suffix}")
+    return os.path.join(private_directory(f"simple-sleep-timer-{user}"), suffix)
+
+
+def private_directory(name):
+    # a 0700 directory of ours in the shared temp directory, where anyone could have planted the name first
+    path = os.path.join(tempfile.gettempdir(), name)
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or not owned(info) or (hasattr(os, "getuid") and info.st_mode & 0o077):
+        raise OSError(f"{path} is not a private directory of this user")
+    return path
+
+
+def owned(info):
+    # st_uid means nothing on Windows, where the temp directory is per user anyway
+    return not hasattr(os, "getuid") or info.st_uid == os.getuid()
+
+
+def status_path():
+    return os.environ.get(STATUS_ENV) or runtime_path("status")
+
+
+@dataclass(frozen=True)
+class Status:
+    state: int
+    paused: bool
+    deadline: float
+    left: float
+    total: float
+    next_fire: float
+    updated: float
+    pid: int
+    sequence: int
+
+    @property
+    def running(self):
+        return self.state == RUNNING
+
+    def remaining(self, now=None):
+        # seconds until the countdown ends, None while idle
+        if not self.running:
+            return None
+        if self.paused:
+            return self.left
+        return max(self.deadline - (time.time() if now is None else now), 0.0)
+
+
+class StatusPage:
+    # the writer, one per app; updated on transitions only, readers work out the countdown themselves
+    def __init__(self, path=None):
+        self.path = path or status_path()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._fields = [IDLE, False, 0.0, 0.0, 0.0, 0.0]  # state, paused, deadline, left, total, next_fire
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o644)
+        try:
+            info = os.fstat(fd)
+            if not stat.S_ISREG(info.st_mode) or not owned(info):
+                raise OSError(f"{self.path} is not a status page of this user")
+            if info.st_size != SIZE:
+                os.ftruncate(fd, SIZE)
+            self._map = mmap.mmap(fd, SIZE)
+        finally:
+            os.close(fd)
+
+        # start from an even sequence, readers may still hold the page of an earlier run
+        self._sequence = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0] & ~1
+        self._write()
+
+    @staticmethod
+    def from_environment():
+        # None when disabled with SLEEPTIMER_STATUS=0 or when the page cannot be created
+        if os.environ.get(STATUS_ENV) == "0":
+            return None
+        try:
+            return StatusPage()
+        except (OSError, ValueError) as e:
+            print(f"Error creating status page: {e}")
+            return None
+
+    def update_timer(self, countdown, clock):
+        # from a Countdown, its monotonic deadline is turned into unix time once here
+        with self._lock:
+            deadline = 0.0
+            if countdown.running and not countdown.paused and countdown.deadline is not None:
+                deadline = clock.now().timestamp() + countdown.deadline - clock.monotonic()
+            left = countdown.left if countdown.paused else float(countdown.remaining)
+            self._fields[:5] = [RUNNING if countdown.running else IDLE, countdown.paused, deadline,
+                                left if countdown.running else 0.0, float(countdown.total)]
+            self._write()
+
+    def update_schedule(self, fire):
+        # fire is an aware datetime or None
+        with self._lock:
+            self._fields[5] = fire.timestamp() if fire is not None else 0.0
+            self._write()
+
+    def _write(self, pid=None):
+        # seqlock: odd sequence, fields, even sequence
+        state, paused, deadline, left, total, next_fire = self._fields
+        self._sequence += 1
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, state, paused)
+        FIELDS.pack_into(self._map, FIELDS_OFFSET, deadline, left, total, next_fire, time.time(),
+                         os.getpid() if pid is None else pid)
+        self._sequence += 1
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+
+    def close(self):
+        # leave an idle page behind, readers see pid 0 and know nobody is writing
+        with self._lock:
+            if self._map is None:
+                return
+            self._fields = [IDLE, False, 0.0, 0.0, 0.0, 0.0]
+            self._write(pid=0)
+            self._map.close()
+            self._map = None
+
+
+class StatusReader:
+    # maps the page once, read() then only touches memory
+    def __init__(self, path=None):
+        self.path = path or status_path()
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), SIZE, access=mmap.ACCESS_READ)
+        magic, version, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} status page")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read(self, attempts=1000):
+        # a consistent copy, retried while the writer is mid-update; None if it never settled
+        for _ in range(attempts):
+            before = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                continue
+            _, _, state, paused = HEADER.unpack_from(self._map, 0)
+            deadline, left, total, next_fire, updated, pid = FIELDS.unpack_from(self._map, FIELDS_OFFSET)
+            if SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0] == before:
+                return Status(state, bool(paused), deadline, left, total, next_fire, updated, pid, before)
+        return None
+
+    def close(self):
+        self._map.close()
+
+
+def format_status(status, now=None):
+    now = time.time() if now is None else now
+    if status is None:
+        return "unreadable, the writer kept changing it"
+    if not status.pid:
+        state = "not running"
+    elif not status.running:
+        state = "idle"
+    else:
+        remaining = status.remaining(now)
+        state = f"{'paused' if status.paused else 'running'}, {math.ceil(remaining)}s of {status.total:.0f}s left"
+    fire = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(status.next_fire)) if status.next_fire else "none"
+    return f"{state}; next scheduled sleep: {fire}"
+
+
+if __name__ == "__main__":
+    # python status_page.py [path]
+    try:
+        with StatusReader(sys.argv[1] if len(sys.argv) > 1 else None) as reader:
+            print(format_status(reader.read()))
+    except (OSError, ValueError) as e:
+        print(f"No status page: {e}")
+        sys.exit(1)
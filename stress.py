@@ -0,0 +1,481 @@
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_PATH)
+
+from config import Config  # noqa: E402
+from control import Commands  # noqa: E402
+from events import (CancelledEvent, Event, EventBus, PausedEvent, SleepRequestedEvent, StartedEvent,  # noqa: E402
+                    TickEvent)
+from http_api import HttpApi  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from presets import Preset  # noqa: E402
+from runtime import get_runtime  # noqa: E402
+from schedule_calendar import DAYS  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from timer import Timer  # noqa: E402
+
+EXTERNAL_BASE = 1_000_000  # presets added by the external editor, never removed by the ui threads
+RACE_CHANCE = 0.02  # restart cycles that wait for the first tick before acting, so calls race the tick
+
+
+def read_rss():
+    # resident set size in bytes, None where it cannot be read cheaply
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+class CheckedConfig(Config):
+    # every write is read back straight away, the file must always parse
+    def __init__(self, harness, *args, **kwargs):
+        self.harness = harness
+        super().__init__(*args, **kwargs)
+
+    def _write(self, data):
+        super()._write(data)
+        self.harness.count("config writes")
+        try:
+            with open(self.config_path, "r") as f:
+                json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.harness.violation(f"invalid json after write: {e}")
+
+
+class Harness:
+    def __init__(self, workdir, duration=60.0, workers=4, report_interval=5.0, seed=None, http_subscribers=0,
+                 restart_cycles=0):
+        self.duration = duration
+        self.workers = workers
+        self.http_subscribers = http_subscribers
+        self.restart_cycles = restart_cycles
+        self.report_interval = report_interval
+        self.random = random.Random(seed)
+        self.stop_event = threading.Event()
+
+        self.counts = collections.Counter()
+        self.violations = []
+        self.samples = []  # periodic reports
+        self._lock = threading.Lock()
+
+        # invariant state
+        self.last_remaining = {}  # run -> last tick remaining
+        self.timer_sleeps = collections.Counter()  # run -> sleep requests
+        self.schedule_sleeps = collections.Counter()  # fire -> sleep requests
+        self.external_presets = set()
+        self.stream_ticks = collections.Counter()  # event stream -> ticks received
+        self.stream_expected = 0  # ticks published while every stream was connected
+
+        self.runtime = get_runtime()
+        self.config = CheckedConfig(self, config_path=os.path.join(workdir, "settings.json"), runtime=self.runtime)
+        self.config.merge_missing_config_attributes()
+        self.events = EventBus(runtime=self.runtime)
+        self.timer = Timer(config=self.config, events=self.events, runtime=self.runtime)
+        self.scheduler = Scheduler(config=self.config, events=self.events, runtime=self.runtime)
+
+        self.events.subscribe(TickEvent, self.on_tick)
+        self.events.subscribe(SleepRequestedEvent, self.on_sleep)
+        self.events.subscribe(Event, lambda event: self.count("events delivered"), policy="queued")
+        self.http_api = None
+        if http_subscribers:
+            self.http_api = HttpApi(Commands(self.config, timer=self.timer, scheduler=self.scheduler), self.events,
+                                    self.runtime, port=0)
+
+    # bookkeeping
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def violation(self, message):
+        with self._lock:
+            self.violations.append(message)
+        print(f"VIOLATION: {message}")
+
+    # invariants, sync subscribers on the publishing thread
+    def on_tick(self, event):
+        with self._lock:
+            last = self.last_remaining.get(event.run)
+            self.last_remaining[event.run] = event.remaining
+        if last is not None and event.remaining >= last:
+            self.violation(f"run {event.run} ticked {last} -> {event.remaining}")
+        self.count("ticks")
+
+    def on_sleep(self, event):
+        if event.source == "timer":
+            with self._lock:
+                self.timer_sleeps[event.run] += 1
+                repeated = self.timer_sleeps[event.run] > 1
+            if repeated:
+                self.violation(f"run {event.run} requested sleep twice")
+        else:
+            fire = self.scheduler._fired
+            with self._lock:
+                self.schedule_sleeps[fire] += 1
+                repeated = self.schedule_sleeps[fire] > 1
+            if repeated:
+                self.violation(f"schedule fire {fire} requested sleep twice")
+        self.count("sleeps")
+
+    # load
+    def ui_worker(self, index):
+        # what the tk thread does, with several of them at once to widen the races
+        rng = random.Random(self.random.random())
+        while not self.stop_event.is_set():
+            action = rng.random()
+            if action < 0.35:
+                self.config.add_preset(Preset(seconds=rng.randint(1, 500) * 60))
+            elif action < 0.6:
+                self.config.remove_preset(rng.randint(1, 500) * 60)
+            elif action < 0.9:
+                self.config.set_enable_notifications(rng.random() < 0.5)
+            else:
+                self.arm_schedule(rng)
+            self.count("ui operations")
+            time.sleep(rng.uniform(0, 0.002))
+
+    def timer_driver(self):
+        # short runs back to back, now and then paused for a moment, cut short or restarted,
+        # always at a random point so the calls race the ticks on the timing thread
+        rng = random.Random(self.random.random())
+        while not self.stop_event.is_set():
+            seconds = rng.randint(1, 3)
+            self.timer.start_timer(selection=f"{seconds} sec")
+            self.count("timer starts")
+            action = rng.random()
+            if action < 0.2:
+                self.stop_event.wait(rng.uniform(0, seconds))
+                self.timer.pause_timer()
+                self.stop_event.wait(rng.uniform(0, 0.5))
+                self.timer.pause_timer()
+            elif action < 0.35:
+                self.stop_event.wait(rng.uniform(0, seconds))
+                self.timer.cancel_timer()
+            elif action < 0.5:
+                self.stop_event.wait(rng.uniform(0, seconds))
+                continue  # restart over the running one
+            while self.timer.running and not self.stop_event.wait(0.02):
+                pass
+
+    def arm_schedule(self, rng):
+        # the next minute, so fires keep happening during the run
+        fire = datetime.datetime.now() + datetime.timedelta(minutes=1)
+        days = [DAYS[fire.weekday()]] + rng.sample(DAYS, rng.randint(0, 3))
+        self.config.set_schedule({"days": sorted(set(days), key=DAYS.index), "sleep_at": fire.strftime("%H:%M")})
+        self.config.set_scheduled(True)
+
+    def external_editor(self):
+        # another process rewriting settings.json, atomically like most tools do
+        index = 0
+        while not self.stop_event.wait(self.random.uniform(0.05, 0.3)):
+            try:
+                with open(self.config.config_path, "r") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                self.violation(f"external reader saw invalid json: {e}")
+                continue
+            index += 1
+            seconds = EXTERNAL_BASE + index
+            data["presets"] = sorted(data.get("presets", []) + [{"seconds": seconds}], key=lambda r: r["seconds"])
+            temp_path = f"{self.config.config_path}.external"
+            with open(temp_path, "w") as f:
+                json.dump(data, f, indent=4)
+            os.replace(temp_path, self.config.config_path)
+            self.external_presets.add(seconds)
+            self.runtime.submit("config", self.config.reload)
+            self.count("external edits")
+
+    # http api, local clients only
+    def http_clients(self):
+        asyncio.run(self._http_clients())
+
+    async def _http_clients(self):
+        # every stream must see every tick and in order while the rest api is kept busy
+        streams = [await self._open_stream(index) for index in range(self.http_subscribers)]
+        readers = [asyncio.create_task(self._read_stream(index, reader)) for index, (reader, _) in enumerate(streams)]
+        with self._lock:
+            connected = self.counts["ticks"]
+        requests = asyncio.create_task(self._http_requests(random.Random(self.random.random())))
+
+        while not self.stop_event.is_set():
+            await asyncio.sleep(0.05)
+        with self._lock:
+            self.stream_expected = self.counts["ticks"] - connected
+        await asyncio.sleep(0.5)  # what was in flight at the stop
+        for task in readers + [requests]:
+            task.cancel()
+        for _, writer in streams:
+            writer.close()
+
+    async def _open_stream(self, index):
+        reader, writer = await asyncio.open_connection(self.http_api.host, self.http_api.port)
+        writer.write(f"GET /events?token={self.http_api.token} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        status = await reader.readline()
+        if b" 200 " not in status:
+            self.violation(f"stream {index} answered {status!r}")
+        await reader.readuntil(b"\r\n\r\n")
+        return reader, writer
+
+    async def _read_stream(self, index, reader):
+        last = {}  # run -> remaining
+        name = None
+        while True:
+            line = (await reader.readline()).decode()
+            if not line:
+                self.violation(f"stream {index} closed by the server")
+                return
+            if line.startswith("event: "):
+                name = line[7:].strip()
+            elif line.startswith("data: ") and name == "tick":
+                tick = json.loads(line[6:])
+                if tick["run"] in last and tick["remaining"] >= last[tick["run"]]:
+                    self.violation(f"stream {index} run {tick['run']} ticked {last[tick['run']]} -> {tick['remaining']}")
+                last[tick["run"]] = tick["remaining"]
+                self.stream_ticks[index] += 1
+                self.count("stream events")
+            elif line.startswith("data: "):
+                self.count("stream events")
+
+    async def _http_requests(self, rng):
+        # (method, path, body, expected status)
+        requests = [
+            ("GET", "/status", None, 200),
+            ("GET", "/presets", None, 200),
+            ("POST", "/presets", lambda: {"seconds": rng.randint(1, 500) * 60}, 200),
+            ("PUT", "/preferences", lambda: {"notifications": rng.random() < 0.5}, 200),
+            ("PUT", "/preferences", lambda: {"theme": "purple"}, 400),
+            ("GET", "/schedule", None, 200),
+            ("POST", "/commands", lambda: {"commands": [["preset", "add", f"{rng.randint(1, 500)} min"],
+                                                        ["preference", "set", "notifications", "on"]]}, 200),
+            ("POST", "/commands", lambda: {"commands": [["preset", "add", "5 min"], ["bogus"]]}, 400),
+            ("GET", "/nothing", None, 404),
+        ]
+        while True:
+            method, path, body, expected = rng.choice(requests)
+            token = self.http_api.token if rng.random() > 0.05 else "wrong"
+            status = await self._request(method, path, body() if body else None, token)
+            if status != (expected if token != "wrong" else 401):
+                self.violation(f"{method} {path} answered {status}, expected {expected}")
+            self.count("http requests")
+            await asyncio.sleep(rng.uniform(0, 0.02))
+
+    async def _request(self, method, path, body, token):
+        reader, writer = await asyncio.open_connection(self.http_api.host, self.http_api.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\n"
+                     f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+        response = await reader.read()
+        writer.close()
+        return int(response.split(b" ", 2)[1])
+
+    # restart storm
+    def restart_storm(self):
+        # thousands of start, pause, cancel and restart calls back to back, one Timer per thread all on
+        # the one runtime; it must keep its threads and no tick of a superseded or paused run may be
+        # delivered
+        self.runtime.start()
+        runtime_threads, threads_before = self.runtime.thread_count(), threading.active_count()
+        started = time.monotonic()
+        counts = [self.restart_cycles // self.workers + (i < self.restart_cycles % self.workers)
+                  for i in range(self.workers)]
+        timelines = [[] for _ in counts]
+        drivers = [threading.Thread(target=self.restart_driver, args=(count, timeline, runtime_threads),
+                                    name=f"stress-restart-{i}", daemon=True)
+                   for i, (count, timeline) in enumerate(zip(counts, timelines))]
+        for driver in drivers:
+            driver.start()
+        for driver in drivers:
+            driver.join()
+
+        if self.runtime.thread_count() != runtime_threads:
+            self.violation(f"runtime threads {runtime_threads} -> {self.runtime.thread_count()}")
+        if threading.active_count() != threads_before:
+            self.violation(f"threads {threads_before} -> {threading.active_count()} after the restart storm")
+        stale = sum(self.check_timeline(timeline) for timeline in timelines)
+        ticks = sum(isinstance(event, TickEvent) for timeline in timelines for event in timeline)
+        print(f"restart storm: {self.restart_cycles} cycles on {self.workers} threads in "
+              f"{time.monotonic() - started:.1f}s, {ticks} ticks, {stale} stale, runtime threads {runtime_threads}")
+
+    def restart_driver(self, cycles, timeline, runtime_threads):
+        rng = random.Random(self.random.random())
+        events = EventBus(runtime=self.runtime)
+        for event_type in (StartedEvent, PausedEvent, CancelledEvent, TickEvent, SleepRequestedEvent):
+            events.subscribe(event_type, timeline.append)
+        timer = Timer(config=self.config, events=events, runtime=self.runtime)
+        for cycle in range(cycles):
+            timer.start_timer(selection=f"{rng.randint(1, 2)} sec")
+            self.count("timer starts")
+            if rng.random() < RACE_CHANCE:
+                time.sleep(rng.uniform(0.95, 1.05))  # about when the first tick is due
+            action = rng.random()
+            if action < 0.3:
+                timer.pause_timer()
+                if rng.random() < 0.5:
+                    timer.pause_timer()
+            elif action < 0.6:
+                timer.cancel_timer()
+            # else restarted over the running one
+            if cycle % 100 == 0 and self.runtime.thread_count() != runtime_threads:
+                self.violation(f"runtime threads {runtime_threads} -> {self.runtime.thread_count()} mid storm")
+        timer.cancel_timer()
+
+    def check_timeline(self, timeline):
+        # events are created under the timer's lock, so their creation order is the countdown's own order
+        # however late each was delivered. A tick is stale when its run had already been replaced,
+        # cancelled, paused or finished when it was made
+        current, running = None, False
+        stale = 0
+        for event in sorted(timeline, key=lambda event: event.created):
+            if isinstance(event, StartedEvent):
+                current, running = event.run, True
+            elif isinstance(event, PausedEvent) and event.run == current:
+                running = not event.paused
+            elif isinstance(event, (CancelledEvent, SleepRequestedEvent)) and event.run == current:
+                running = False
+            elif isinstance(event, TickEvent) and (event.run != current or not running):
+                stale += 1
+                self.violation(f"stale tick of run {event.run} (current {current}, running {running})")
+        return stale
+
+    # reporting
+    def sample(self, started):
+        with self._lock:
+            counts = dict(self.counts)
+        elapsed = time.monotonic() - started
+        sample = {
+            "elapsed": round(elapsed, 1),
+            "threads": threading.active_count(),
+            "rss": read_rss(),
+            "violations": len(self.violations),
+            **{name: value for name, value in counts.items()},
+        }
+        self.samples.append(sample)
+        return sample
+
+    @staticmethod
+    def format_sample(sample, previous=None):
+        parts = [f"t={sample['elapsed']:>6.1f}s", f"threads={sample['threads']}"]
+        if sample["rss"] is not None:
+            parts.append(f"rss={sample['rss'] / 1048576:.1f}MiB")
+        span = sample["elapsed"] - (previous["elapsed"] if previous else 0) or 1
+        names = ["ui operations", "config writes", "ticks", "events delivered", "external edits", "timer starts", "sleeps"]
+        for name in names + [name for name in ("stream events", "http requests") if name in sample]:
+            delta = sample.get(name, 0) - (previous.get(name, 0) if previous else 0)
+            parts.append(f"{name.replace(' ', '_')}={delta / span:.1f}/s")
+        parts.append(f"violations={sample['violations']}")
+        return "  ".join(parts)
+
+    def run(self):
+        if self.restart_cycles:
+            self.restart_storm()
+        if self.duration <= 0:
+            self.finish()
+            return
+        self.scheduler.start()
+        threads = [threading.Thread(target=self.ui_worker, args=(i,), name=f"stress-ui-{i}", daemon=True)
+                   for i in range(self.workers)]
+        threads.append(threading.Thread(target=self.timer_driver, name="stress-timer", daemon=True))
+        threads.append(threading.Thread(target=self.external_editor, name="stress-editor", daemon=True))
+        if self.http_api:
+            self.http_api.start()
+            threads.append(threading.Thread(target=self.http_clients, name="stress-http", daemon=True))
+
+        started = time.monotonic()
+        previous = self.sample(started)
+        print(self.format_sample(previous))
+        for thread in threads:
+            thread.start()
+
+        while not self.stop_event.wait(min(self.report_interval, max(started + self.duration - time.monotonic(), 0))):
+            current = self.sample(started)
+            print(self.format_sample(current, previous))
+            previous = current
+            if time.monotonic() - started >= self.duration:
+                break
+
+        self.stop_event.set()
+        for thread in threads:
+            thread.join()
+        self.finish()
+        print(self.format_sample(self.sample(started), previous))
+
+    def finish(self):
+        # quiesce, then check nothing an external edit added was lost on either side
+        if self.http_api:
+            self.http_api.stop()
+            self.check_streams()
+        self.scheduler.stop()
+        self.timer.cancel_timer()
+        self.runtime.submit("config", self.config.reload).result()
+        self.config.flush()
+        self.events.close(timeout=5)
+
+        with open(self.config.config_path, "r") as f:
+            on_disk = {record["seconds"] for record in json.load(f)["presets"]}
+        in_memory = {preset.seconds for preset in self.config.get_presets()}
+        for seconds in sorted(self.external_presets - on_disk):
+            self.violation(f"external preset {seconds} lost from disk")
+        for seconds in sorted(self.external_presets - in_memory):
+            self.violation(f"external preset {seconds} lost from memory")
+
+    def check_streams(self):
+        # a slow countdown would show up as jitter, a slow stream as missing ticks
+        for index in range(self.http_subscribers):
+            if self.stream_ticks[index] < self.stream_expected:
+                self.violation(f"stream {index} received {self.stream_ticks[index]} of {self.stream_expected} ticks")
+        jitter, broadcast = Metrics.get("timer_tick_jitter_seconds"), Metrics.get("http_broadcast_seconds")
+        if jitter and jitter.count:
+            print(f"tick jitter mean {jitter.sum / jitter.count * 1000:.2f}ms over {jitter.count} ticks")
+        if broadcast and broadcast.count:
+            print(f"broadcast to {self.http_subscribers} streams mean {broadcast.sum / broadcast.count * 1000:.2f}ms "
+                  f"over {broadcast.count} events")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simple Sleep Timer stress and soak harness")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to run")
+    parser.add_argument("--workers", type=int, default=4, help="threads issuing ui operations")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--http-subscribers", type=int, default=0,
+                        help="also serve the http api and keep this many local event streams open")
+    parser.add_argument("--restart-cycles", type=int, default=0,
+                        help="first run this many timer start/pause/cancel cycles back to back on --workers threads")
+    parser.add_argument("--output", help="also write the samples and violations as json to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        harness = Harness(workdir, duration=args.duration, workers=args.workers,
+                          report_interval=args.report_interval, seed=args.seed,
+                          http_subscribers=args.http_subscribers, restart_cycles=args.restart_cycles)
+        harness.run()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"samples": harness.samples, "violations": harness.violations}, f, indent=4)
+
+    if harness.violations:
+        print(f"\n{len(harness.violations)} invariant violations")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+
+# no tray icon and nothing written outside the test's directory
+os.environ.setdefault("PYSTRAY_BACKEND", "dummy")
+ISOLATED_ENV = {"SLEEPTIMER_CONTROL": "0", "SLEEPTIMER_STATUS": "0", "SLEEPTIMER_EVENT_LOG": "0"}
+
+from gui import GUI  # noqa: E402
+from main import App  # noqa: E402
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the condition")
+        time.sleep(0.01)
+
+
+class ImmediateRoot:
+    # stands in for tk's root, after() runs the call right away on the calling thread
+    def after(self, delay, function, *args):
+        function(*args)
+
+
+class WindowStub(GUI):
+    # the real GUI logic without tk widgets, render_view keeps the view it would apply
+    def __init__(self):
+        self.root = ImmediateRoot()
+        self.running = False
+        self.paused = False
+        self.editing = False
+        self.view_state = None
+        self.view = None
+        self.render_view()
+
+    def render_view(self):
+        self.view_state = (self.running, self.paused, self.editing)
+        self.view = self.describe_view(*self.view_state)
+
+
+class AppTestCase:
+    # mixin for unittest.TestCase: a headless App in a temporary directory with a stub window
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.saved_env = {name: os.environ.get(name) for name in ISOLATED_ENV}
+        os.environ.update(ISOLATED_ENV)
+        self.app = App(headless=True, config_path=os.path.join(self.directory.name, "settings.json"))
+        self.app.gui = self.window = WindowStub()
+
+    def tearDown(self):
+        self.app.gui = None
+        self.app.shutdown()
+        for name, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self.directory.cleanup()
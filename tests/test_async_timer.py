@@ -0,0 +1,104 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from async_timer import AsyncScheduler, AsyncTimer
+from config import Config
+
+
+class AsyncSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.config = Config(config_path=os.path.join(self.directory.name, "settings.json"))
+        self.config.merge_missing_config_attributes()
+
+    def test_started_from_another_thread(self):
+        # wakeups run on the loop and are not left waiting for its next unrelated event
+        async def main():
+            loop = asyncio.get_running_loop()
+            scheduler = AsyncScheduler(self.config, loop=loop)
+            woken = [loop.create_future(), loop.create_future()]
+            threads = []
+            step = scheduler.step
+
+            def recording_step(now=None):
+                threads.append(threading.get_ident())
+                for future in woken:
+                    if not future.done():
+                        future.set_result(None)
+                        break
+                return step(now)
+
+            scheduler.step = recording_step
+            rescheduled = threading.Event()
+
+            def caller():
+                scheduler.start()
+                rescheduled.wait(5)
+                self.config.set_scheduled(True)  # config subscribers run here, on the writing thread
+
+            thread = threading.Thread(target=caller)
+            thread.start()
+            try:
+                # with nothing else scheduled, an unwoken loop would sit in its selector until the timeout
+                started = loop.time()
+                await asyncio.wait_for(woken[0], 2)
+                self.assertLess(loop.time() - started, 1)
+                rescheduled.set()
+                started = loop.time()
+                await asyncio.wait_for(woken[1], 2)
+                self.assertLess(loop.time() - started, 1)
+            finally:
+                rescheduled.set()
+                thread.join()
+                scheduler.stop()
+            self.assertEqual(set(threads), {threading.get_ident()})
+
+        asyncio.run(main())
+
+    def test_stopped_from_another_thread(self):
+        async def main():
+            scheduler = AsyncScheduler(self.config)
+            scheduler.start()
+            await asyncio.sleep(0)
+            handle = scheduler._handle
+            thread = threading.Thread(target=scheduler.stop)
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)
+            self.assertIsNone(scheduler._handle)
+            self.assertTrue(handle.cancelled())
+
+        asyncio.run(main())
+
+
+class AsyncTimerTest(unittest.TestCase):
+    def test_pause_and_cancel_before_start(self):
+        async def main():
+            timer = AsyncTimer()
+            await timer.pause()
+            await timer.cancel()
+            self.assertFalse(timer.running)
+            self.assertFalse(timer.paused)
+
+        asyncio.run(main())
+
+    def test_pause_resume(self):
+        async def main():
+            timer = AsyncTimer()
+            self.assertTrue(await timer.start(60))
+            await timer.pause()
+            self.assertTrue(timer.paused)
+            await timer.pause()
+            self.assertFalse(timer.paused)
+            await timer.cancel()
+            self.assertFalse(await timer.wait())
+
+        asyncio.run(main())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from clock import ClockWatcher
+from config_watcher import FileWatcher
+from runtime import Runtime
+from tests.support import wait_until
+
+
+class ClockWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.runtime = Runtime().start()
+        self.addCleanup(self.runtime.shutdown)
+
+    def test_jump_is_reported_once(self):
+        offsets = [1000.0]
+        jumps = []
+        with mock.patch.object(ClockWatcher, "offset", side_effect=lambda: offsets[-1]):
+            watcher = ClockWatcher(lambda: jumps.append(threading.current_thread().name), interval=0.05,
+                                   runtime=self.runtime)
+            watcher.start()
+            self.addCleanup(watcher.stop)
+            offsets.append(1000.5)  # slewing, not a jump
+            offsets.append(1000.0 + 3600)  # an hour of suspend
+            wait_until(lambda: jumps)
+            wait_until(lambda: watcher._offset == 1000.0 + 3600)
+            threading.Event().wait(0.2)
+        self.assertEqual(jumps, ["runtime-timing"])
+
+    def test_stop(self):
+        watcher = ClockWatcher(lambda: None, interval=0.05, runtime=self.runtime)
+        watcher.start()
+        watcher.stop()
+        self.assertIsNone(watcher._handle)
+
+
+class ZoneFileTest(unittest.TestCase):
+    def setUp(self):
+        self.runtime = Runtime().start()
+        self.addCleanup(self.runtime.shutdown)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "localtime")
+        with open(self.path, "w") as f:
+            f.write("UTC")
+
+    def test_replaced_link_is_reported(self):
+        changes = []
+        watcher = FileWatcher(self.path, lambda: changes.append(True), interval=0.05, runtime=self.runtime,
+                              poll=False)
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        if watcher.mode is None:
+            self.skipTest("no inotify")
+        threading.Event().wait(0.2)
+        self.assertEqual(changes, [])
+
+        # how timedatectl switches zones: a new link renamed over the old one
+        link = self.path + ".new"
+        os.symlink("/usr/share/zoneinfo/Europe/Berlin", link)
+        os.replace(link, self.path)
+        wait_until(lambda: changes)
+
+    def test_nothing_to_watch_with_is_idle(self):
+        watcher = FileWatcher(self.path, lambda: None, runtime=self.runtime, poll=False)
+        with mock.patch.object(FileWatcher, "_open_inotify", return_value=None):
+            watcher.start()
+        self.assertIsNone(watcher.mode)
+        self.assertIsNone(watcher._handle)
+
+
+if __name__ == "__main__":
+    unittest.main()
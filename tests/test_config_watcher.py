@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from config import Config
+from config_watcher import ConfigWatcher
+from runtime import Runtime
+from tests.support import wait_until
+
+
+class ConfigWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.runtime = Runtime().start()
+        self.addCleanup(self.runtime.shutdown)
+        self.path = os.path.join(self.directory.name, "settings.json")
+        self.config = Config(config_path=self.path, runtime=self.runtime)
+        self.config.merge_missing_config_attributes()
+        self.config.flush()
+        self.watcher = ConfigWatcher(self.config, interval=0.2, runtime=self.runtime)
+
+    def edit_theme(self, theme):
+        with open(self.path) as f:
+            data = json.load(f)
+        data["preferences"]["theme"] = theme
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+
+    def test_external_edit_is_merged(self):
+        self.watcher.start()
+        self.addCleanup(self.watcher.stop)
+        theme = "light" if self.config.get_theme() == "dark" else "dark"
+        self.edit_theme(theme)
+        wait_until(lambda: self.config.get_theme() == theme)
+
+    def test_check_after_stop_leaves_the_fd_alone(self):
+        self.watcher.start()
+        self.watcher.stop()
+        self.assertIsNone(self.watcher._fd)
+        # a check already picked up by the timing thread finds it stopped, whatever now has that fd number
+        reused = os.open(os.devnull, os.O_RDONLY)
+        self.addCleanup(os.close, reused)
+        self.watcher._check()
+        self.assertIsNone(self.watcher._handle)
+        os.fstat(reused)
+
+    def test_idle_checks_do_not_reload(self):
+        self.watcher.start()
+        self.addCleanup(self.watcher.stop)
+        if self.watcher.mode != "inotify":
+            self.skipTest("no inotify")
+        reloads = []
+        self.watcher._submit = lambda: reloads.append(True)
+        time.sleep(0.5)
+        self.assertEqual(reloads, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
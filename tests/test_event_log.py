@@ -0,0 +1,41 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import event_log
+
+
+class EventLogCliTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "events.jsonl")
+        with open(self.path, "w") as f:
+            for ok in (True, False, True):
+                f.write(json.dumps({"ts": 0, "kind": "sleep", "ok": ok}) + "\n")
+
+    def run_cli(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                event_log.main(["--path", self.path, *argv])
+                code = 0
+            except SystemExit as e:
+                code = e.code
+        return code, out.getvalue(), err.getvalue()
+
+    def test_where(self):
+        code, out, _ = self.run_cli("count", "--where", "ok=True")
+        self.assertEqual(code, 0)
+        self.assertEqual(out.splitlines(), ["sleep\t2", "total\t2"])
+
+    def test_where_without_equals_is_a_usage_error(self):
+        for condition in ("ok", "=True"):
+            code, out, err = self.run_cli("count", "--where", condition)
+            self.assertEqual(code, 2)
+            self.assertIn("usage:", err)
+            self.assertIn("expected FIELD=VALUE", err)
+            self.assertEqual(out, "")
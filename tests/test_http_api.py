@@ -0,0 +1,129 @@
+import json
+import socket
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from control import Commands
+from http_api import HttpApi
+from metrics import Metrics
+from tests.support import AppTestCase, wait_until
+
+
+class HttpApiTest(AppTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        commands = Commands(self.app.config, timer=self.app.timer, scheduler=self.app.scheduler)
+        self.api = HttpApi(commands, self.app.events, self.app.runtime, port=0)
+        self.api.start()
+
+    def tearDown(self):
+        self.api.stop()
+        super().tearDown()
+
+    def request(self, method, path, body=None, data=None, token=None):
+        if body is not None:
+            data = json.dumps(body).encode()
+        request = urllib.request.Request(self.api.url + path, data=data, method=method,
+                                         headers={"Authorization": f"Bearer {token or self.api.token}"})
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            with e:
+                return e.code, json.load(e)
+
+    def open_stream(self):
+        stream = socket.create_connection((self.api.host, self.api.port), timeout=5)
+        stream.sendall(f"GET /events?token={self.api.token} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        return stream
+
+    @staticmethod
+    def read_until(stream, marker):
+        received = b""
+        while marker not in received:
+            chunk = stream.recv(4096)
+            if not chunk:
+                raise AssertionError(f"stream ended before {marker!r}, got {received!r}")
+            received += chunk
+        return received
+
+    def test_start_pause_cancel(self):
+        status, body = self.request("POST", "/timer/start", {"duration": "10 min"})
+        self.assertEqual((status, body), (200, {"ok": True, "result": {"started": 600}}))
+        self.assertTrue(self.app.timer.countdown.running)
+        wait_until(lambda: (self.window.running, self.window.paused) == (True, False))
+
+        status, body = self.request("POST", "/timer/pause")
+        self.assertEqual((status, body["ok"]), (200, True))
+        self.assertTrue(self.app.timer.countdown.paused)
+        wait_until(lambda: self.window.paused)
+        self.assertEqual(self.window.view["pause_button"]["text"], "Unpause Timer")
+
+        status, body = self.request("POST", "/timer/cancel")
+        self.assertEqual((status, body["ok"]), (200, True))
+        self.assertFalse(self.app.timer.countdown.running)
+        wait_until(lambda: not self.window.running)
+        self.assertEqual(self.window.view["stop_button"]["state"], "disabled")
+
+    def test_status(self):
+        self.request("POST", "/timer/start", {"seconds": 120})
+        status, body = self.request("GET", "/status")
+        self.assertEqual(status, 200)
+        result = body["result"]
+        self.assertEqual((result["instance"], result["running"], result["paused"], result["total"]),
+                         (True, True, False, 120))
+
+    def test_bad_json(self):
+        status, body = self.request("POST", "/timer/start", data=b"{not json")
+        self.assertEqual(status, 400)
+        self.assertFalse(body["ok"])
+        self.assertIn("invalid json", body["error"])
+        status, body = self.request("POST", "/timer/start", data=b"[1, 2]")
+        self.assertEqual((status, body["error"]), (400, "expected a json object"))
+        self.assertFalse(self.app.timer.countdown.running)
+
+    def test_unknown_path_and_method(self):
+        status, body = self.request("GET", "/nowhere")
+        self.assertEqual((status, body["ok"]), (404, False))
+        status, body = self.request("GET", "/timer/start")
+        self.assertEqual(status, 405)
+
+    def test_commands_use_no_thread_of_their_own(self):
+        self.request("GET", "/status")
+        threads = threading.active_count()
+        for _ in range(5):
+            self.request("POST", "/timer/start", {"seconds": 60})
+            self.request("GET", "/status")
+        self.assertEqual(threading.active_count(), threads)
+        self.assertFalse(any(thread.name.startswith("http-commands") for thread in threading.enumerate()))
+
+    def test_bad_token(self):
+        status, body = self.request("GET", "/status", token="wrong")
+        self.assertEqual((status, body["error"]), (401, "bad token"))
+
+    def test_stream_ends_when_the_client_leaves(self):
+        stream = self.open_stream()
+        with stream:
+            head = self.read_until(stream, b"event: status\n")
+            self.assertTrue(head.startswith(b"HTTP/1.1 200 OK\r\n"))
+            self.assertIn(b"Content-Type: text/event-stream", head)
+            wait_until(lambda: Metrics._values.get("http_subscribers") == 1)
+
+            self.request("POST", "/timer/start", {"duration": "10 min"})
+            self.read_until(stream, b"event: started\n")
+        wait_until(lambda: Metrics._values.get("http_subscribers") == 0)
+
+    def test_stream_ends_when_the_server_stops(self):
+        stream = self.open_stream()
+        with stream:
+            self.read_until(stream, b"event: status\n")
+            self.api.stop()
+            # the rest of what was sent, then end of file rather than a hang
+            while stream.recv(4096):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
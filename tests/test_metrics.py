@@ -0,0 +1,41 @@
+import sys
+import threading
+import unittest
+
+from metrics import Metrics
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(Metrics.reset)
+        Metrics.reset()
+        interval = sys.getswitchinterval()
+        self.addCleanup(sys.setswitchinterval, interval)
+        sys.setswitchinterval(1e-6)  # switch threads as often as possible
+
+    def test_no_lost_updates(self):
+        def work():
+            for _ in range(20000):
+                Metrics.inc("timer_ticks_total")
+                Metrics.observe("timer_tick_jitter_seconds", 0.003)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        # exporting meanwhile sees consistent histograms
+        while any(thread.is_alive() for thread in threads):
+            text = Metrics.render_prometheus()
+            buckets = [line for line in text.splitlines() if line.startswith("sleeptimer_timer_tick_jitter_seconds")]
+            inf = next(line for line in buckets if 'le="+Inf"' in line)
+            count = next(line for line in buckets if line.startswith("sleeptimer_timer_tick_jitter_seconds_count"))
+            self.assertEqual(inf.rsplit(" ", 1)[1], count.rsplit(" ", 1)[1])
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(Metrics.get("timer_ticks_total"), 160000)
+        histogram = Metrics.get("timer_tick_jitter_seconds")
+        self.assertEqual((histogram.count, sum(histogram.counts)), (160000, 160000))
+
+
+if __name__ == "__main__":
+    unittest.main()
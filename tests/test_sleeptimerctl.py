@@ -0,0 +1,69 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import sleeptimerctl
+
+
+class FallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings = os.path.join(self.directory.name, "settings.json")
+        self.control = os.path.join(self.directory.name, "control")
+        patch = mock.patch.dict(os.environ, {"SLEEPTIMER_CONTROL": self.control})
+        patch.start()
+        self.addCleanup(patch.stop)
+        # no activation socket of a real installation gets in the way
+        patch = mock.patch.object(sleeptimerctl, "activation_path",
+                                  return_value=os.path.join(self.directory.name, "sock"))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def write_control_file(self, port):
+        fd = os.open(self.control, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"port": port, "token": "t", "pid": os.getpid(), "config_path": self.settings}, f)
+
+    def run_ctl(self, *argv):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()) as err:
+            code = sleeptimerctl.main(list(argv))
+        return code, err.getvalue()
+
+    def test_refused_connection_edits_settings(self):
+        with socket.socket() as unused:
+            unused.bind(("127.0.0.1", 0))
+            port = unused.getsockname()[1]  # closed again, nothing listens there
+        self.write_control_file(port)
+        code, _ = self.run_ctl("preference", "set", "theme", "light")
+        self.assertEqual(code, 0)
+        with open(self.settings) as f:
+            self.assertEqual(json.load(f)["preferences"]["theme"], "light")
+
+    def test_no_answer_is_an_error(self):
+        # an instance that takes the request and hangs up without answering, it may have applied it
+        listener = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(listener.close)
+
+        def hang_up():
+            connection, _ = listener.accept()
+            with connection:
+                connection.recv(65536)
+
+        threading.Thread(target=hang_up, daemon=True).start()
+        self.write_control_file(listener.getsockname()[1])
+
+        code, err = self.run_ctl("preference", "set", "theme", "light")
+        self.assertEqual(code, 1)
+        self.assertIn("no answer from the running instance", err)
+        self.assertFalse(os.path.exists(self.settings))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from stall_watchdog import Watchdog
+
+
+class ManualRoot:
+    # after() never runs anything by itself, beat() plays a responsive tk loop
+    def __init__(self):
+        self.pending = None
+
+    def after(self, delay, function):
+        self.pending = function
+        return "after#1"
+
+    def after_cancel(self, after_id):
+        self.pending = None
+
+    def beat(self):
+        self.pending()
+
+
+class WatchdogTest(unittest.TestCase):
+    def test_stall_is_reported_before_recovery(self):
+        root = ManualRoot()
+        watchdog = Watchdog(root, threshold=0.05, interval=0.01)
+        watchdog._main_ident = threading.get_ident()
+        stalls, recoveries = [], []
+        with mock.patch.object(Watchdog, "report_stall", side_effect=lambda waited, stack: stalls.append(stack)), \
+                mock.patch.object(Watchdog, "report_recovery", side_effect=recoveries.append):
+            watchdog.start()
+            try:
+                # the loop hangs: no beats at all
+                deadline = time.monotonic() + 2
+                while not stalls and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(len(stalls), 1)
+                self.assertIn("test_stall_is_reported_before_recovery", stalls[0])
+                self.assertEqual(recoveries, [])
+
+                root.beat()
+                deadline = time.monotonic() + 2
+                while not recoveries and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                watchdog.stop()
+        self.assertEqual(len(stalls), 1)
+        self.assertEqual(len(recoveries), 1)
+        self.assertGreater(recoveries[0], 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from control import Commands
+from tests.support import AppTestCase, wait_until
+
+
+class RemoteCommandsTest(AppTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.commands = Commands(self.app.config, timer=self.app.timer, scheduler=self.app.scheduler)
+
+    def window_state(self):
+        return self.window.running, self.window.paused
+
+    def test_start_shows_the_countdown(self):
+        self.commands.run([["start", "10 min"]])
+        wait_until(lambda: self.window_state() == (True, False))
+        self.assertTrue(self.window.view["timer_display"]["visible"])
+        self.assertEqual(self.window.view["stop_button"]["state"], "enabled")
+        self.assertEqual(self.window.view["start_button"]["state"], "disabled")
+
+    def test_pause_and_resume_label(self):
+        self.commands.run([["start", "10 min"], ["pause"]])
+        wait_until(lambda: self.window_state() == (True, True))
+        self.assertEqual(self.window.view["pause_button"]["text"], "Unpause Timer")
+
+        self.commands.run([["pause"]])
+        wait_until(lambda: self.window_state() == (True, False))
+        self.assertEqual(self.window.view["pause_button"]["text"], "Pause Timer")
+
+    def test_cancel_returns_to_idle(self):
+        self.commands.run([["start", "10 min"]])
+        wait_until(lambda: self.window.running)
+        self.commands.run([["cancel"]])
+        wait_until(lambda: self.window_state() == (False, False))
+        self.assertFalse(self.window.view["timer_display"]["visible"])
+        self.assertEqual(self.window.view["stop_button"]["state"], "disabled")
+        self.assertEqual(self.window.view["pause_button"]["state"], "disabled")
+
+    def test_window_actions_are_not_undone(self):
+        # the window sets its own state first, the events that follow agree with it
+        self.window.running = True
+        self.app.start_timer(selection="10 min")
+        self.commands.run([["status"]])
+        wait_until(lambda: self.app.timer.countdown.running)
+        self.app.sync_timer_state()
+        self.assertEqual(self.window_state(), (True, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,47 +1,56 @@
 import threading
-from threading import Event
-import time
-import re
-import tkinter
-from tkinter import messagebox
 
-from notifications import Notifications
+from clock import SYSTEM_CLOCK
+from countdown import Countdown
+from durations import DurationError, DurationParser
+from events import EventBus, SleepRequestedEvent, TickEvent
+from runtime import get_runtime
 
 
 class Timer:
-    def __init__(self, callback=None, config=None, update_call=None):
+    def __init__(self, callback=None, config=None, update_call=None, events=None, runtime=None, clock=None):
         self.config = config
+        self.clock = clock if clock is not None else SYSTEM_CLOCK  # ticks are due in clock.monotonic() time
+        self.runtime = runtime if runtime is not None else get_runtime()
+        self.events = events if events is not None else EventBus(runtime=self.runtime)
         self.duration = 0
-        self.time_remaining = 0
-        self.total_time = 0
-        self.paused = False
-        self.running = False
-        self.thread = None
+        self.countdown = Countdown()  # shared with AsyncTimer, all state lives here
         self.callback = callback
         self.update_call = update_call
+        self.error = None  # DurationError from the last failed parse
 
-        # thread
-        self._pause_event = Event()
-        self._stop_event = Event()
-        self._timer_warning_sent = False
+        # ticks run on the runtime's timing thread, no thread of our own
+        self._lock = threading.Lock()
+        self._handle = None
+        self._scheduled = 0  # token of the live tick, stale callbacks see an older one
+
+    @property
+    def time_remaining(self):
+        return self.countdown.remaining
+
+    @property
+    def total_time(self):
+        return self.countdown.total
+
+    @property
+    def running(self):
+        return self.countdown.running
+
+    @property
+    def paused(self):
+        return self.countdown.paused
 
     def start_timer(self, selection=None, on_complete=None):
         self.callback = on_complete
         self.duration = self.parse_duration(selection=selection)
-        self.paused = False
-        self._stop_event.clear()
-        self._pause_event.clear()
 
         # check to ensure time was properly parsed
         if self.duration is not None:
-            self.total_time = self.duration
-            self.time_remaining = self.duration
-            self.running = True
-
-            # start thread
-            self.thread = threading.Thread(target=self._decrement)
-            self.thread.daemon = True
-            self.thread.start()
+            with self._lock:
+                self._unschedule()
+                events = self.countdown.start(self.duration, self.clock.monotonic())
+                self._schedule()
+            self._publish(events)
         else:
             self.duration = 0
             return
@@ -50,91 +59,60 @@ class Timer:
         self.duration = duration
 
     def pause_timer(self):
-        if self.paused:
-            self._pause_event.clear()
-        else:
-            self._pause_event.set()
-        self.paused = not self.paused
+        with self._lock:
+            self._unschedule()
+            events = self.countdown.pause(self.clock.monotonic())
+            self._schedule()
+        self._publish(events)
 
     def cancel_timer(self):
-        self._stop_event.set()
-        self._pause_event.clear()
-        self.paused = False
-        self.time_remaining = 0
-        self.total_time = 0
-        self._timer_warning_sent = False
-        self.running = False
-        if self.thread:
-            self.thread.join(timeout=0.001)
+        with self._lock:
+            self._unschedule()
+            events = self.countdown.cancel()
+        self._publish(events)
 
     def get_remaining_time(self):
-        hours = self.time_remaining // 3600
-        minutes = (self.time_remaining % 3600) // 60
-        seconds = self.time_remaining % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return self.countdown.format_remaining()
 
     def get_remaining_time_in_seconds(self):
         return self.time_remaining
 
     def parse_duration(self, selection=None):
-        # remove symbols
-        selection = re.sub(r'[^\w\s]', '', selection)
-
-        # check format
-        try:
-            match = re.match(r"(\d+)\s*(min|hrs?|sec)", selection.lower())
-            if not match:
-                raise ValueError(f"Invalid duration format: {selection}")
-        except ValueError as e:
-            tkinter.messagebox.showerror(
-                "Invalid Input",
-                "Please enter a valid time in this format: { Duration } { Units }"
-            )
+        # no ui here, callers read self.error when this returns None
+        result = DurationParser.parse(selection)
+        if isinstance(result, DurationError):
+            self.error = result
             return None
 
-        # parse values
-        duration, unit = match.groups()
-        duration = int(duration)
-
-        # convert to seconds
-        if unit.startswith("hr"):
-            return duration * 3600
-        elif unit == "min":
-            return duration * 60
-        elif unit == "sec":
-            return duration
-        else:
-            raise ValueError(f"Invalid unit format: {selection}")
-
-    def _decrement(self):
-        while self.running and self.time_remaining > 0:
-            # check for pause
-            if self._pause_event.is_set():
-                self._pause_event.wait()
-                continue
-
-            if self._stop_event.is_set() or self._pause_event.is_set():
-                break
-            time.sleep(1)
-
-            if not self._stop_event.is_set() and not self._pause_event.is_set():
-                self.time_remaining -= 1
-                self.update_call()
-                self.check_timer_warning()
-
-            if self.time_remaining <= 0 and self.running:
-                if self.callback:
-                    self.running = False
-                    self.callback()
-                break
-
-    def check_timer_warning(self):
-        if not self.config.get_enable_notifications():
-            return
-
-        if self.total_time <= 0 or self._timer_warning_sent:
-            return
-
-        if self.time_remaining <= (self.total_time * 0.1):
-            self._timer_warning_sent = True
-            Notifications.notify_custom_timer_warning(self.time_remaining)
\ No newline at end of file
+        self.error = None
+        return result.seconds
+
+    def _schedule(self):
+        # ticks land on whole seconds of the deadline, waiting never accumulates drift
+        due = self.countdown.next_tick()
+        if due is not None:
+            self._scheduled += 1
+            self._handle = self.runtime.call_at(due, self._decrement, self.countdown.generation, self._scheduled)
+
+    def _unschedule(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _decrement(self, run, token):
+        with self._lock:
+            if token != self._scheduled or self._handle is None or not self.countdown.is_current(run):
+                return  # superseded: cancelled, paused or restarted after this tick was picked up
+            self._handle = None
+            events = self.countdown.advance(self.clock.monotonic())
+            self._schedule()
+        self._publish(events)
+
+    def _publish(self, events):
+        for event in events:
+            self.events.publish(event)
+            # plain callbacks may block, keep them off the timing thread
+            if isinstance(event, TickEvent) and self.update_call:
+                self.runtime.submit("events", self.update_call)
+            elif isinstance(event, SleepRequestedEvent) and self.callback:
+                self.runtime.submit("power", self.callback)
@@ -5,40 +5,53 @@ from gui_common import GuiCommon
 
 class UpdaterGui:
     def __init__(self, config=None, parent=None, latest_version=None):
+        # the window is built on first show and reused after that
         self.parent = parent
-        self.window = tkinter.Toplevel(parent)
-        self.window.transient(parent)
-        self.window.focus_force()
-        self.window.grab_set()
-        icon_path = GuiCommon.resource_path('icon.ico')
-        self.window.iconbitmap(icon_path)
+        self.window = None
         self.config = config
-
-        # setup window
-        self.window.title('Updater')
-        self.window.minsize(300, 100)
-        self.window.resizable(False, False)
-        GuiCommon.center_window(self.parent)
-        GuiCommon.center_window(self.window)
+        self.notice = None
 
         # vars
         self.current_version = self.config.version
         self.latest_version = latest_version
 
+    def show(self, latest_version=None):
+        if latest_version is not None:
+            self.latest_version = latest_version
+        if self.window is None:
+            self.initialize_window()
+        self.notice["text"] = f"A new update is available! Version {self.latest_version}"
+        GuiCommon.show_modal(self.window, self.parent)
+
+    def hide(self):
+        GuiCommon.hide_modal(self.window)
+
     def initialize_window(self):
+        self.window = tkinter.Toplevel(self.parent)
+        self.window.withdraw()
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+
+        # setup window
+        self.window.title('Updater')
+        self.window.minsize(300, 100)
+        self.window.resizable(False, False)
+
         # vars
         top_frame = ttk.Frame(self.window)
         top_frame.pack(padx=3, pady=3, side="top", fill="x")
 
-        notice = ttk.Label(top_frame,
-                            text=f"A new update is available! Version {self.latest_version}")
-        notice.pack()
+        self.notice = ttk.Label(top_frame,
+                                text=f"A new update is available! Version {self.latest_version}")
+        self.notice.pack()
 
         current_ver_notice = ttk.Label(top_frame, text=f"Current Version: {self.current_version}")
         current_ver_notice.pack()
 
         self.render_buttons(top_frame)
 
+        GuiCommon.center_window(self.parent)
+        GuiCommon.center_window(self.window)
+
     def render_buttons(self, frame=None):
         btn_frame = ttk.Frame(frame)
         btn_frame.pack(fill="x", padx=1, pady=(0, 10))
@@ -47,11 +60,11 @@ class UpdaterGui:
         ttk.Button(btn_frame, text="Download", command=self.on_download).pack(side="left", padx=(0, 1))
 
     def on_skip(self):
-        self.config.set_skip_version(version=self.latest_version)
-        self.window.destroy()
+        self.config.set_skip_version(skip_version=self.latest_version)
+        self.hide()
 
     def on_remind(self):
-        self.window.destroy()
+        self.hide()
 
     def on_download(self):
         self.config.update_application()
\ No newline at end of file